@@ -0,0 +1,92 @@
+"""
+Benchmark of the JSON serialisation of /run-pathsim responses.
+
+Runs every graph in ``example_graphs/`` and compares, for the response payload
+(figure + CSV data), the legacy path (``.tolist()`` + stdlib ``json``) with the
+NumPy-aware path of ``pathview.serialization``, as well as the compressed sizes.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.json_serialisation
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+from pathview import serialization
+from pathview.figures import make_csv_payload, make_plot
+from pathview.pathsim_utils import make_pathsim_model
+from pathview.results import SimulationResults
+
+EXAMPLES_DIR = Path(__file__).parent.parent / "example_graphs"
+REPEATS = 5
+
+
+def best_time(func):
+    """Best wall time of ``REPEATS`` calls in milliseconds, and the last result."""
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return 1e3 * min(timings), result
+
+
+def legacy_payload(payload):
+    """The payload as it was built before, with Python lists of floats."""
+    return {
+        "plot": payload["plot"],
+        "csv_data": {
+            "scopes": [
+                {
+                    "label": scope["label"],
+                    "time": scope["time"].tolist(),
+                    "series": {k: v.tolist() for k, v in scope["series"].items()},
+                }
+                for scope in payload["csv_data"]["scopes"]
+            ]
+        },
+    }
+
+
+def main():
+    print(f"orjson: {serialization.orjson is not None}, ", end="")
+    print(f"encodings: {serialization.SUPPORTED_ENCODINGS}\n")
+    header = f"{'example':<22}{'legacy ms':>10}{'numpy ms':>10}{'bytes':>11}"
+    header += "".join(
+        f"{enc + ' bytes':>12}{enc + ' ms':>9}"
+        for enc in serialization.SUPPORTED_ENCODINGS
+    )
+    print(header)
+
+    for filename in sorted(EXAMPLES_DIR.glob("*.json")):
+        with open(filename) as f:
+            graph_data = json.load(f)
+        try:
+            simulation, duration = make_pathsim_model(graph_data)
+        except ImportError as e:
+            print(f"{filename.stem:<22}skipped ({e})")
+            continue
+        simulation.log = False
+        simulation.run(duration)
+
+        results = SimulationResults.from_blocks(simulation.blocks)
+        payload = {
+            "plot": serialization.dumps(make_plot(results)).decode(),
+            "csv_data": make_csv_payload(results.scopes),
+        }
+        legacy = legacy_payload(payload)
+
+        legacy_ms, _ = best_time(lambda: json.dumps(legacy).encode())
+        numpy_ms, body = best_time(lambda: serialization.dumps(payload))
+        row = f"{filename.stem:<22}{legacy_ms:>10.2f}{numpy_ms:>10.2f}{len(body):>11}"
+        for encoding in serialization.SUPPORTED_ENCODINGS:
+            ms, compressed = best_time(lambda: serialization.compress(body, encoding))
+            row += f"{len(compressed):>12}{ms:>9.2f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
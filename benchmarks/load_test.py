@@ -0,0 +1,549 @@
+"""
+Load test of the backend.
+
+Serves the Flask app locally (or targets a running server with ``--url``) and
+sends a mix of requests from concurrent client threads for a fixed time:
+simulations of ``example_graphs`` on /run-pathsim, /convert-to-python,
+/default-values/<type> and /get-docs/<type>, while ``--streams`` connections
+to /logs/stream are held open for the whole test, as the browser tabs of the
+web app do. Throughput and p50/p95/p99 latencies are reported per endpoint,
+with the connection time and the events received by the streams, so server
+settings and caching changes can be compared with numbers.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.load_test --concurrency 8 --duration 30 --streams 16
+    python -m benchmarks.load_test --server gunicorn --workers 2 --threads 8
+    python -m benchmarks.load_test --server uvicorn --threads 8
+    python -m benchmarks.load_test --url http://localhost:8000 --output load.json
+
+The weights of the mix are set with ``--mix``, e.g. ``--mix run-pathsim=0``
+to leave simulations out.
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from pathview.cli import find_graphs
+from pathview.pathsim_utils import map_str_to_object
+
+EXAMPLES_DIR = Path(__file__).parent.parent / "example_graphs"
+
+# relative frequency of the requests of each endpoint
+DEFAULT_MIX = {
+    "run-pathsim": 1,
+    "convert-to-python": 2,
+    "default-values": 4,
+    "get-docs": 4,
+}
+
+PERCENTILES = (50, 95, 99)
+
+# time in seconds a request may take before it counts as an error
+REQUEST_TIMEOUT = 120
+
+
+def percentile(values, q: float) -> float:
+    """Return the ``q``-th percentile of values (nearest rank), None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def load_graphs(paths, duration_scale: float = 1.0) -> list[dict]:
+    """
+    Load the graphs simulated by the /run-pathsim requests.
+
+    Args:
+        paths: Graph files or directories.
+        duration_scale: Factor applied to the simulation duration of the graphs,
+            to make the simulations shorter or longer.
+
+    Returns:
+        The graph data.
+    """
+    graphs = []
+    for path in find_graphs(paths):
+        with open(path) as f:
+            graph_data = json.load(f)
+        # graphs needing optional dependencies (e.g. festim) are left out
+        if any(node["type"] == "wall" for node in graph_data["nodes"]):
+            continue
+        solver_params = graph_data.setdefault("solverParams", {})
+        solver_params["log"] = "false"
+        if duration_scale != 1.0:
+            duration = solver_params.get("simulation_duration") or "10"
+            solver_params["simulation_duration"] = f"({duration}) * {duration_scale}"
+        graphs.append(graph_data)
+    return graphs
+
+
+class LoadTest:
+    """
+    Client threads sending a weighted mix of requests to a server.
+
+    Args:
+        base_url: URL of the server, e.g. ``http://127.0.0.1:8000``.
+        graphs: Graph data sent to /run-pathsim and /convert-to-python.
+        mix: Weights of the endpoints, see ``DEFAULT_MIX``.
+        seed: Seed of the random choice of the requests.
+    """
+
+    def __init__(self, base_url: str, graphs: list[dict], mix=None, seed: int = 0):
+        self.base_url = base_url.rstrip("/")
+        self.graphs = graphs
+        self.mix = {k: v for k, v in (mix or DEFAULT_MIX).items() if v > 0}
+        self.seed = seed
+        self.node_types = sorted(map_str_to_object)
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def _request(self, endpoint: str, rng: random.Random):
+        """Send one request and return the status code and the body size."""
+        data = None
+        if endpoint == "run-pathsim":
+            path = "/run-pathsim"
+            data = {"graph": rng.choice(self.graphs)}
+        elif endpoint == "convert-to-python":
+            path = "/convert-to-python"
+            data = {"graph": rng.choice(self.graphs)}
+        elif endpoint == "default-values":
+            path = f"/default-values/{rng.choice(self.node_types)}"
+        elif endpoint == "get-docs":
+            path = f"/get-docs/{rng.choice(self.node_types)}"
+        else:
+            raise ValueError(f"Unknown endpoint: {endpoint}")
+
+        request = urllib.request.Request(self.base_url + path)
+        request.add_header("Accept-Encoding", "gzip")
+        if data is not None:
+            request.data = json.dumps(data).encode()
+            request.add_header("Content-Type", "application/json")
+        try:
+            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+                return response.status, len(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, len(e.read())
+
+    def _stream(self, path: str, stop: threading.Event):
+        """
+        Hold an event stream open until ``stop`` is set, reading its events.
+
+        The connection time (until the first line is received), the number of
+        events and bytes received and, if the stream failed or ended before
+        ``stop`` was set, the error are recorded in ``stream_samples``.
+        """
+        url = urlsplit(self.base_url)
+        # no timeout: idle streams only receive a heartbeat every 30 s
+        connection = http.client.HTTPConnection(url.hostname, url.port)
+        start = time.perf_counter()
+        latency, status, events, size, error = None, None, 0, 0, None
+        try:
+            connection.connect()
+            # the response takes over the socket, which is shut down at the end
+            with self._lock:
+                self._sockets.append(connection.sock)
+            if stop.is_set():
+                self._close_streams()
+            connection.request("GET", path)
+            response = connection.getresponse()
+            status = response.status
+            while line := response.readline():
+                if latency is None:
+                    latency = time.perf_counter() - start
+                size += len(line)
+                # events end with an empty line
+                events += line in (b"\n", b"\r\n")
+            if not stop.is_set():
+                error = "The stream ended"
+        except (OSError, http.client.HTTPException) as e:
+            if not stop.is_set():
+                error = f"{type(e).__name__}: {e}"
+        finally:
+            connection.close()
+        if status is not None and status != 200:
+            error = f"HTTP {status}"
+        with self._lock:
+            self.stream_samples.append((latency, events, size, error))
+
+    def _close_streams(self):
+        """Shut down the sockets of the streams, which ends their reading."""
+        with self._lock:
+            sockets, self._sockets = self._sockets, []
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _client(self, index: int, deadline: float):
+        rng = random.Random(self.seed * 1000 + index)
+        endpoints, weights = list(self.mix), list(self.mix.values())
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(endpoints, weights)[0]
+            start = time.perf_counter()
+            try:
+                status, size = self._request(endpoint, rng)
+                error = None
+            except (OSError, http.client.HTTPException) as e:
+                status, size, error = None, 0, f"{type(e).__name__}: {e}"
+            latency = time.perf_counter() - start
+            with self._lock:
+                self.samples.append((endpoint, start, latency, status, size, error))
+
+    def run(self, concurrency: int, duration: float, streams: int = 0) -> dict:
+        """
+        Send requests from client threads for a given time.
+
+        Requests still running at the end are waited for and counted. The
+        event streams are opened before the requests start and closed after
+        they are all done.
+
+        Args:
+            concurrency: Number of client threads.
+            duration: Time in seconds during which requests are started.
+            streams: Number of connections to /logs/stream held open.
+
+        Returns:
+            The report, see ``report``.
+        """
+        self.samples, self.stream_samples, self._sockets = [], [], []
+        stop = threading.Event()
+        stream_threads = [
+            threading.Thread(target=self._stream, args=("/logs/stream", stop))
+            for _ in range(streams)
+        ]
+        for thread in stream_threads:
+            thread.start()
+
+        start = time.perf_counter()
+        deadline = start + duration
+        threads = [
+            threading.Thread(target=self._client, args=(i, deadline), daemon=True)
+            for i in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        self._close_streams()
+        for thread in stream_threads:
+            thread.join()
+        return self.report(elapsed, concurrency)
+
+    def report(self, elapsed: float, concurrency: int) -> dict:
+        """
+        Summarise the samples.
+
+        Args:
+            elapsed: Wall time of the run in seconds.
+            concurrency: Number of client threads.
+
+        Returns:
+            A dictionary with the ``elapsed`` time, the ``concurrency`` and, for
+            every endpoint and ``"all"`` of them, the number of ``requests``,
+            of ``errors`` (failed connections and 5xx responses), the
+            ``throughput`` in requests per second, the mean ``bytes`` and the
+            ``latency`` percentiles in seconds, and for the event ``streams``
+            the number ``open``, of ``errors`` (failed connections and streams
+            that ended before the test), the ``events`` and ``bytes`` received
+            and the ``connect`` time percentiles in seconds.
+        """
+        groups = {"all": self.samples}
+        for sample in self.samples:
+            groups.setdefault(sample[0], []).append(sample)
+
+        endpoints = {}
+        for endpoint, samples in sorted(groups.items()):
+            latencies = [s[2] for s in samples]
+            errors = [s for s in samples if s[3] is None or s[3] >= 500]
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "errors": len(errors),
+                "throughput": len(samples) / elapsed if elapsed > 0 else 0.0,
+                "bytes": sum(s[4] for s in samples) / len(samples),
+                "latency": {
+                    **{f"p{q}": percentile(latencies, q) for q in PERCENTILES},
+                    "mean": sum(latencies) / len(latencies),
+                    "max": max(latencies),
+                },
+                "error_examples": sorted({s[5] or f"HTTP {s[3]}" for s in errors})[:5],
+            }
+        return {
+            "elapsed": elapsed,
+            "concurrency": concurrency,
+            "endpoints": endpoints,
+            "streams": self._report_streams(),
+        }
+
+    def _report_streams(self) -> dict:
+        samples = self.stream_samples
+        connect = [s[0] for s in samples if s[0] is not None]
+        errors = [s[3] for s in samples if s[3] is not None]
+        return {
+            "open": len(samples),
+            "errors": len(errors),
+            "events": sum(s[1] for s in samples),
+            "bytes": sum(s[2] for s in samples),
+            "connect": {
+                **{f"p{q}": percentile(connect, q) for q in PERCENTILES},
+                "max": max(connect, default=None),
+            },
+            "error_examples": sorted(set(errors))[:5],
+        }
+
+
+def print_report(report: dict):
+    """Print the report as a table, latencies in milliseconds."""
+    print(
+        f"{report['concurrency']} clients, {report['elapsed']:.1f} s\n\n"
+        f"{'endpoint':<20}{'requests':>9}{'errors':>8}{'req/s':>9}"
+        + "".join(f"{'p' + str(q) + ' ms':>10}" for q in PERCENTILES)
+        + f"{'max ms':>10}"
+    )
+    for endpoint, stats in report["endpoints"].items():
+        latency = stats["latency"]
+        print(
+            f"{endpoint:<20}{stats['requests']:>9}{stats['errors']:>8}"
+            f"{stats['throughput']:>9.2f}"
+            + "".join(f"{1e3 * latency[f'p{q}']:>10.1f}" for q in PERCENTILES)
+            + f"{1e3 * latency['max']:>10.1f}"
+        )
+        for example in stats["error_examples"]:
+            print(f"{'':<20}{example}")
+
+    streams = report["streams"]
+    if streams["open"]:
+        connect = streams["connect"]
+        print(
+            f"\n{streams['open']} streams held open, {streams['errors']} errors, "
+            f"{streams['events']} events received, connected in "
+            + ", ".join(
+                f"p{q} {1e3 * connect[f'p{q}']:.1f} ms"
+                for q in PERCENTILES
+                if connect[f"p{q}"] is not None
+            )
+        )
+        for example in streams["error_examples"]:
+            print(f"{'':<20}{example}")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LocalServer:
+    """
+    The backend served on a free local port, as a context manager.
+
+    Args:
+        server: ``"werkzeug"`` serves the app from a thread of this process
+            with a thread per request, ``"gunicorn"`` starts gunicorn and
+            ``"uvicorn"`` serves ``asgi_app`` as in the Docker image.
+        workers: Number of gunicorn or uvicorn worker processes.
+        threads: Number of threads of each worker serving the Flask routes.
+    """
+
+    def __init__(self, server: str = "werkzeug", workers: int = 1, threads: int = 8):
+        self.server = server
+        self.workers = workers
+        self.threads = threads
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._process = None
+        self._server = None
+
+    def __enter__(self):
+        if self.server == "gunicorn":
+            if shutil.which("gunicorn") is None:
+                raise ImportError("gunicorn is needed for --server gunicorn.")
+            self._process = subprocess.Popen(
+                [
+                    "gunicorn",
+                    "--bind",
+                    f"127.0.0.1:{self.port}",
+                    "--workers",
+                    str(self.workers),
+                    "--threads",
+                    str(self.threads),
+                    "--timeout",
+                    "0",
+                    "src.backend:app",
+                ],
+                env={**os.environ, "PYTHONPATH": str(Path(__file__).parent.parent)},
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        elif self.server == "uvicorn":
+            if shutil.which("uvicorn") is None:
+                raise ImportError("uvicorn is needed for --server uvicorn.")
+            self._process = subprocess.Popen(
+                [
+                    "uvicorn",
+                    "--host",
+                    "127.0.0.1",
+                    "--port",
+                    str(self.port),
+                    "--workers",
+                    str(self.workers),
+                    "--no-access-log",
+                    "src.backend:asgi_app",
+                ],
+                env={
+                    **os.environ,
+                    "PYTHONPATH": str(Path(__file__).parent.parent),
+                    "PATHVIEW_WSGI_THREADS": str(self.threads),
+                },
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        else:
+            from werkzeug.serving import make_server
+
+            from src.backend import app
+
+            # a log line per request would slow the server down
+            logging.getLogger("werkzeug").setLevel(logging.WARNING)
+            self._server = make_server("127.0.0.1", self.port, app, threaded=True)
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self._wait_until_healthy()
+        return self
+
+    def _wait_until_healthy(self, timeout: float = 60):
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            try:
+                with urllib.request.urlopen(f"{self.url}/health", timeout=1):
+                    return
+            except OSError:
+                if self._process is not None and self._process.poll() is not None:
+                    raise RuntimeError("The server exited on startup")
+                time.sleep(0.1)
+        raise TimeoutError(f"The server did not start within {timeout} s")
+
+    def __exit__(self, *exc):
+        if self._server is not None:
+            self._server.shutdown()
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait()
+
+
+def _parse_mix(specs) -> dict:
+    mix = dict(DEFAULT_MIX)
+    for spec in specs:
+        endpoint, _, weight = spec.partition("=")
+        if endpoint not in DEFAULT_MIX:
+            raise ValueError(
+                f"Unknown endpoint: {endpoint}. Must be one of {list(DEFAULT_MIX)}"
+            )
+        mix[endpoint] = float(weight)
+    return mix
+
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.load_test", description=__doc__.split("\n\n")[1]
+    )
+    parser.add_argument("--url", help="URL of a running server to test.")
+    parser.add_argument(
+        "--server",
+        choices=["werkzeug", "gunicorn", "uvicorn"],
+        default="werkzeug",
+        help="Server started locally if no --url is given.",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Gunicorn or uvicorn workers."
+    )
+    parser.add_argument(
+        "--threads", type=int, default=8, help="Threads of each worker."
+    )
+    parser.add_argument(
+        "--concurrency", "-c", type=int, default=4, help="Number of clients."
+    )
+    parser.add_argument(
+        "--duration", "-d", type=float, default=30, help="Duration in seconds."
+    )
+    parser.add_argument(
+        "--streams",
+        type=int,
+        default=4,
+        help="Connections to /logs/stream held open during the test.",
+    )
+    parser.add_argument(
+        "--graphs",
+        nargs="+",
+        default=[str(EXAMPLES_DIR)],
+        help="Graph files or directories, defaults to example_graphs/.",
+    )
+    parser.add_argument(
+        "--duration-scale",
+        type=float,
+        default=1.0,
+        help="Factor applied to the simulation duration of the graphs.",
+    )
+    parser.add_argument(
+        "--mix",
+        nargs="+",
+        default=[],
+        metavar="ENDPOINT=WEIGHT",
+        help=f"Weights of the endpoints, among {', '.join(DEFAULT_MIX)}.",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument("--output", "-o", help="File the report is written to.")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = make_parser().parse_args(argv)
+    graphs = load_graphs(args.graphs, args.duration_scale)
+    mix = _parse_mix(args.mix)
+
+    if args.url is not None:
+        test = LoadTest(args.url, graphs, mix, seed=args.seed)
+        report = test.run(args.concurrency, args.duration, args.streams)
+    else:
+        with LocalServer(args.server, args.workers, args.threads) as server:
+            test = LoadTest(server.url, graphs, mix, seed=args.seed)
+            report = test.run(args.concurrency, args.duration, args.streams)
+
+    report["settings"] = {
+        "url": args.url,
+        "server": None if args.url else args.server,
+        "workers": args.workers,
+        "threads": args.threads,
+        "mix": mix,
+        "streams": args.streams,
+        "duration_scale": args.duration_scale,
+    }
+    print_report(report)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    errors = report["endpoints"].get("all", {}).get("errors")
+    return 1 if errors or report["streams"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
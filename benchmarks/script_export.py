@@ -0,0 +1,75 @@
+"""
+Benchmark of the export of graphs to Python scripts.
+
+For every graph in ``example_graphs/``, times ``convert_graph_to_python``
+without caches (the Jinja environment, compiled templates and block
+signatures are dropped before every export, as when they were rebuilt for
+every request) and with the caches warm, then the throughput of warm exports
+from concurrent threads.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.script_export
+"""
+
+import copy
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from pathview.convert_to_python import convert_graph_to_python, get_environment
+from pathview.pathsim_utils import signature_parameters
+
+EXAMPLES_DIR = Path(__file__).parent.parent / "example_graphs"
+REPEATS = 20
+THREADS = 8
+
+
+def clear_caches():
+    get_environment.cache_clear()
+    signature_parameters.cache_clear()
+
+
+def best_time(graph_data, before=None):
+    """Best wall time of ``REPEATS`` exports in milliseconds."""
+    timings = []
+    for _ in range(REPEATS):
+        # converting modifies the graph data
+        data = copy.deepcopy(graph_data)
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        convert_graph_to_python(data)
+        timings.append(time.perf_counter() - start)
+    return 1e3 * min(timings)
+
+
+def throughput(graphs, n_exports):
+    """Warm exports per second from ``THREADS`` threads."""
+    copies = [copy.deepcopy(graphs[i % len(graphs)]) for i in range(n_exports)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        list(executor.map(convert_graph_to_python, copies))
+    return n_exports / (time.perf_counter() - start)
+
+
+def main():
+    graphs = {}
+    for filename in sorted(EXAMPLES_DIR.glob("*.json")):
+        with open(filename) as f:
+            graphs[filename.stem] = json.load(f)
+
+    print(f"{'example':<22}{'uncached ms':>12}{'cached ms':>12}{'speedup':>9}")
+    for name, graph_data in graphs.items():
+        uncached = best_time(graph_data, before=clear_caches)
+        cached = best_time(graph_data)
+        print(f"{name:<22}{uncached:>12.2f}{cached:>12.2f}{uncached / cached:>8.1f}x")
+
+    rate = throughput(list(graphs.values()), n_exports=50 * THREADS)
+    print(f"\n{THREADS} threads: {rate:.0f} exports/s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+"""
+Benchmark suite of the simulation pipeline.
+
+Every graph is timed stage by stage, as the server processes a /run-pathsim
+request: model ``build``, simulation ``run``, ``plot`` construction,
+``json`` serialisation of the response payload (figure and CSV data) and
+``convert`` to a Python script with ``convert_graph_to_python``. Each stage is
+repeated and its best and median wall times are stored, with the versions and
+commit they were measured on, in a JSON file.
+
+When a baseline results file is given, stages whose best time grew by more
+than the threshold (and by more than the noise floor) are reported as
+regressions and the exit status is 1.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.suite --output before.json
+    # ... change the code ...
+    python -m benchmarks.suite --baseline before.json --threshold 0.2
+
+Graphs default to ``example_graphs/``; any graph files or directories can be
+given instead. Synthetic graphs of ``pathview.synthetic`` track how the stages
+scale with the number of blocks::
+
+    python -m benchmarks.suite --synthetic chain:10 chain:1000 random:10000 \\
+        --stages build run
+"""
+
+import argparse
+import copy
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pathsim
+
+from pathview import __version__, serialization
+from pathview.cli import find_graphs
+from pathview.convert_to_python import convert_graph_to_python
+from pathview.figures import make_csv_payload, make_plot
+from pathview.pathsim_utils import make_pathsim_model
+from pathview.results import SimulationResults
+from pathview.synthetic import TOPOLOGIES, generate_graph
+
+EXAMPLES_DIR = Path(__file__).parent.parent / "example_graphs"
+
+STAGES = ("build", "run", "plot", "json", "convert")
+
+RESULTS_FORMAT = 1
+
+# relative slowdown of the best time above which a stage has regressed
+DEFAULT_THRESHOLD = 0.2
+
+# absolute slowdown in seconds below which differences are noise
+DEFAULT_NOISE_FLOOR = 1e-3
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def benchmark_graph(graph_data: dict, repeats: int = 3, stages=STAGES) -> dict:
+    """
+    Time the stages of the pipeline for one graph.
+
+    Args:
+        graph_data: The graph data.
+        repeats: Number of times each stage is run.
+        stages: The stages to time, among ``STAGES``. The stages a timed
+            stage depends on are run but not timed.
+
+    Returns:
+        A dictionary mapping each timed stage to its ``min`` and ``median``
+        wall times in seconds and the individual ``times``.
+    """
+    graph_data = copy.deepcopy(graph_data)
+    graph_data.setdefault("solverParams", {})["log"] = "false"
+
+    last = max(STAGES.index(stage) for stage in stages)
+    times = {stage: [] for stage in STAGES}
+    for _ in range(repeats):
+        # building and converting the model modify the graph data
+        model_data = copy.deepcopy(graph_data)
+        script_data = copy.deepcopy(graph_data)
+        elapsed, (simulation, duration) = _timed(lambda: make_pathsim_model(model_data))
+        times["build"].append(elapsed)
+
+        if last < STAGES.index("run"):
+            continue
+        elapsed, _ = _timed(lambda: simulation.run(duration))
+        times["run"].append(elapsed)
+        if last < STAGES.index("plot"):
+            continue
+
+        results = SimulationResults.from_blocks(simulation.blocks)
+        elapsed, fig = _timed(lambda: make_plot(results))
+        times["plot"].append(elapsed)
+
+        payload = {"plot": fig, "csv_data": make_csv_payload(results.scopes)}
+        elapsed, _ = _timed(lambda: serialization.dumps(payload))
+        times["json"].append(elapsed)
+
+        elapsed, _ = _timed(lambda: convert_graph_to_python(script_data))
+        times["convert"].append(elapsed)
+
+    return {
+        stage: {
+            "min": min(values),
+            "median": statistics.median(values),
+            "times": values,
+        }
+        for stage, values in times.items()
+        if stage in stages
+    }
+
+
+def _commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_graphs(graph_paths=(), synthetic=()) -> dict:
+    """
+    Load graph files and generate synthetic graphs.
+
+    Args:
+        graph_paths: Paths of the graph files, named after their file name.
+        synthetic: ``"<topology>:<number of blocks>"`` specifications of
+            synthetic graphs, named ``<topology>_<number of blocks>``.
+
+    Raises:
+        ValueError: If a synthetic graph specification is invalid.
+
+    Returns:
+        The graph data keyed by graph name.
+    """
+    graphs = {}
+    for path in graph_paths:
+        with open(path) as f:
+            graphs[Path(path).stem] = json.load(f)
+    for spec in synthetic:
+        topology, _, size = spec.partition(":")
+        if not size.isdigit():
+            raise ValueError(f"Invalid synthetic graph: {spec}, e.g. chain:1000")
+        graphs[f"{topology}_{size}"] = generate_graph(topology, int(size))
+    return graphs
+
+
+def run_suite(graphs: dict, repeats: int = 3, stages=STAGES) -> dict:
+    """
+    Benchmark graphs.
+
+    Graphs that can't be built (e.g. missing optional dependencies) or fail
+    in any stage are listed in ``skipped`` instead of failing the suite.
+
+    Args:
+        graphs: The graph data keyed by graph name, see ``load_graphs``.
+        repeats: Number of times each stage is run.
+        stages: The stages to time, among ``STAGES``.
+
+    Returns:
+        The results, with the ``meta`` data of the environment, the
+        ``benchmarks`` keyed by graph name and the ``skipped`` graphs.
+    """
+    benchmarks, skipped = {}, {}
+    for name, graph_data in graphs.items():
+        try:
+            benchmarks[name] = benchmark_graph(graph_data, repeats, stages)
+        except ImportError as e:
+            skipped[name] = str(e)
+        except Exception as e:
+            skipped[name] = f"failed, {type(e).__name__}: {e}"
+
+    return {
+        "format": RESULTS_FORMAT,
+        "meta": {
+            "commit": _commit(),
+            "date": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pathsim": getattr(pathsim, "__version__", "unknown"),
+            "pathview": __version__,
+            "repeats": repeats,
+        },
+        "benchmarks": benchmarks,
+        "skipped": skipped,
+    }
+
+
+def compare_results(
+    results: dict,
+    baseline: dict,
+    threshold: float = DEFAULT_THRESHOLD,
+    noise_floor: float = DEFAULT_NOISE_FLOOR,
+) -> list[dict]:
+    """
+    Compare results with a baseline.
+
+    Only graphs and stages present in both are compared, on their best times.
+
+    Args:
+        results: The results of ``run_suite``.
+        baseline: Earlier results of ``run_suite``.
+        threshold: Relative slowdown above which a stage has regressed,
+            e.g. 0.2 for 20 %.
+        noise_floor: Absolute slowdown in seconds below which a stage has not
+            regressed, whatever the relative slowdown.
+
+    Returns:
+        One dictionary per compared stage with the ``graph``, ``stage``,
+        ``baseline`` and ``current`` best times, their ``ratio`` and whether
+        the stage ``regressed``.
+    """
+    comparisons = []
+    for graph, stages in results["benchmarks"].items():
+        baseline_stages = baseline["benchmarks"].get(graph, {})
+        for stage, timing in stages.items():
+            if stage not in baseline_stages:
+                continue
+            before, after = baseline_stages[stage]["min"], timing["min"]
+            ratio = after / before if before > 0 else float("inf")
+            comparisons.append(
+                {
+                    "graph": graph,
+                    "stage": stage,
+                    "baseline": before,
+                    "current": after,
+                    "ratio": ratio,
+                    "regressed": ratio > 1 + threshold and after - before > noise_floor,
+                }
+            )
+    return comparisons
+
+
+def print_results(results: dict, comparisons=None):
+    """Print the best times in milliseconds, and the ratios to the baseline."""
+    ratios = {(c["graph"], c["stage"]): c for c in comparisons or []}
+    print(f"{'graph':<22}" + "".join(f"{stage:>16}" for stage in STAGES))
+    for graph, stages in results["benchmarks"].items():
+        row = f"{graph:<22}"
+        for stage in STAGES:
+            if stage not in stages:
+                row += f"{'-':>16}"
+                continue
+            cell = f"{1e3 * stages[stage]['min']:.2f}"
+            comparison = ratios.get((graph, stage))
+            if comparison is not None:
+                mark = "!" if comparison["regressed"] else " "
+                cell += f" x{comparison['ratio']:.2f}{mark}"
+            row += f"{cell:>16}"
+        print(row)
+    for graph, reason in results["skipped"].items():
+        print(f"{graph:<22}skipped ({reason})")
+
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.suite", description=__doc__.split("\n\n")[1]
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        help="Graph JSON files or directories, defaults to example_graphs/ "
+        "unless synthetic graphs are given.",
+    )
+    parser.add_argument(
+        "--synthetic",
+        nargs="+",
+        default=[],
+        metavar="TOPOLOGY:SIZE",
+        help=f"Synthetic graphs, topologies are {', '.join(TOPOLOGIES)}.",
+    )
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=STAGES,
+        default=list(STAGES),
+        help="Stages to time, defaults to all.",
+    )
+    parser.add_argument(
+        "--repeats", "-r", type=int, default=3, help="Number of runs per stage."
+    )
+    parser.add_argument("--output", "-o", help="File the results are written to.")
+    parser.add_argument("--baseline", "-b", help="Results file to compare with.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Relative slowdown failing the run, e.g. 0.2 for 20%%.",
+    )
+    parser.add_argument(
+        "--noise-floor",
+        type=float,
+        default=DEFAULT_NOISE_FLOOR,
+        help="Absolute slowdown in seconds ignored as noise.",
+    )
+    return parser
+
+
+def main(argv=None) -> int:
+    args = make_parser().parse_args(argv)
+    paths = args.paths
+    if not paths and not args.synthetic:
+        paths = [str(EXAMPLES_DIR)]
+    graphs = load_graphs(find_graphs(paths), args.synthetic)
+    results = run_suite(graphs, repeats=args.repeats, stages=args.stages)
+
+    comparisons = None
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparisons = compare_results(
+            results, baseline, args.threshold, args.noise_floor
+        )
+        results["comparison"] = {
+            "baseline": baseline["meta"],
+            "threshold": args.threshold,
+            "noise_floor": args.noise_floor,
+            "stages": comparisons,
+        }
+
+    print_results(results, comparisons)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    regressions = [c for c in comparisons or [] if c["regressed"]]
+    if regressions:
+        print(f"\n{len(regressions)} stage(s) slower than the baseline by more than")
+        print(f"{args.threshold:.0%}:")
+        for c in regressions:
+            print(f"  {c['graph']} {c['stage']}: x{c['ratio']:.2f}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
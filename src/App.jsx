@@ -1,5 +1,5 @@
 // * Imports *
-import { useState, useCallback, useEffect, useRef, version } from 'react';
+import { useState, useCallback, useEffect, useMemo, useRef, version } from 'react';
 import {
   ReactFlowProvider,
   useReactFlow,
@@ -64,8 +64,7 @@ const DnDFlow = () => {
   const [copiedNode, setCopiedNode] = useState(null);
   const [copyFeedback, setCopyFeedback] = useState('');
   const ref = useRef(null);
-  const [csvData, setCsvData] = useState(null);
-  const [htmlData, setHtmlData] = useState(null);
+  const [resultId, setResultId] = useState(null);
   const reactFlowWrapper = useRef(null);
   // const [nodes, setNodes, onNodesChange] = useNodesState(initialNodes);
   // const [edges, setEdges, onEdgesChange] = useEdgesState([]);
@@ -77,7 +76,13 @@ const DnDFlow = () => {
   const onToggleLogs = useCallback(() => setDockOpen(o => !o), []);
   const [logLines, setLogLines] = useState([]);
   const sseRef = useRef(null);
+  const [runProgress, setRunProgress] = useState(null);
+  const progressRef = useRef(null);
+  // full-accuracy run refining a preview: { runId, cancelToken, source }
+  const refineRef = useRef(null);
   const append = (line) => setLogLines((prev) => [...prev, line]);
+  // log lines arrive in batches, one line per row of the message
+  const appendBatch = (data) => setLogLines((prev) => [...prev, ...data.split('\n')]);
 
   // for version information
   const [versionInfo, setVersionInfo] = useState(null);
@@ -607,24 +612,15 @@ const DnDFlow = () => {
   };
 
   const downloadCsv = async () => {
-    if (!csvData) return;
-
-    const { time, series } = csvData;
-    const labels = Object.keys(series);
-    const header = ["time", ...labels].join(",");
-    const rows = [header];
-
-    time.forEach((t, i) => {
-      const row = [t];
-      for (const label of labels) {
-        const val = series[label][i] ?? "NaN";
-        row.push(val);
-      }
-      rows.push(row.join(","));
-    });
+    if (!resultId) return;
 
-    const csvString = rows.join("\n");
-    const blob = new Blob([csvString], { type: "text/csv" });
+    // the backend streams the CSV, with one time column per scope
+    const response = await fetch(getApiEndpoint(`/results/${resultId}/export?format=csv`));
+    if (!response.ok) {
+      alert('Simulation results are no longer available, please run the simulation again.');
+      return;
+    }
+    const blob = await response.blob();
     const filename = `simulation_${new Date().toISOString().replace(/[:.]/g, "-")}.csv`;
 
     try {
@@ -657,7 +653,15 @@ const DnDFlow = () => {
   };
 
   const downloadHtml = async () => {
-    const blob = new Blob([htmlData], { type: "text/html" });
+    if (!resultId) return;
+
+    // standalone: plotly.js is inlined so that the file also works offline
+    const response = await fetch(getApiEndpoint(`/results/${resultId}/html?standalone=true`));
+    if (!response.ok) {
+      alert('Simulation results are no longer available, please run the simulation again.');
+      return;
+    }
+    const blob = await response.blob();
     const filename = `simulation_${new Date().toISOString().replace(/[:.]/g, "-")}.html`;
 
     try {
@@ -761,7 +765,61 @@ const DnDFlow = () => {
     }
   };
   // Function to run pathsim simulation
-  const runPathsim = async () => {
+  // stop following the refinement of a preview, and cancel it
+  const cancelRefinement = useCallback(() => {
+    const refinement = refineRef.current;
+    if (!refinement) return;
+    refineRef.current = null;
+    refinement.source.close();
+    fetch(getApiEndpoint(`/progress/${refinement.runId}`), {
+      method: 'DELETE',
+      headers: { 'X-Cancel-Token': refinement.cancelToken },
+    }).catch(() => {});
+  }, []);
+
+  // follow the refinement of a preview and show its result when it is done
+  const followRefinement = ({ run_id: runId, cancel_token: cancelToken }) => {
+    const source = new EventSource(getApiEndpoint(`/progress/${runId}/stream`));
+    refineRef.current = { runId, cancelToken, source };
+    source.onmessage = async (evt) => {
+      if (refineRef.current?.runId !== runId) { source.close(); return; }
+      const snapshot = JSON.parse(evt.data);
+      setRunProgress(snapshot);
+      if (!['done', 'failed', 'cancelled', 'unknown'].includes(snapshot.state)) return;
+      source.close();
+      refineRef.current = null;
+      if (snapshot.state !== 'done') return;
+      const response = await fetch(getApiEndpoint(`/results/${runId}/plot`));
+      const result = await response.json();
+      if (result.success) {
+        setSimulationResults(result.plot);
+        setResultId(runId);
+      }
+    };
+    source.onerror = () => {
+      source.close();
+      if (refineRef.current?.runId === runId) refineRef.current = null;
+    };
+  };
+
+  // a change of the graph (not of the layout or selection) supersedes the
+  // refinement of the last preview
+  const graphKey = useMemo(() => JSON.stringify({
+    nodes: nodes.map((node) => [node.id, node.data]),
+    edges: edges.map((edge) => [edge.source, edge.sourceHandle, edge.target, edge.targetHandle]),
+    solverParams,
+    globalVariables,
+    events,
+    pythonCode,
+  }), [nodes, edges, solverParams, globalVariables, events, pythonCode]);
+  useEffect(() => { cancelRefinement(); }, [graphKey, cancelRefinement]);
+
+  // mode 'preview' returns a coarse result first, refined in the background
+  const runPathsim = async (mode) => {
+    const preview = mode === 'preview';
+    // the run supersedes the refinement of the last preview
+    const refinementToken = refineRef.current?.cancelToken;
+    cancelRefinement();
     setDockOpen(true);
     setLogLines([]);
 
@@ -770,9 +828,25 @@ const DnDFlow = () => {
     sseRef.current = es;
 
     es.addEventListener('start', () => append('log stream connected…'));
-    es.onmessage = (evt) => append(evt.data);
+    es.onmessage = (evt) => appendBatch(evt.data);
     es.onerror = () => { append('log stream error'); es.close(); sseRef.current = null; };
 
+    // progress and ETA of the run, streamed until it is finished
+    const runId = crypto.randomUUID();
+    setRunProgress(null);
+    if (progressRef.current) progressRef.current.close();
+    const progressSource = new EventSource(getApiEndpoint(`/progress/${runId}/stream`));
+    progressRef.current = progressSource;
+    progressSource.onmessage = (evt) => {
+      const snapshot = JSON.parse(evt.data);
+      setRunProgress(snapshot);
+      if (['done', 'failed', 'cancelled', 'unknown'].includes(snapshot.state)) {
+        progressSource.close();
+        progressRef.current = null;
+      }
+    };
+    progressSource.onerror = () => { progressSource.close(); progressRef.current = null; };
+
     try {
       const graphData = {
         nodes,
@@ -788,9 +862,24 @@ const DnDFlow = () => {
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ graph: graphData }),
+        body: JSON.stringify({
+          graph: graphData,
+          run_id: runId,
+          cancel_token: crypto.randomUUID(),
+          refinement_token: refinementToken,
+          mode: preview ? 'preview' : 'full',
+        }),
       });
 
+      // The server is busy: the run was not queued, retry later
+      if (response.status === 429 || response.status === 503) {
+        const busy = await response.json().catch(() => ({}));
+        const retryAfter = response.headers.get('Retry-After') || busy.retry_after;
+        if (sseRef.current) { sseRef.current.close(); sseRef.current = null; }
+        alert(`${busy.error || 'The server is busy'}. Try again in ${retryAfter} s.`);
+        return;
+      }
+
       // Check if response is ok first
       if (!response.ok) {
         throw new Error(`HTTP ${response.status}: ${response.statusText}`);
@@ -816,9 +905,9 @@ const DnDFlow = () => {
       if (result.success) {
         // Store results and switch to results tab
         setSimulationResults(result.plot);
-        setCsvData(result.csv_data);
-        setHtmlData(result.html);
+        setResultId(result.result_id);
         setActiveTab('results');
+        if (result.refinement) followRefinement(result.refinement);
       } else {
         alert(`Error running Pathsim simulation: ${result.error}`);
       }
@@ -1156,6 +1245,7 @@ const DnDFlow = () => {
                 selectedNode, selectedEdge,
                 deleteSelectedNode, deleteSelectedEdge,
                 saveGraph, loadGraph, resetGraph, saveToPython, runPathsim,
+                runPreview: () => runPathsim('preview'),
                 shareGraphURL,
                 dockOpen, setDockOpen, onToggleLogs,
                 showKeyboardShortcuts, setShowKeyboardShortcuts,
@@ -1168,7 +1258,8 @@ const DnDFlow = () => {
               open={dockOpen}
               onClose={() => setDockOpen(false)}
               lines={logLines}
-              progress={null}
+              progress={runProgress ? 100 * runProgress.fraction : null}
+              eta={runProgress ? runProgress.eta : null}
             />
 
             {/* Node Sidebar */}
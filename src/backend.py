@@ -1,19 +1,43 @@
 import os
 import json
-from flask import Flask, request, jsonify
+import threading
+import time
+from contextlib import nullcontext
+from flask import Flask, request, jsonify, send_file, url_for, g
 from flask_cors import CORS
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.middleware.proxy_fix import ProxyFix
 
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import plotly
-import json as plotly_json
+import plotly.io
 import inspect
-import io
-from contextlib import redirect_stdout, redirect_stderr
 
-from pathview.convert_to_python import convert_graph_to_python
-from pathview.pathsim_utils import make_pathsim_model, map_str_to_object
-from pathsim.blocks import Scope, Spectrum
+from pathview.admission import AdmissionError, AdmissionQueue, QueueFull
+from pathview.convert_to_python import SCRIPT_VARIANTS, convert_graph_to_python
+from pathview.pathsim_utils import (
+    make_pathsim_model,
+    map_str_to_object,
+    signature_parameters,
+)
+from pathview.preview import PreviewSettings
+from pathview.profiling import BlockProfiler, SolverStats
+from pathview.progress import ProgressRegistry, ProgressTracker, RunIdInUse
+from pathview.result_cache import ResultCache
+from pathview.results import SimulationResults
+from pathview.artifacts import ArtifactStore, versions
+from pathview.canonical import graph_hash
+from pathview.checkpoint import CheckpointStore, restore_state
+from pathview.asgi import HEARTBEAT_INTERVAL, AsgiApp, sse_endpoint, sse_poll_endpoint
+from pathview.sandbox import ExecutionError, ExecutionPool
+from pathview.solver_probe import probe_solvers
+from pathview.streaming import EventChannel, format_sse
+from pathview.log_stream import CoalescingLogHandler
+from pathview.export import EXPORT_FORMATS, export_scopes
+from pathview.figures import csv_payload_size, make_csv_payload, make_plot
+from pathview import serialization
+from pathview.metrics import MetricsRegistry, resident_memory_bytes
+from pathview.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from pathview.timing import PhaseTimer, phase
 
 # Sphinx imports for docstring processing
 from docutils.core import publish_parts
@@ -21,7 +45,7 @@ from docutils.core import publish_parts
 # imports for logging progress
 from flask import Response, stream_with_context
 import logging
-from queue import Queue, Empty
+from queue import Empty
 
 
 def docstring_to_html(docstring):
@@ -58,17 +82,141 @@ def docstring_to_html(docstring):
         return f"<pre>Error parsing docstring: {str(e)}\n\n{escaped}</pre>"
 
 
+class NumpyJSONProvider(DefaultJSONProvider):
+    """JSON provider serialising NumPy arrays natively (with orjson if installed)."""
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return serialization.dumps(obj, default=self.default).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        with phase("json_encode"):
+            body = serialization.dumps(obj, default=self.default)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
 # Configure Flask app for Cloud Run
 app = Flask(__name__, static_folder="../dist", static_url_path="")
+app.json = NumpyJSONProvider(app)
+
+# Number of reverse proxies in front of the app whose X-Forwarded-* headers
+# are trusted, so that request.remote_addr is the address of the client
+TRUSTED_PROXIES = int(os.getenv("PATHVIEW_TRUSTED_PROXIES", 0))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(
+        app.wsgi_app,
+        x_for=TRUSTED_PROXIES,
+        x_proto=TRUSTED_PROXIES,
+        x_host=TRUSTED_PROXIES,
+    )
+
+
+### per-request phase timing and metrics
+
+metrics = MetricsRegistry()
+request_duration = metrics.histogram(
+    "pathview_request_duration_seconds",
+    "Time spent handling requests, until the response is returned.",
+    ["endpoint"],
+)
+phase_duration = metrics.histogram(
+    "pathview_phase_duration_seconds",
+    "Time spent in each phase of a request.",
+    ["endpoint", "phase"],
+)
+requests_total = metrics.counter(
+    "pathview_requests_total", "Number of handled requests.", ["endpoint", "status"]
+)
+requests_in_flight = metrics.gauge(
+    "pathview_requests_in_flight", "Number of requests being handled."
+)
+metrics.gauge(
+    "process_resident_memory_bytes",
+    "Resident memory size of the worker in bytes.",
+    func=resident_memory_bytes,
+)
+
+
+@app.before_request
+def start_request_timer():
+    g.timer = PhaseTimer()
+    g.timer_token = g.timer.bind()
+    requests_in_flight.inc()
+
+
+# registered before compress_response so that it runs after it and
+# includes the compression time
+@app.after_request
+def record_request_timings(response):
+    timer = g.get("timer")
+    if timer is None:
+        return response
+
+    endpoint = request.endpoint or "unknown"
+    for name, duration in timer.phases.items():
+        phase_duration.observe(duration, endpoint=endpoint, phase=name)
+    total = timer.elapsed
+    request_duration.observe(total, endpoint=endpoint)
+    requests_total.inc(endpoint=endpoint, status=response.status_code)
+
+    server_timing = timer.server_timing()
+    total_timing = f"total;dur={1e3 * total:.3f}"
+    response.headers["Server-Timing"] = (
+        f"{server_timing}, {total_timing}" if server_timing else total_timing
+    )
+    return response
+
+
+@app.teardown_request
+def stop_request_timer(exc):
+    timer = g.pop("timer", None)
+    if timer is not None:
+        timer.unbind(g.pop("timer_token"))
+        requests_in_flight.dec()
+
+
+# responses above this size are compressed if the client accepts it
+COMPRESSION_THRESHOLD = int(
+    os.getenv("PATHVIEW_COMPRESSION_THRESHOLD", serialization.COMPRESSION_THRESHOLD)
+)
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/html", "text/csv", "text/plain"}
+
+
+@app.after_request
+def compress_response(response):
+    """Compress large responses with gzip or brotli, as negotiated by the client."""
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(serialization.SUPPORTED_ENCODINGS)
+    if encoding is None or response.content_length < COMPRESSION_THRESHOLD:
+        return response
+
+    with phase("compress"):
+        response.set_data(serialization.compress(response.get_data(), encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
 
 # Configure CORS based on environment
 if os.getenv("FLASK_ENV") == "production":
     # Production: Allow Cloud Run domains and common domains
+    CORS_ORIGINS = ["*"]  # Allow all origins for Cloud Run
     CORS(
         app,
         resources={
             r"/*": {
-                "origins": ["*"],  # Allow all origins for Cloud Run
+                "origins": CORS_ORIGINS,
                 "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
                 "allow_headers": ["Content-Type", "Authorization"],
             }
@@ -76,54 +224,139 @@ if os.getenv("FLASK_ENV") == "production":
     )
 else:
     # Development: Only allow localhost
+    CORS_ORIGINS = ["http://localhost:5173", "http://localhost:3000"]
     CORS(
         app,
-        resources={
-            r"/*": {"origins": ["http://localhost:5173", "http://localhost:3000"]}
-        },
+        resources={r"/*": {"origins": CORS_ORIGINS}},
         supports_credentials=True,
     )
 
 
+# Cache of finished simulation results, keyed by result id.
+# Disk-backed scope recordings live in a run directory per result and are
+# deleted when the result is evicted.
+result_cache = ResultCache(
+    max_entries=int(os.getenv("PATHVIEW_RESULT_CACHE_SIZE", 8)),
+    root_dir=os.getenv("PATHVIEW_RESULTS_DIR"),
+)
+metrics.counter(
+    "pathview_result_cache_hits_total",
+    "Lookups of cached results that found the result.",
+    func=lambda: result_cache.hits,
+)
+metrics.counter(
+    "pathview_result_cache_misses_total",
+    "Lookups of cached results that did not find the result.",
+    func=lambda: result_cache.misses,
+)
+metrics.gauge(
+    "pathview_result_cache_entries",
+    "Number of results in the cache.",
+    func=lambda: len(result_cache),
+)
+
+# Checkpoints of simulations that can be resumed
+checkpoint_store = CheckpointStore(root_dir=os.getenv("PATHVIEW_CHECKPOINT_DIR"))
+
+# Compiled model artifacts, keyed by canonical graph hash and versions
+artifact_store = ArtifactStore(root_dir=os.getenv("PATHVIEW_ARTIFACTS_DIR"))
+metrics.counter(
+    "pathview_artifact_hits_total",
+    "Models loaded from a compiled artifact.",
+    func=lambda: artifact_store.hits,
+)
+metrics.counter(
+    "pathview_artifact_misses_total",
+    "Models compiled because no valid artifact existed.",
+    func=lambda: artifact_store.misses,
+)
+
+# Cache of solver probes, keyed by the canonical graph hash
+probe_cache = ResultCache(max_entries=int(os.getenv("PATHVIEW_PROBE_CACHE_SIZE", 64)))
+metrics.counter(
+    "pathview_probe_cache_hits_total",
+    "Solver probes answered from the cache.",
+    func=lambda: probe_cache.hits,
+)
+metrics.counter(
+    "pathview_probe_cache_misses_total",
+    "Solver probes that had to be run.",
+    func=lambda: probe_cache.misses,
+)
+
+# Warm subprocesses executing the code of the Python editor, started on the
+# first call to /execute-python
+execution_pool = ExecutionPool(
+    size=int(os.getenv("PATHVIEW_EXEC_WORKERS", 2)),
+    timeout=float(os.getenv("PATHVIEW_EXEC_TIMEOUT", 10)),
+    memory_limit=int(os.getenv("PATHVIEW_EXEC_MEMORY_MB", 1024)) * 2**20,
+)
+metrics.counter(
+    "pathview_executions_total",
+    "Calls to /execute-python completed by a worker process.",
+    func=lambda: execution_pool.calls,
+)
+metrics.counter(
+    "pathview_execution_timeouts_total",
+    "Calls to /execute-python that exceeded the time limit.",
+    func=lambda: execution_pool.timeouts,
+)
+metrics.counter(
+    "pathview_execution_crashes_total",
+    "Calls to /execute-python whose worker process died.",
+    func=lambda: execution_pool.crashes,
+)
+
+
 ### for capturing logs from pathsim
 
+# Batches of log lines, streamed to every client of /logs/stream
+log_channel = EventChannel()
+metrics.gauge(
+    "pathview_log_subscribers",
+    "Number of clients streaming the logs.",
+    func=lambda: len(log_channel),
+)
+
+
+def render_log_batch(lines):
+    """Return the SSE frame of a batch of log lines, one line per data field."""
+    return format_sse("\n".join(lines))
+
 
 @app.get("/logs/stream")
 def logs_stream():
+    # served from the event loop by asgi_app, this route is used when the
+    # app runs under a WSGI server and holds a thread per client
     def gen():
-        yield "retry: 500\n\n"
-        while True:
-            try:
-                # Use a timeout to prevent indefinite blocking
-                line = log_queue.get(timeout=30)
-                for chunk in line.replace("\r", "\n").splitlines():
-                    yield f"data: {chunk}\n\n"
-            except Empty:
-                # Send a heartbeat to keep connection alive
-                yield "data: \n\n"
-            except Exception as e:
-                # Log the error and break the loop to close the connection
-                yield f"data: Error in log stream: {str(e)}\n\n"
-                break
+        with log_channel.subscribe() as subscription:
+            yield "retry: 500\n\n"
+            while True:
+                try:
+                    # Use a timeout to prevent indefinite blocking
+                    lines = subscription.get(timeout=HEARTBEAT_INTERVAL)
+                    yield render_log_batch(lines)
+                except Empty:
+                    # Send a heartbeat to keep connection alive
+                    yield format_sse("")
 
     return Response(gen(), mimetype="text/event-stream")
 
 
-log_queue = Queue()
-
-
-class QueueHandler(logging.Handler):
-    def emit(self, record):
-        try:
-            msg = self.format(record)
-            log_queue.put_nowait(msg)
-        except Exception:
-            pass
-
-
-qhandler = QueueHandler()
+# log records are published in batches, with progress lines summarised and
+# other lines rate limited (see pathview.log_stream)
+qhandler = CoalescingLogHandler(
+    log_channel,
+    interval=float(os.getenv("PATHVIEW_LOG_INTERVAL_MS", 100)) / 1e3,
+    max_lines_per_second=float(os.getenv("PATHVIEW_LOG_MAX_RATE", 50)),
+)
 qhandler.setLevel(logging.INFO)
 qhandler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+metrics.counter(
+    "pathview_log_lines_suppressed_total",
+    "Log lines dropped by the rate limit of /logs/stream.",
+    func=lambda: qhandler.suppressed,
+)
 
 root = logging.getLogger()
 root.setLevel(logging.INFO)
@@ -132,6 +365,195 @@ root.addHandler(qhandler)
 ### log backend ends
 
 
+### progress of simulation runs
+
+# Runs are registered under the "run_id" given by the client with their
+# request, so that their progress can be read while the request is pending
+progress_registry = ProgressRegistry()
+metrics.gauge(
+    "pathview_runs_active",
+    "Number of simulation runs queued, building or running.",
+    func=lambda: len(progress_registry.active()),
+)
+
+# seconds between progress events of /progress/<run_id>/stream
+PROGRESS_INTERVAL = 0.25
+# seconds a progress stream waits for its run to be registered
+PROGRESS_WAIT = 30.0
+
+
+@app.route("/progress/<string:run_id>", methods=["GET"])
+def run_progress(run_id):
+    progress = progress_registry.get(run_id)
+    if progress is None:
+        return jsonify({"success": False, "error": "Unknown run"}), 404
+    return jsonify({"success": True, **progress.snapshot()})
+
+
+# Cancels a run, which stops at its next timestep. Only the owner of the run
+# can cancel it, with the token of the run in the X-Cancel-Token header
+@app.route("/progress/<string:run_id>", methods=["DELETE"])
+def cancel_run(run_id):
+    progress = progress_registry.get(run_id)
+    if progress is None:
+        return jsonify({"success": False, "error": "Unknown run"}), 404
+    if not progress.authorizes(request.headers.get("X-Cancel-Token")):
+        return jsonify({"success": False, "error": "Invalid cancel token"}), 403
+    if not progress.finished:
+        progress.cancel()
+    return jsonify({"success": True, **progress.snapshot()})
+
+
+def progress_poller(run_id):
+    """
+    Return the ``poll`` function of a progress stream (see ``sse_poll_endpoint``).
+
+    The stream can be opened before the request running the simulation
+    arrives: it waits up to ``PROGRESS_WAIT`` seconds for the run to appear,
+    and ends after the final state of the run.
+    """
+    deadline = time.monotonic() + PROGRESS_WAIT
+
+    def poll():
+        progress = progress_registry.get(run_id)
+        if progress is None:
+            if time.monotonic() < deadline:
+                return None, False
+            snapshot = {"run_id": run_id, "state": "unknown"}
+            return format_sse(app.json.dumps(snapshot)), True
+        return format_sse(app.json.dumps(progress.snapshot())), progress.finished
+
+    return poll
+
+
+@app.get("/progress/<string:run_id>/stream")
+def run_progress_stream(run_id):
+    # served from the event loop by asgi_app, like /logs/stream
+    def gen():
+        poll = progress_poller(run_id)
+        yield "retry: 500\n\n"
+        while True:
+            time.sleep(PROGRESS_INTERVAL)
+            frame, done = poll()
+            if frame:
+                yield frame
+            if done:
+                return
+
+    return Response(gen(), mimetype="text/event-stream")
+
+
+### admission control of simulation runs
+
+# Runs of /run-pathsim, checkpoint resumes and solver probes wait in a
+# bounded queue for one of PATHVIEW_MAX_RUNS slots, by lane ("priority" of the
+# request) then round-robin between clients (see pathview.admission)
+#
+# Queued and running simulations each hold a thread of the WSGI pool of
+# asgi_app, so both are bounded to leave RESERVED_THREADS threads to the
+# other routes (/health, /metrics, /progress...): further runs are rejected
+# with 429 instead of stalling the whole server
+WSGI_THREADS = int(os.getenv("PATHVIEW_WSGI_THREADS", 8))
+RESERVED_THREADS = 2
+
+
+def admission_limits(threads, max_running, max_queued, reserved=RESERVED_THREADS):
+    """
+    Bound the number of running and queued runs to the threads of the pool.
+
+    Args:
+        threads: Number of threads serving requests.
+        max_running: Requested number of runs at a time.
+        max_queued: Requested number of runs waiting.
+        reserved: Number of threads kept for the other routes.
+
+    Returns:
+        The numbers of runs running and waiting at a time.
+    """
+    available = max(1, threads - reserved)
+    max_running = max(1, min(max_running, available))
+    max_queued = max(0, min(max_queued, available - max_running))
+    return max_running, max_queued
+
+
+MAX_RUNS, QUEUE_SIZE = admission_limits(
+    WSGI_THREADS,
+    max_running=int(os.getenv("PATHVIEW_MAX_RUNS", 2)),
+    max_queued=int(os.getenv("PATHVIEW_QUEUE_SIZE", 32)),
+)
+admission_queue = AdmissionQueue(
+    max_running=MAX_RUNS,
+    max_queued=QUEUE_SIZE,
+    max_queued_per_client=int(os.getenv("PATHVIEW_QUEUE_PER_CLIENT", 4)),
+    timeout=float(os.getenv("PATHVIEW_QUEUE_TIMEOUT", 60)),
+)
+metrics.gauge(
+    "pathview_queue_depth",
+    "Number of simulation runs waiting to be admitted.",
+    func=lambda: admission_queue.queued,
+)
+metrics.gauge(
+    "pathview_queue_running",
+    "Number of admitted simulation runs.",
+    func=lambda: admission_queue.running,
+)
+queue_wait = metrics.histogram(
+    "pathview_queue_wait_seconds",
+    "Time admitted simulation runs waited in the queue.",
+    ["lane"],
+)
+queue_rejected = metrics.counter(
+    "pathview_queue_rejected_total",
+    "Simulation runs rejected because the queue was full or they waited too long.",
+    ["lane", "reason"],
+)
+
+
+def client_id():
+    """
+    Id of the client of the request, for fairness between clients.
+
+    This is the address the request came from: forwarded addresses are only
+    used through ``ProxyFix`` when ``PATHVIEW_TRUSTED_PROXIES`` is set, never
+    from headers a client can set on its own.
+    """
+    return request.remote_addr or "unknown"
+
+
+def admit(lane, client=None):
+    """
+    Wait for a slot to run a simulation, see ``AdmissionQueue.admit``.
+
+    Args:
+        lane: The lane of the run.
+        client: The id of the client, that of the current request if None.
+
+    Raises:
+        AdmissionError: If the run was rejected.
+
+    Returns:
+        The ticket of the run, to release when it is done.
+    """
+    try:
+        with phase("queue"):
+            ticket = admission_queue.admit(client or client_id(), lane=lane)
+    except AdmissionError as e:
+        reason = "full" if isinstance(e, QueueFull) else "timeout"
+        queue_rejected.inc(lane=lane, reason=reason)
+        raise
+    queue_wait.observe(ticket.wait, lane=lane)
+    return ticket
+
+
+def rejection_response(error):
+    """Response to a rejected run: 429 if the queue is full, 503 if it timed out."""
+    response = jsonify(
+        {"success": False, "error": str(error), "retry_after": error.retry_after}
+    )
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response, 429 if isinstance(error, QueueFull) else 503
+
+
 # Serve React frontend for production
 @app.route("/")
 def serve_frontend():
@@ -142,6 +564,12 @@ def serve_frontend():
         return jsonify({"message": "PathView API", "status": "running"})
 
 
+# Prometheus metrics
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+
 # Health check endpoint for Cloud Run
 @app.route("/health", methods=["GET"])
 def health_check():
@@ -184,7 +612,7 @@ def get_all_default_values():
     try:
         all_default_values = {}
         for node_type, block_class in map_str_to_object.items():
-            parameters_for_class = inspect.signature(block_class.__init__).parameters
+            parameters_for_class = signature_parameters(block_class.__init__)
             default_values = {}
             for param in parameters_for_class:
                 if param != "self":  # Skip 'self' parameter
@@ -218,7 +646,7 @@ def get_default_values(node_type):
             return jsonify({"error": f"Unknown node type: {node_type}"}), 400
 
         block_class = map_str_to_object[node_type]
-        parameters_for_class = inspect.signature(block_class.__init__).parameters
+        parameters_for_class = signature_parameters(block_class.__init__)
         default_values = {}
         for param in parameters_for_class:
             if param != "self":  # Skip 'self' parameter
@@ -305,7 +733,16 @@ def convert_to_python():
             return jsonify({"error": "No graph data provided"}), 400
 
         # Generate the Python script directly using the imported function
-        script_content = convert_graph_to_python(graph_data)
+        variant = data.get("variant", "script")
+        if variant not in SCRIPT_VARIANTS:
+            return jsonify(
+                {
+                    "success": False,
+                    "error": f"Unknown script variant: {variant}. "
+                    f"Must be one of {list(SCRIPT_VARIANTS)}",
+                }
+            ), 400
+        script_content = convert_graph_to_python(graph_data, variant=variant)
 
         return jsonify(
             {
@@ -319,148 +756,344 @@ def convert_to_python():
         return jsonify({"success": False, "error": f"Server error: {str(e)}"}), 500
 
 
-# Helper function to extract CSV payload from scopes
-def make_csv_payload(scopes):
-    csv_payload = {"time": [], "series": {}}
-
-    max_len = 0
-    for scope in scopes:
-        time, values = scope.read()
-        max_len = max(max_len, len(time))
-        csv_payload["time"] = time.tolist()
-        for i, series in enumerate(values):
-            label = scope.labels[i] if i < len(scope.labels) else f"{scope.label} {i}"
-            csv_payload["series"][label] = series.tolist()
+# plotly.js bundled with the plotly package, served once and cached by browsers
+PLOTLYJS_PATH = os.path.join(
+    os.path.dirname(plotly.__file__), "package_data", "plotly.min.js"
+)
 
-    return csv_payload
 
+def plotlyjs_url():
+    """Versioned URL of the plotly.js bundle, so it can be cached forever."""
+    return url_for("plotlyjs", version=plotly.__version__, _external=True)
 
-def make_plot(simulation):
-    scopes = [block for block in simulation.blocks if isinstance(block, Scope)]
-    spectra = [block for block in simulation.blocks if isinstance(block, Spectrum)]
-    print(f"Found {len(scopes)} scopes and {len(spectra)} spectra")
 
-    # FIXME right now only the scopes are converted to CSV
-    # extra work is needed since spectra and scopes don't share the same x axis
-    csv_payload = make_csv_payload(scopes)
+# default number of points of the timestep history returned with "dt_trace"
+DT_TRACE_POINTS = 1000
 
-    # Share x only if there are only scopes or only spectra
-    shared_x = len(scopes) * len(spectra) == 0
-    n_rows = len(scopes) + len(spectra)
+# Results with more values than this (and all disk-backed results) are not
+# embedded as "csv_data" in the response of /run-pathsim, they are exported
+# from /results/<id>/export instead
+CSV_INLINE_LIMIT = int(os.getenv("PATHVIEW_CSV_INLINE_LIMIT", 200_000))
 
-    if n_rows == 0:
-        # No scopes or spectra to plot
-        return jsonify(
-            {
-                "success": True,
-                "plot": "{}",
-                "html": "<p>No scopes or spectra to display</p>",
-                "csv_data": csv_payload,
-                "message": "Pathsim simulation completed successfully",
-            }
-        )
-
-    absolute_vertical_spacing = 0.05
-    relative_vertical_spacing = absolute_vertical_spacing / n_rows
-    fig = make_subplots(
-        rows=n_rows,
-        cols=1,
-        shared_xaxes=shared_x,
-        subplot_titles=[scope.label for scope in scopes]
-        + [spec.label for spec in spectra],
-        vertical_spacing=relative_vertical_spacing,
-    )
 
-    # make scope plots
-    for i, scope in enumerate(scopes):
-        sim_time, data = scope.read()
-
-        for p, d in enumerate(data):
-            lb = scope.labels[p] if p < len(scope.labels) else f"port {p}"
-            if isinstance(scope, Spectrum):
-                d = abs(d)
-            fig.add_trace(
-                go.Scatter(x=sim_time, y=d, mode="lines", name=lb),
-                row=i + 1,
-                col=1,
-            )
-
-        fig.update_xaxes(title_text="Time", row=len(scopes), col=1)
+# Function to convert graph to pathsim and run simulation
+@app.route("/run-pathsim", methods=["POST"])
+def run_pathsim():
+    data = request.json
+    graph_data = data.get("graph")
+    if not graph_data:
+        return jsonify({"error": "No graph data provided"}), 400
+    return simulate(data, graph_data)
+
+
+# Continues a checkpointed simulation, until the (possibly longer)
+# simulation_duration of the graph or for "duration" more time units.
+# A modified "graph" (e.g. with changed parameters) starts a what-if branch,
+# the original checkpoint is kept unless the branch is saved under its id.
+@app.route("/checkpoints/<string:checkpoint_id>/resume", methods=["POST"])
+def resume_checkpoint(checkpoint_id):
+    data = request.json or {}
+    try:
+        checkpoint = checkpoint_store.load(checkpoint_id)
+    except (KeyError, ValueError):
+        return jsonify({"success": False, "error": "Unknown checkpoint"}), 404
 
-    # make spectrum plots
-    for i, spec in enumerate(spectra):
-        freq, data = spec.read()
+    graph_data = data.get("graph") or checkpoint["graph"]
+    return simulate(data, graph_data, state=checkpoint["state"])
 
-        for p, d in enumerate(data):
-            lb = spec.labels[p] if p < len(spec.labels) else f"port {p}"
-            d = abs(d)
-            fig.add_trace(
-                go.Scatter(x=freq, y=d, mode="lines", name=lb),
-                row=len(scopes) + i + 1,
-                col=1,
-            )
-        fig.update_xaxes(title_text="Frequency", row=len(scopes) + i + 1, col=1)
 
-    fig.update_layout(height=500 * (len(scopes) + len(spectra)), hovermode="x unified")
+@app.route("/checkpoints/<string:checkpoint_id>", methods=["DELETE"])
+def delete_checkpoint(checkpoint_id):
+    try:
+        checkpoint_store.delete(checkpoint_id)
+    except ValueError:
+        return jsonify({"success": False, "error": "Unknown checkpoint"}), 404
+    return jsonify({"success": True})
+
+
+# factor by which preview runs loosen the timesteps and tolerances
+PREVIEW_FACTOR = float(os.getenv("PATHVIEW_PREVIEW_FACTOR", 10))
+
+# Full-accuracy runs refining a preview, by the cancel token of the
+# refinement. A new run sending the token as "refinement_token" supersedes
+# (cancels) the refinement. Request and refine threads both change the
+# dictionary, always holding refinements_lock.
+refinements = {}
+refinements_lock = threading.Lock()
+
+
+def supersede_refinement(token):
+    """
+    Cancel the refinement with the cancel token ``token``, if any.
+
+    Args:
+        token: The cancel token of the refinement, as returned with the preview.
+    """
+    if not isinstance(token, str):
+        return
+    with refinements_lock:
+        superseded = refinements.pop(token, None)
+    if superseded is not None:
+        superseded.cancel()
+
+
+def refine(simulation, start_time, duration, progress, client):
+    """
+    Run a previewed model again at full accuracy, in a background thread.
+
+    The result is stored under the run id, see ``simulate``.
+
+    Args:
+        simulation: The model of the preview, with its solver settings restored.
+        start_time: The time the preview started at.
+        duration: The duration of the run.
+        progress: The progress of the refinement.
+        client: The id of the client, for its turn in the admission queue.
+    """
+    try:
+        try:
+            ticket = admit("batch", client=client)
+        except AdmissionError as e:
+            progress.finish(error=str(e))
+            return
+        with ticket:
+            if not progress.cancelled:
+                simulation.reset(time=start_time)
+                progress.start(start_time, start_time + duration)
+                with ProgressTracker(simulation, progress):
+                    simulation.run(duration)
+            if not progress.cancelled:
+                results = SimulationResults.from_blocks(
+                    simulation.blocks, time=simulation.time
+                )
+                result_cache.put(progress.run_id, results)
+            progress.finish()
+    except Exception as e:
+        progress.finish(error=str(e))
+    finally:
+        with refinements_lock:
+            if refinements.get(progress.token) is progress:
+                del refinements[progress.token]
+
+
+def simulate(data, graph_data, state=None):
+    """
+    Build and run a simulation and return the response of /run-pathsim.
+
+    Args:
+        data: The request options.
+        graph_data: The graph data of the model.
+        state: Optional checkpoint state to resume from.
+    """
+    result_id = progress = ticket = None
+    try:
+        # "disk" storage records scopes to memory-mapped files for long runs
+        storage = data.get("storage", "memory")
+        if storage not in ("memory", "disk"):
+            return jsonify({"error": f"Unknown storage: {storage}"}), 400
+
+        # "checkpoint" saves the final state so that the run can be continued,
+        # "checkpoint_interval" also saves it every so many time units
+        checkpoint_interval = data.get("checkpoint_interval")
+        checkpoint_id = None
+        if data.get("checkpoint") or checkpoint_interval:
+            checkpoint_id = data.get("checkpoint_id") or checkpoint_store.new_id()
+            try:
+                checkpoint_store.path(checkpoint_id)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+        # "mode": "preview" runs with loosened solver settings and decimated
+        # scopes, then refines the result with a full run of the same model
+        # in the background, see refine
+        mode = data.get("mode", "full")
+        if mode not in ("full", "preview"):
+            return jsonify({"error": f"Unknown mode: {mode}"}), 400
+        if mode == "preview" and (
+            storage == "disk" or checkpoint_id is not None or state is not None
+        ):
+            return jsonify(
+                {"error": "Preview runs can't use disk storage or checkpoints"}
+            ), 400
 
-    return fig, csv_payload
+        # "priority" is the lane of the run in the admission queue
+        lane = data.get("priority", admission_queue.lanes[0])
+        if lane not in admission_queue.lanes:
+            return jsonify({"error": f"Unknown priority: {lane}"}), 400
 
+        result_id = result_cache.new_id()
 
-# Function to convert graph to pathsim and run simulation
-@app.route("/run-pathsim", methods=["POST"])
-def run_pathsim():
-    try:
-        data = request.json
-        graph_data = data.get("graph")
-        if not graph_data:
-            return jsonify({"error": "No graph data provided"}), 400
+        # "run_id" registers the progress of the run, see /progress/<run_id>,
+        # and "cancel_token" is the secret to cancel it with
+        try:
+            progress = progress_registry.create(
+                data.get("run_id") or result_id,
+                state="queued",
+                token=data.get("cancel_token"),
+            )
+        except RunIdInUse as e:
+            return jsonify({"error": str(e)}), 409
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        my_simulation, duration = make_pathsim_model(graph_data)
+        # a new run supersedes the refinement of the preview it replaces
+        supersede_refinement(data.get("refinement_token"))
+        client = client_id()
 
-        # get the pathsim logger and add the queue handler
+        try:
+            ticket = admit(lane)
+        except AdmissionError as e:
+            progress.finish(error=str(e))
+            return rejection_response(e)
+        progress.set_state("building")
+
+        run_dir = result_cache.make_run_dir(result_id) if storage == "disk" else None
+
+        # "compiled" loads the built model from its artifact (compiling it on
+        # first use) instead of building it from the graph data
+        if data.get("compiled") and run_dir is None:
+            with phase("load_artifact"):
+                my_simulation, duration = artifact_store.load(graph_data)
+        else:
+            my_simulation, duration = make_pathsim_model(graph_data, scope_dir=run_dir)
+
+        not_restored = []
+        if state is not None:
+            with phase("restore_checkpoint"):
+                not_restored = restore_state(my_simulation, state)
+            if data.get("duration") is not None:
+                duration = float(data["duration"])
+            else:
+                duration -= my_simulation.time
+            if duration <= 0:
+                raise ValueError(
+                    f"Nothing to resume, the checkpoint is at t={my_simulation.time}"
+                )
+        end_time = my_simulation.time + duration
+
+        # get the pathsim logger and add the log stream handler
         logger = my_simulation.logger
         logger.addHandler(qhandler)
 
-        # Run the simulation
-        my_simulation.run(duration)
+        # "dt_trace" adds the (downsampled) timestep history to the stats
+        dt_trace = data.get("dt_trace", False)
+        if dt_trace is True:
+            dt_trace = DT_TRACE_POINTS
+        solver_stats = SolverStats(my_simulation, dt_trace_points=dt_trace or None)
+
+        def run(duration):
+            if not checkpoint_interval:
+                my_simulation.run(duration)
+                return
+            while (
+                my_simulation.time < end_time - 1e-12 * max(1.0, abs(end_time))
+                and not progress.cancelled
+            ):
+                my_simulation.run(
+                    min(float(checkpoint_interval), end_time - my_simulation.time)
+                )
+                checkpoint_store.save(checkpoint_id, graph_data, my_simulation)
+
+        # Run the simulation, profiling the blocks and events if asked for
+        profiler = BlockProfiler(my_simulation) if data.get("profile") else None
+        start_time = my_simulation.time
+        progress.start(start_time, end_time)
+        tracker = ProgressTracker(my_simulation, progress)
+        preview = (
+            PreviewSettings(my_simulation, duration, factor=PREVIEW_FACTOR)
+            if mode == "preview"
+            else nullcontext()
+        )
+        with phase("simulation_run"), solver_stats, tracker, preview:
+            if profiler is not None:
+                with profiler:
+                    run(duration)
+            else:
+                run(duration)
+
+        if progress.cancelled:
+            progress.finish()
+            result_cache.evict(result_id)
+            return jsonify(
+                {
+                    "success": False,
+                    "error": "The simulation was cancelled",
+                    "run_id": progress.run_id,
+                }
+            ), 409
 
-        # Generate the plot
-        try:
-            fig, csv_payload = make_plot(my_simulation)
-            print("Created plot figure")
+        skipped = []
+        if checkpoint_id is not None:
+            with phase("checkpoint"):
+                skipped = checkpoint_store.save(
+                    checkpoint_id, graph_data, my_simulation
+                )
+
+        results = SimulationResults.from_blocks(
+            my_simulation.blocks, time=my_simulation.time
+        )
+        result_cache.put(result_id, results, run_dir=run_dir)
+        progress.finish()
 
-            # Convert plot to JSON
+        # The figure is only built if asked for, it can also be fetched later
+        # from /results/<id>/plot or /results/<id>/html
+        plot_data = None
+        if data.get("plot", True):
             try:
-                plot_data = plotly_json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
-                plot_html = fig.to_html()
-                print("Converted plot to JSON and HTML")
-            except Exception as plot_error:
-                print(f"Error converting plot to JSON: {str(plot_error)}")
+                with phase("make_plot"):
+                    fig = make_plot(results)
+                    plot_data = app.json.dumps(fig) if fig is not None else "{}"
+            except Exception as plot_creation_error:
+                print(f"Error during plot creation: {str(plot_creation_error)}")
                 return jsonify(
                     {
                         "success": False,
-                        "error": f"Plot generation error: {str(plot_error)}",
+                        "error": f"Plot creation error: {str(plot_creation_error)}",
                     }
                 ), 500
 
-            return jsonify(
-                {
-                    "success": True,
-                    "plot": plot_data,
-                    "html": plot_html,
-                    "csv_data": csv_payload,
-                    "message": "Pathsim simulation completed successfully",
-                }
-            )
-
-        except Exception as plot_creation_error:
-            print(f"Error during plot creation: {str(plot_creation_error)}")
-            return jsonify(
-                {
-                    "success": False,
-                    "error": f"Plot creation error: {str(plot_creation_error)}",
-                }
-            ), 500
+        response = {
+            "success": True,
+            "plot": plot_data,
+            "result_id": result_id,
+            "run_id": progress.run_id,
+            "mode": mode,
+            "stats": solver_stats.report(),
+            "message": "Pathsim simulation completed successfully",
+        }
+        if run_dir is None and csv_payload_size(results.scopes) <= CSV_INLINE_LIMIT:
+            with phase("csv_payload"):
+                response["csv_data"] = make_csv_payload(results.scopes)
+        else:
+            response["export_url"] = url_for("export_results", result_id=result_id)
+        if profiler is not None:
+            response["profile"] = profiler.report()
+        if checkpoint_id is not None:
+            response["checkpoint"] = {
+                "id": checkpoint_id,
+                "time": my_simulation.time,
+                "skipped": skipped,
+            }
+        if state is not None:
+            response["not_restored"] = not_restored
+
+        # the refinement is stored as a result under its run id, it can be
+        # followed on /progress/<run_id> and fetched from /results/<run_id>/plot
+        if mode == "preview":
+            refinement = progress_registry.create(result_cache.new_id())
+            with refinements_lock:
+                refinements[refinement.token] = refinement
+            response["refinement"] = {
+                "run_id": refinement.run_id,
+                "cancel_token": refinement.token,
+            }
+            threading.Thread(
+                target=refine,
+                args=(my_simulation, start_time, duration, refinement, client),
+                name=f"refine-{refinement.run_id}",
+                daemon=True,
+            ).start()
+        return jsonify(response)
 
     except Exception as e:
         # Log the full error for debugging
@@ -468,78 +1101,175 @@ def run_pathsim():
 
         error_details = traceback.format_exc()
         print(f"Error in run_pathsim: {error_details}")
+        if progress is not None and not progress.finished:
+            progress.finish(error=str(e))
+        if result_id is not None:
+            result_cache.evict(result_id)
         return jsonify({"success": False, "error": f"Server error: {str(e)}"}), 500
+    finally:
+        if ticket is not None:
+            ticket.release()
 
 
-@app.route("/execute-python", methods=["POST"])
-def execute_python():
-    """Execute Python code and returns variables/functions."""
+# Plotly figure of a cached result
+@app.route("/results/<string:result_id>/plot", methods=["GET"])
+def result_plot(result_id):
+    results = result_cache.get(result_id)
+    if results is None:
+        return jsonify({"success": False, "error": "Unknown or expired result"}), 404
+
+    fig = make_plot(results)
+    return jsonify(
+        {"success": True, "plot": app.json.dumps(fig) if fig is not None else "{}"}
+    )
+
+
+# Standalone HTML page of a cached result
+# plotly.js is referenced from /vendor unless standalone=true is given
+@app.route("/results/<string:result_id>/html", methods=["GET"])
+def result_html(result_id):
+    results = result_cache.get(result_id)
+    if results is None:
+        return jsonify({"success": False, "error": "Unknown or expired result"}), 404
+
+    fig = make_plot(results)
+    if fig is None:
+        return Response("<p>No scopes or spectra to display</p>", mimetype="text/html")
+
+    standalone = request.args.get("standalone", "false") == "true"
+    html = plotly.io.to_html(
+        fig,
+        include_plotlyjs=True if standalone else plotlyjs_url(),
+        full_html=True,
+        validate=False,
+    )
+    return Response(html, mimetype="text/html")
+
+
+@app.route("/vendor/plotly-<string:version>.min.js", methods=["GET"])
+def plotlyjs(version):
+    if version != plotly.__version__:
+        return jsonify({"error": "Route not found"}), 404
+    return send_file(PLOTLYJS_PATH, mimetype="text/javascript", max_age=365 * 24 * 3600)
+
+
+# Streams the scope recordings of a cached result as a file
+@app.route("/results/<string:result_id>/export", methods=["GET"])
+def export_results(result_id):
+    results = result_cache.get(result_id)
+    if results is None:
+        return jsonify({"success": False, "error": "Unknown or expired result"}), 404
 
+    fmt = request.args.get("format", "csv")
+    time_base = request.args.get("time_base", "per_scope")
     try:
-        data = request.json
-        code = data.get("code", "")
+        chunks = export_scopes(results.scopes, fmt=fmt, time_base=time_base)
+    except (ValueError, ImportError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f"attachment; filename=simulation_{result_id}.{extension}"
+        },
+    )
 
-        if not code.strip():
-            return jsonify({"success": False, "error": "No code provided"}), 400
 
-        # Create a temporary namespace that includes current eval_namespace
-        temp_namespace = {}
-        # temp_namespace.update(globals())
+# Compiles a graph into a model artifact that /run-pathsim loads with "compiled"
+@app.route("/compile", methods=["POST"])
+def compile_graph():
+    data = request.json
+    graph_data = data.get("graph")
+    if not graph_data:
+        return jsonify({"error": "No graph data provided"}), 400
+    try:
+        with phase("compile"):
+            key = artifact_store.compile(graph_data)
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Compilation error: {str(e)}"}), 400
+
+    return jsonify(
+        {
+            "success": True,
+            "key": key,
+            "size": os.path.getsize(artifact_store.path(key)),
+            "versions": versions(),
+        }
+    )
 
-        # Capture stdout and stderr
-        stdout_capture = io.StringIO()
-        stderr_capture = io.StringIO()
 
+# Runs a short window of the simulation with candidate solvers and ranks them
+@app.route("/probe-solvers", methods=["POST"])
+def probe_solvers_endpoint():
+    data = request.json
+    graph_data = data.get("graph")
+    if not graph_data:
+        return jsonify({"error": "No graph data provided"}), 400
+    candidates = data.get("candidates")
+    window = data.get("window")
+    if candidates is not None and (
+        not isinstance(candidates, list)
+        or not all(isinstance(solver, str) for solver in candidates)
+    ):
+        return jsonify(
+            {"success": False, "error": "candidates must be a list of solver names"}
+        ), 400
+
+    key = "{}:{}:{}".format(
+        graph_hash(graph_data, exclude_solver_params=("log",)),
+        "default" if candidates is None else ",".join(candidates),
+        window,
+    )
+    probe = probe_cache.get(key)
+    cached = probe is not None
+    if not cached:
         try:
-            with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
-                exec(code, temp_namespace)
+            ticket = admit("batch")
+        except AdmissionError as e:
+            return rejection_response(e)
+        try:
+            with ticket, phase("probe"):
+                probe = probe_solvers(
+                    graph_data,
+                    candidates=candidates,
+                    window=float(window) if window is not None else None,
+                )
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        probe_cache.put(key, probe)
 
-            # Capture any output
-            output = stdout_capture.getvalue()
-            error_output = stderr_capture.getvalue()
+    return jsonify({"success": True, "cached": cached, **probe})
 
-            if error_output:
-                return jsonify({"success": False, "error": error_output}), 400
 
-            # Find new variables and functions
-            vars = set(temp_namespace.keys())
-            # new_vars = vars_after - vars_before
+@app.route("/execute-python", methods=["POST"])
+def execute_python():
+    """Execute Python code and returns variables/functions."""
 
-            # Filter out built-ins and modules, keep user-defined items
-            user_variables = {}
-            user_functions = []
+    try:
+        data = request.json
+        code = data.get("code", "")
 
-            for var_name in vars:
-                if not var_name.startswith("__"):
-                    value = temp_namespace[var_name]
-                    if callable(value) and hasattr(value, "__name__"):
-                        user_functions.append(var_name)
-                    else:
-                        # Try to serialize the value for display
-                        try:
-                            if isinstance(value, (int, float, str, bool, list, dict)):
-                                user_variables[var_name] = value
-                            else:
-                                user_variables[var_name] = str(value)
-                        except Exception:
-                            user_variables[var_name] = (
-                                f"<{type(value).__name__} object>"
-                            )
+        if not code.strip():
+            return jsonify({"success": False, "error": "No code provided"}), 400
 
-            return jsonify(
-                {
-                    "success": True,
-                    "output": output if output else None,
-                    "variables": user_variables,
-                    "functions": user_functions,
-                    "message": f"Executed successfully. Added {len(user_variables)} variables and {len(user_functions)} functions to namespace.",
-                }
-            )
+        # the code runs in a worker process, with time and memory limits,
+        # and the variables come back as previews (see pathview.sandbox)
+        try:
+            with phase("execute"):
+                result = execution_pool.execute(code)
+        except ExecutionError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
 
-        except SyntaxError as e:
-            return jsonify({"success": False, "error": f"Syntax Error: {str(e)}"}), 400
-        except Exception as e:
-            return jsonify({"success": False, "error": f"Runtime Error: {str(e)}"}), 400
+        if not result["success"]:
+            return jsonify(result), 400
+
+        result["message"] = (
+            f"Executed successfully. Added {len(result['variables'])} variables "
+            f"and {len(result['functions'])} functions to namespace."
+        )
+        return jsonify(result)
 
     except Exception as e:
         return jsonify({"success": False, "error": f"Server error: {str(e)}"}), 500
@@ -575,6 +1305,23 @@ def handle_exception(e):
     return jsonify({"success": False, "error": f"Internal server error: {str(e)}"}), 500
 
 
+# ASGI entry point (e.g. ``uvicorn src.backend:asgi_app``): the streaming
+# endpoints are served on the event loop, other routes by the Flask app on a
+# pool of threads
+asgi_app = AsgiApp(
+    app,
+    streams={
+        "/logs/stream": sse_endpoint(
+            log_channel, render=render_log_batch, allowed_origins=CORS_ORIGINS
+        ),
+        "/progress/<run_id>/stream": sse_poll_endpoint(
+            progress_poller, interval=PROGRESS_INTERVAL, allowed_origins=CORS_ORIGINS
+        ),
+    },
+    threads=WSGI_THREADS,
+)
+
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
     app.run(host="0.0.0.0", port=port, debug=os.getenv("FLASK_ENV") != "production")
@@ -48,7 +48,7 @@ export default function GraphView(props) {
 function FloatingButtons({
     selectedNode, selectedEdge,
     deleteSelectedNode, deleteSelectedEdge,
-    saveGraph, loadGraph, resetGraph, saveToPython, runPathsim,
+    saveGraph, loadGraph, resetGraph, saveToPython, runPathsim, runPreview,
     shareGraphURL,
     dockOpen, onToggleLogs,
     sidebarVisible, setSidebarVisible
@@ -263,6 +263,24 @@ function FloatingButtons({
             >
                 {dockOpen ? 'Hide Logs' : 'Show Logs'}
             </button>
+            <button
+                style={{
+                    position: 'absolute',
+                    right: 20,
+                    top: 275,
+                    zIndex: 10,
+                    padding: '8px 12px',
+                    backgroundColor: '#78A083',
+                    color: 'white',
+                    border: 'none',
+                    borderRadius: 5,
+                    cursor: 'pointer',
+                }}
+                title="Coarse run first, refined in the background"
+                onClick={runPreview}
+            >
+                Preview
+            </button>
         </>
     );
 }
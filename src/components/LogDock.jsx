@@ -1,6 +1,6 @@
 import React, { useEffect, useRef, useState, useCallback } from 'react';
 
-export default function LogDock({ open, onClose, lines, progress }) {
+export default function LogDock({ open, onClose, lines, progress, eta }) {
   const [height, setHeight] = useState(0.3 * window.innerHeight);
   const startYRef = useRef(0);
   const startHRef = useRef(height);
@@ -81,6 +81,11 @@ export default function LogDock({ open, onClose, lines, progress }) {
             }} />
           </div>
         )}
+        {typeof progress === 'number' && (
+          <span style={{ fontSize: 12, fontFamily: 'monospace' }}>
+            {progress.toFixed(0)}%{typeof eta === 'number' && progress < 100 ? `, ETA ${eta.toFixed(1)} s` : ''}
+          </span>
+        )}
         <button onClick={onClose} style={{ marginLeft: 'auto' }}>Close</button>
       </div>
 
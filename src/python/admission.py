@@ -0,0 +1,235 @@
+"""
+Admission control of simulation requests.
+
+Building and running a model holds the GIL for seconds, so when many users
+submit at once, running every request immediately only makes all of them
+slow. An ``AdmissionQueue`` lets ``max_running`` requests run at a time and
+makes the others wait in a bounded queue::
+
+    with admission.admit(client, lane="interactive"):
+        simulation.run(duration)
+
+Waiting requests are admitted:
+
+- by lane first: lanes are listed by priority, a request waiting in a lane
+  is always admitted before the requests of the lanes after it (e.g.
+  interactive runs before batch sweeps),
+- then round-robin between the clients waiting in the lane, so that a client
+  submitting many requests does not delay the single request of another,
+- then in arrival order for the requests of a client.
+
+A request is rejected with ``QueueFull`` when the queue or the share of its
+client is full, and with ``QueueTimeout`` when it waited too long, both with
+an estimate of when to retry from the recent run times.
+"""
+
+import collections
+import math
+import threading
+import time
+
+# lanes, by priority
+DEFAULT_LANES = ("interactive", "batch")
+
+
+class AdmissionError(Exception):
+    """
+    A request was not admitted.
+
+    Args:
+        message: The error message.
+        retry_after: Seconds after which the client should retry.
+    """
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFull(AdmissionError):
+    """The queue, or the share of the queue of the client, is full."""
+
+
+class QueueTimeout(AdmissionError):
+    """The request was not admitted within the timeout."""
+
+
+class _Waiter:
+    def __init__(self, client, lane):
+        self.client = client
+        self.lane = lane
+        self.admitted = False
+        self.event = threading.Event()
+
+
+class Ticket:
+    """
+    Admission of a request, releasing its slot when closed.
+
+    Attributes:
+        lane: The lane of the request.
+        wait: Seconds the request waited in the queue.
+    """
+
+    def __init__(self, queue, lane: str, wait: float):
+        self.lane = lane
+        self.wait = wait
+        self._queue = queue
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self):
+        """Release the slot of the request, admitting the next one."""
+        if not self._released:
+            self._released = True
+            self._queue._release(time.monotonic() - self._started)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class AdmissionQueue:
+    """
+    Thread-safe bounded queue admitting a limited number of requests at a time.
+
+    Args:
+        max_running: Number of requests running at a time.
+        max_queued: Number of requests waiting, further ones are rejected.
+        max_queued_per_client: Number of requests of a client waiting.
+        timeout: Seconds a request waits before it is rejected.
+        lanes: Names of the lanes, by priority.
+    """
+
+    def __init__(
+        self,
+        max_running: int = 2,
+        max_queued: int = 32,
+        max_queued_per_client: int = 4,
+        timeout: float = 60.0,
+        lanes=DEFAULT_LANES,
+    ):
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.max_queued_per_client = max_queued_per_client
+        self.timeout = timeout
+        self.lanes = tuple(lanes)
+        self.running = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        # lane -> client -> waiters of the client, clients in round-robin order
+        self._waiting = {lane: collections.OrderedDict() for lane in self.lanes}
+        self._durations = collections.deque(maxlen=20)
+        self._lock = threading.Lock()
+
+    def depth(self, lane: str = None) -> int:
+        """Number of requests waiting, in a lane or in all lanes."""
+        lanes = self.lanes if lane is None else (lane,)
+        with self._lock:
+            return sum(
+                len(waiters)
+                for lane in lanes
+                for waiters in self._waiting[lane].values()
+            )
+
+    def retry_after(self) -> int:
+        """Estimated seconds until a request joining the queue now would run."""
+        with self._lock:
+            return self._retry_after()
+
+    def _retry_after(self) -> int:
+        run_time = (
+            sum(self._durations) / len(self._durations) if self._durations else 1.0
+        )
+        rounds = (self.queued + self.running) / self.max_running
+        return max(1, math.ceil(rounds * run_time))
+
+    def admit(self, client: str, lane: str = None, timeout: float = None) -> Ticket:
+        """
+        Wait until a request can run.
+
+        Args:
+            client: The id of the client, e.g. its address.
+            lane: The lane of the request, the first lane if None.
+            timeout: Seconds to wait, ``self.timeout`` if None.
+
+        Raises:
+            ValueError: If the lane is unknown.
+            QueueFull: If the request cannot wait in the queue.
+            QueueTimeout: If the request waited longer than the timeout.
+
+        Returns:
+            The ticket of the request, to release when it is done.
+        """
+        lane = self.lanes[0] if lane is None else lane
+        if lane not in self._waiting:
+            raise ValueError(f"Unknown lane: {lane}. Must be one of {self.lanes}")
+        timeout = self.timeout if timeout is None else timeout
+        arrived = time.monotonic()
+
+        with self._lock:
+            if self.running < self.max_running and not self.queued:
+                self.running += 1
+                self.admitted += 1
+                return Ticket(self, lane, 0.0)
+            if self.queued >= self.max_queued:
+                self.rejected += 1
+                raise QueueFull(
+                    "Too many simulations queued, try again later", self._retry_after()
+                )
+            if len(self._waiting[lane].get(client, ())) >= self.max_queued_per_client:
+                self.rejected += 1
+                raise QueueFull(
+                    f"Too many simulations queued for this client "
+                    f"(max {self.max_queued_per_client})",
+                    self._retry_after(),
+                )
+            waiter = _Waiter(client, lane)
+            self._waiting[lane].setdefault(client, collections.deque()).append(waiter)
+            self.queued += 1
+
+        waiter.event.wait(timeout)
+        with self._lock:
+            if not waiter.admitted:
+                self._remove(waiter)
+                self.rejected += 1
+                raise QueueTimeout(
+                    f"The simulation was not started within {timeout:g} seconds",
+                    self._retry_after(),
+                )
+        return Ticket(self, lane, time.monotonic() - arrived)
+
+    def _remove(self, waiter):
+        clients = self._waiting[waiter.lane]
+        waiters = clients[waiter.client]
+        waiters.remove(waiter)
+        if not waiters:
+            del clients[waiter.client]
+        self.queued -= 1
+
+    def _release(self, duration: float):
+        with self._lock:
+            self._durations.append(duration)
+            self.running -= 1
+            while self.running < self.max_running and self.queued:
+                self._admit_next()
+
+    def _admit_next(self):
+        for lane in self.lanes:
+            clients = self._waiting[lane]
+            if not clients:
+                continue
+            # the client goes to the back of the lane
+            client, waiters = clients.popitem(last=False)
+            waiter = waiters.popleft()
+            if waiters:
+                clients[client] = waiters
+            self.queued -= 1
+            self.running += 1
+            self.admitted += 1
+            waiter.admitted = True
+            waiter.event.set()
+            return
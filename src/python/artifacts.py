@@ -0,0 +1,212 @@
+"""
+Compiled model artifacts.
+
+``compile_model`` builds a model from graph data once and serialises the
+built simulation (blocks, connections, events and solver configuration),
+including the user functions, with cloudpickle. ``load_model`` turns an
+artifact back into a ready to run simulation without evaluating global
+variables, executing python code or introspecting block signatures again.
+
+Artifacts are only valid for the pathsim and pathview versions they were
+compiled with. ``ArtifactStore`` keeps them on disk, keyed by the canonical
+graph hash and these versions, and recompiles them when the versions change.
+"""
+
+import hashlib
+import io
+import json
+import os
+import pickle
+import tempfile
+import time
+import uuid
+
+import pathsim
+
+from .canonical import graph_hash
+from .pathsim_utils import ModelSimulation, make_pathsim_model
+
+try:
+    import cloudpickle
+except ImportError:
+    cloudpickle = None
+
+ARTIFACT_FORMAT = 1
+
+
+def versions() -> dict:
+    """Return the versions an artifact is compiled for."""
+    from . import __version__
+
+    return {
+        "format": ARTIFACT_FORMAT,
+        "pathsim": getattr(pathsim, "__version__", "unknown"),
+        "pathview": __version__,
+    }
+
+
+def _restore_simulation(cls, state):
+    simulation = cls.__new__(cls)
+    simulation.__dict__.update(state)
+    simulation._initialize_logger()
+    return simulation
+
+
+def _reduce_simulation(simulation):
+    # the simulation is serialised by value, without its logger which is
+    # created for every simulation and has handlers attached by the server
+    state = {k: v for k, v in vars(simulation).items() if k != "logger"}
+    return _restore_simulation, (type(simulation), state)
+
+
+def _dumps(obj) -> bytes:
+    if cloudpickle is None:
+        raise ImportError(
+            "cloudpickle is needed for compiled model artifacts, "
+            "install it with `pip install pathview[artifacts]`."
+        )
+
+    class Pickler(cloudpickle.CloudPickler):
+        def reducer_override(self, obj):
+            if type(obj) is ModelSimulation:
+                return _reduce_simulation(obj)
+            return super().reducer_override(obj)
+
+    buffer = io.BytesIO()
+    Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(obj)
+    return buffer.getvalue()
+
+
+def compile_model(graph_data: dict) -> bytes:
+    """
+    Build a model from graph data and serialise it as an artifact.
+
+    Args:
+        graph_data: The graph data of the model.
+
+    Raises:
+        ImportError: If cloudpickle is not installed.
+
+    Returns:
+        The artifact as bytes.
+    """
+    start = time.perf_counter()
+    simulation, duration = make_pathsim_model(graph_data)
+    build_time = time.perf_counter() - start
+
+    # the header is a plain pickle so that it can be checked before the
+    # simulation, which may need other versions to unpickle, is loaded
+    return pickle.dumps(
+        {
+            "versions": versions(),
+            "graph_hash": graph_hash(graph_data),
+            "duration": duration,
+            "build_time": build_time,
+            "simulation": _dumps(simulation),
+        },
+        protocol=pickle.HIGHEST_PROTOCOL,
+    )
+
+
+def load_model(artifact: bytes) -> tuple[ModelSimulation, float]:
+    """
+    Load a model from an artifact.
+
+    Args:
+        artifact: The bytes returned by ``compile_model``.
+
+    Raises:
+        ValueError: If the artifact was compiled with other pathsim or pathview
+            versions.
+
+    Returns:
+        tuple: The simulation, ready to run, and the simulation duration.
+    """
+    header = pickle.loads(artifact)
+    if header["versions"] != versions():
+        raise ValueError(
+            f"Artifact compiled for {header['versions']}, running {versions()}"
+        )
+    return pickle.loads(header["simulation"]), header["duration"]
+
+
+class ArtifactStore:
+    """
+    Directory of compiled model artifacts.
+
+    Files are named ``<graph hash>.<version key>.pkl``; artifacts of other
+    versions are removed when a graph is compiled again.
+
+    Args:
+        root_dir: Directory of the artifacts. A temporary directory is created
+            on first use if not provided.
+    """
+
+    def __init__(self, root_dir: str = None):
+        self.root_dir = root_dir
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, graph_data: dict) -> str:
+        """Return the key of the artifact of a graph for the running versions."""
+        encoded = json.dumps(versions(), sort_keys=True).encode()
+        version_key = hashlib.sha256(encoded).hexdigest()[:16]
+        return f"{graph_hash(graph_data)}.{version_key}"
+
+    def path(self, key: str) -> str:
+        """Return the path of the artifact with a key."""
+        if self.root_dir is None:
+            self.root_dir = tempfile.mkdtemp(prefix="pathview-artifacts-")
+        return os.path.join(self.root_dir, f"{key}.pkl")
+
+    def compile(self, graph_data: dict) -> str:
+        """
+        Compile a graph, replacing artifacts of other versions.
+
+        Args:
+            graph_data: The graph data of the model.
+
+        Returns:
+            The key of the artifact.
+        """
+        key = self.key(graph_data)
+        artifact = compile_model(graph_data)
+
+        path = self.path(key)
+        os.makedirs(self.root_dir, exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(artifact)
+        os.replace(tmp_path, path)
+
+        graph_prefix = key.split(".")[0] + "."
+        for name in os.listdir(self.root_dir):
+            stale = name.startswith(graph_prefix) and name.endswith(".pkl")
+            if stale and name != os.path.basename(path):
+                os.remove(os.path.join(self.root_dir, name))
+        return key
+
+    def load(self, graph_data: dict) -> tuple[ModelSimulation, float]:
+        """
+        Load the model of a graph, compiling it first if needed.
+
+        Args:
+            graph_data: The graph data of the model.
+
+        Returns:
+            tuple: The simulation, ready to run, and the simulation duration.
+        """
+        path = self.path(self.key(graph_data))
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    simulation, duration = load_model(f.read())
+                self.hits += 1
+                return simulation, duration
+            except Exception:
+                # unreadable or incompatible artifacts are compiled again
+                pass
+        self.misses += 1
+        self.compile(graph_data)
+        with open(path, "rb") as f:
+            return load_model(f.read())
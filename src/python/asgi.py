@@ -0,0 +1,336 @@
+"""
+ASGI front of the Flask application for the streaming endpoints.
+
+With a threaded WSGI server, every open server-sent events stream holds a
+worker thread for the life of the connection, so a few open browser tabs
+starve the simulation endpoints. ``AsgiApp`` serves the streaming routes
+natively on an asyncio event loop, where an idle stream costs a suspended
+coroutine, and hands every other request to the WSGI application on a
+thread pool::
+
+    asgi_app = AsgiApp(app, streams={"/logs/stream": sse_endpoint(log_channel)})
+
+and run with any ASGI server, e.g. ``uvicorn src.backend:asgi_app``. Only the
+standard library is used, so the Flask application keeps working unchanged
+under a WSGI server.
+"""
+
+import asyncio
+import io
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from .streaming import format_sse
+
+# seconds between heartbeats of idle streams
+HEARTBEAT_INTERVAL = 30.0
+
+
+def _cors_headers(scope, allowed_origins) -> list:
+    if not allowed_origins:
+        return []
+    if "*" in allowed_origins:
+        return [(b"access-control-allow-origin", b"*")]
+    origin = dict(scope["headers"]).get(b"origin", b"")
+    if origin.decode("latin-1") in allowed_origins:
+        return [
+            (b"access-control-allow-origin", origin),
+            (b"access-control-allow-credentials", b"true"),
+            (b"vary", b"Origin"),
+        ]
+    return [(b"vary", b"Origin")]
+
+
+async def _wait_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+def sse_endpoint(
+    channel,
+    render=format_sse,
+    retry: int = 500,
+    heartbeat: float = HEARTBEAT_INTERVAL,
+    allowed_origins=(),
+):
+    """
+    Return an ASGI endpoint streaming the events of a channel.
+
+    Args:
+        channel: The ``EventChannel`` streamed.
+        render: Function returning the frames (``str``) of an event.
+        retry: Reconnection delay advertised to the client in milliseconds.
+        heartbeat: Seconds without events after which an empty event is sent,
+            so that proxies keep the connection open.
+        allowed_origins: Origins allowed by CORS, ``"*"`` for all.
+
+    Returns:
+        The endpoint, an ASGI application.
+    """
+
+    async def endpoint(scope, receive, send):
+        subscription = channel.subscribe_async()
+        disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [
+                        (b"content-type", b"text/event-stream"),
+                        (b"cache-control", b"no-cache"),
+                        *_cors_headers(scope, allowed_origins),
+                    ],
+                }
+            )
+            body = f"retry: {retry}\n\n"
+            while True:
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": body.encode(),
+                        "more_body": True,
+                    }
+                )
+                event = asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait(
+                    {event, disconnected},
+                    timeout=heartbeat,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnected in done:
+                    event.cancel()
+                    break
+                if event in done:
+                    body = render(event.result())
+                else:
+                    event.cancel()
+                    body = format_sse("")
+        except OSError:
+            # the client went away while sending
+            pass
+        finally:
+            subscription.close()
+            disconnected.cancel()
+
+    return endpoint
+
+
+def sse_poll_endpoint(
+    make_poll, interval: float = 0.25, retry: int = 500, allowed_origins=()
+):
+    """
+    Return an ASGI endpoint streaming events polled at a fixed interval.
+
+    For state that changes too often to publish every change (e.g. progress
+    of a simulation), the state is read every ``interval`` seconds instead.
+
+    Args:
+        make_poll: Function called with the path parameters of the request,
+            returning the ``poll`` function of the connection. ``poll()``
+            returns a frame (``str``, None to send nothing) and whether the
+            stream is over.
+        interval: Seconds between polls.
+        retry: Reconnection delay advertised to the client in milliseconds.
+        allowed_origins: Origins allowed by CORS, ``"*"`` for all.
+
+    Returns:
+        The endpoint, an ASGI application.
+    """
+
+    async def endpoint(scope, receive, send):
+        poll = make_poll(**scope.get("path_params", {}))
+        disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [
+                        (b"content-type", b"text/event-stream"),
+                        (b"cache-control", b"no-cache"),
+                        *_cors_headers(scope, allowed_origins),
+                    ],
+                }
+            )
+            body, done = f"retry: {retry}\n\n", False
+            while True:
+                if body:
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": body.encode(),
+                            "more_body": not done,
+                        }
+                    )
+                if done:
+                    return
+                await asyncio.wait({disconnected}, timeout=interval)
+                if disconnected.done():
+                    return
+                body, done = poll()
+                if done and not body:
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+        except OSError:
+            # the client went away while sending
+            pass
+        finally:
+            disconnected.cancel()
+
+    return endpoint
+
+
+def _compile_route(path: str):
+    """Return the regular expression of a route such as ``/runs/<run_id>``."""
+    pattern = re.sub(r"<(\w+)>", r"(?P<\1>[^/]+)", re.escape(path))
+    return re.compile(f"^{pattern}$")
+
+
+def make_environ(scope, body: bytes) -> dict:
+    """Return the WSGI environ of an ASGI HTTP request."""
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+        # the body is read in full, chunked requests get a length too
+        "CONTENT_LENGTH": str(len(body)),
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+        environ["REMOTE_PORT"] = str(scope["client"][1])
+
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ[name] = value
+            continue
+        if name in ("CONTENT_LENGTH", "TRANSFER_ENCODING"):
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class AsgiApp:
+    """
+    ASGI application serving streams natively and other routes with WSGI.
+
+    Args:
+        wsgi_app: The WSGI application serving all other requests.
+        streams: Dictionary of path to ASGI endpoint (e.g. ``sse_endpoint``)
+            for the ``GET`` requests served on the event loop. Paths can have
+            parameters, as in ``/progress/<run_id>/stream``, passed to the
+            endpoint in ``scope["path_params"]``.
+        threads: Number of threads running the WSGI application.
+    """
+
+    def __init__(self, wsgi_app, streams: dict = None, threads: int = 8):
+        self.wsgi_app = wsgi_app
+        self.streams = [
+            (_compile_route(path), endpoint)
+            for path, endpoint in (streams or {}).items()
+        ]
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="wsgi"
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            if scope["method"] == "GET":
+                for route, endpoint in self.streams:
+                    match = route.match(scope["path"])
+                    if match:
+                        scope = {**scope, "path_params": match.groupdict()}
+                        await endpoint(scope, receive, send)
+                        return
+            await self._call_wsgi(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported scope type: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _call_wsgi(self, scope, receive, send):
+        body = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+
+        environ = make_environ(scope, b"".join(body))
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._run_wsgi, environ, send, loop)
+
+    def _run_wsgi(self, environ, send, loop):
+        """Run the WSGI application in a pool thread, streaming its response."""
+        status_headers = []
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and sent:
+                raise exc_info[1].with_traceback(exc_info[2])
+            status_headers[:] = [status, headers]
+
+        def send_message(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def start():
+            status, headers = status_headers
+            send_message(
+                {
+                    "type": "http.response.start",
+                    "status": int(status.split(" ", 1)[0]),
+                    "headers": [
+                        (k.lower().encode("latin-1"), v.encode("latin-1"))
+                        for k, v in headers
+                    ],
+                }
+            )
+
+        sent = False
+        response = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in response:
+                if not chunk:
+                    continue
+                if not sent:
+                    start()
+                    sent = True
+                send_message(
+                    {"type": "http.response.body", "body": chunk, "more_body": True}
+                )
+            if not sent:
+                start()
+            send_message({"type": "http.response.body", "body": b""})
+        except OSError:
+            # the client went away
+            pass
+        finally:
+            if hasattr(response, "close"):
+                response.close()
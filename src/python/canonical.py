@@ -0,0 +1,77 @@
+"""
+Canonical form and hash of graph data.
+
+The editor stores layout and display state (node positions, selection, edge
+styles, ...) alongside the model. ``canonical_graph`` keeps only the parts of
+the graph that affect the simulation, in a deterministic order, so that two
+graphs describing the same model have the same ``graph_hash`` wherever their
+nodes were placed on the canvas.
+"""
+
+import hashlib
+import json
+
+# node keys that only affect how the graph is displayed
+NODE_DISPLAY_KEYS = ("position", "measured", "selected", "dragging", "width", "height")
+NODE_DATA_DISPLAY_KEYS = ("nodeColor",)
+EDGE_KEYS = ("source", "target", "sourceHandle", "targetHandle")
+
+
+def _canonical_node(node: dict) -> dict:
+    node = {k: v for k, v in node.items() if k not in NODE_DISPLAY_KEYS}
+    if "data" in node:
+        node["data"] = {
+            k: v for k, v in node["data"].items() if k not in NODE_DATA_DISPLAY_KEYS
+        }
+    return node
+
+
+def canonical_graph(graph_data: dict, exclude_solver_params=()) -> dict:
+    """
+    Return the parts of graph data that define the model.
+
+    Nodes and edges keep their order, since it decides which input port
+    unlabelled connections are attached to.
+
+    Args:
+        graph_data: The graph data as sent by the frontend.
+        exclude_solver_params: Names of solver parameters to leave out, e.g.
+            ``("Solver",)`` to compare graphs regardless of the chosen solver.
+
+    Returns:
+        A new dictionary with the display state of the nodes removed and the
+        edges reduced to their endpoints.
+    """
+    nodes = [_canonical_node(node) for node in graph_data.get("nodes", [])]
+    edges = [
+        {k: edge.get(k) for k in EDGE_KEYS} for edge in graph_data.get("edges", [])
+    ]
+    solver_params = {
+        k: v
+        for k, v in graph_data.get("solverParams", {}).items()
+        if k not in exclude_solver_params
+    }
+    return {
+        "nodes": nodes,
+        "edges": edges,
+        "solverParams": solver_params,
+        "globalVariables": graph_data.get("globalVariables", []),
+        "events": graph_data.get("events", []),
+        "pythonCode": graph_data.get("pythonCode", ""),
+    }
+
+
+def graph_hash(graph_data: dict, exclude_solver_params=()) -> str:
+    """
+    Return the SHA-256 hex digest of the canonical form of graph data.
+
+    Args:
+        graph_data: The graph data as sent by the frontend.
+        exclude_solver_params: Names of solver parameters to leave out of the hash.
+
+    Returns:
+        The hex digest.
+    """
+    canonical = canonical_graph(graph_data, exclude_solver_params)
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
@@ -0,0 +1,297 @@
+"""
+Checkpoints of running simulations.
+
+A checkpoint holds the graph data of a model and the state of its simulation:
+the simulation time, the attributes of every block (inputs, outputs, scope
+recordings, ...), the state of the solver engines and of the events. A model
+is resumed by building it again from the graph data, possibly with changed
+parameters, and restoring the state onto the new blocks and events.
+
+Block attributes named after a constructor parameter are configuration and
+are not restored, so that a resumed model uses the parameters of the graph it
+was built from. Callables and attributes that can't be pickled (e.g. the
+FEniCS model of a ``FestimWall``) are left out of the checkpoint and listed
+in its ``skipped`` entry.
+"""
+
+import inspect
+import os
+import pickle
+import re
+import uuid
+
+from pathsim import Simulation
+
+CHECKPOINT_VERSION = 1
+
+# attributes rebuilt with the model or handled separately
+BLOCK_STRUCTURE = ("engine", "events", "op_alg", "op_dyn", "id", "label")
+ENGINE_STRUCTURE = ("parent", "initial_value")
+EVENT_STATE = ("_history", "_times", "_active")
+
+_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def default_root_dir() -> str:
+    """
+    Return the default directory of checkpoint files.
+
+    The directory is the same for every process of the user, under
+    ``$XDG_CACHE_HOME`` (``~/.cache`` if unset), so that checkpoints survive
+    the restart of a worker.
+    """
+    cache_dir = os.getenv("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_dir, "pathview", "checkpoints")
+
+
+def _constructor_parameters(cls) -> set:
+    parameters = set()
+    for klass in cls.__mro__:
+        if "__init__" in vars(klass):
+            parameters.update(inspect.signature(klass.__init__).parameters)
+    return parameters
+
+
+def _picklable_attributes(obj, exclude=()) -> tuple[dict, list]:
+    """Return the picklable, non-callable attributes of an object and the skipped names."""
+    state, skipped = {}, []
+    for name, value in vars(obj).items():
+        if name in exclude or callable(value):
+            continue
+        try:
+            state[name] = pickle.loads(pickle.dumps(value))
+        except Exception:
+            skipped.append(name)
+    return state, skipped
+
+
+def _event_keys(events) -> list:
+    """Return keys identifying events across rebuilds of the same graph."""
+    counts, keys = {}, []
+    for event in events:
+        base = str(getattr(event, "id", None))
+        keys.append(f"{base}:{counts.get(base, 0)}")
+        counts[base] = counts.get(base, 0) + 1
+    return keys
+
+
+def capture_state(simulation: Simulation) -> dict:
+    """
+    Capture the state of a simulation.
+
+    Args:
+        simulation: The simulation, built with ``make_pathsim_model``.
+
+    Returns:
+        A picklable dictionary with the simulation ``time``, the state of the
+        global solver ``engine``, of the ``blocks`` (keyed by node id) and of
+        the ``events``, and the ``skipped``
+        attributes as ``"<node id>.<attribute>"`` strings.
+    """
+    blocks, skipped = {}, []
+    for block in simulation.blocks:
+        if hasattr(block, "checkpoint_state"):
+            attributes, block_skipped = block.checkpoint_state(), []
+        else:
+            exclude = set(BLOCK_STRUCTURE) | _constructor_parameters(type(block))
+            attributes, block_skipped = _picklable_attributes(block, exclude)
+        skipped.extend(f"{block.id}.{name}" for name in block_skipped)
+
+        engine = None
+        if block.engine is not None:
+            engine_attributes, engine_skipped = _picklable_attributes(
+                block.engine, ENGINE_STRUCTURE
+            )
+            skipped.extend(f"{block.id}.engine.{name}" for name in engine_skipped)
+            engine = {
+                "type": type(block.engine).__name__,
+                "attributes": engine_attributes,
+            }
+
+        events = [
+            {name: getattr(event, name) for name in EVENT_STATE}
+            for event in block.events
+        ]
+        blocks[block.id] = {
+            "type": type(block).__name__,
+            "attributes": attributes,
+            "engine": engine,
+            "events": pickle.loads(pickle.dumps(events)),
+        }
+
+    owned = {id(event) for block in simulation.blocks for event in block.events}
+    graph_events = [event for event in simulation.events if id(event) not in owned]
+    events = {
+        key: pickle.loads(
+            pickle.dumps({name: getattr(event, name) for name in EVENT_STATE})
+        )
+        for key, event in zip(_event_keys(graph_events), graph_events)
+    }
+
+    # the global engine drives the stages and buffering of multistep solvers
+    engine_attributes, engine_skipped = _picklable_attributes(
+        simulation.engine, ENGINE_STRUCTURE
+    )
+    skipped.extend(f"simulation.engine.{name}" for name in engine_skipped)
+
+    return {
+        "version": CHECKPOINT_VERSION,
+        "time": simulation.time,
+        "engine": {
+            "type": type(simulation.engine).__name__,
+            "attributes": engine_attributes,
+        },
+        "blocks": blocks,
+        "events": events,
+        "skipped": skipped,
+    }
+
+
+def restore_state(simulation: Simulation, state: dict) -> list[str]:
+    """
+    Restore a captured state onto a simulation built from the same (or a modified) graph.
+
+    Blocks are matched by node id and type; blocks that are new or changed type
+    keep their initial state. If the solver changed, only the engine states
+    are carried over.
+
+    Args:
+        simulation: The freshly built simulation.
+        state: The state returned by ``capture_state``.
+
+    Raises:
+        ValueError: If the state was captured by an incompatible version.
+
+    Returns:
+        The node ids of the blocks whose state could not be restored.
+    """
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(
+            f"Unsupported checkpoint version: {state.get('version')}. "
+            f"Must be {CHECKPOINT_VERSION}."
+        )
+
+    not_restored = []
+    for block in simulation.blocks:
+        block_state = state["blocks"].get(block.id)
+        if block_state is None or block_state["type"] != type(block).__name__:
+            not_restored.append(block.id)
+            continue
+
+        if hasattr(block, "restore_checkpoint_state"):
+            block.restore_checkpoint_state(block_state["attributes"])
+        else:
+            for name, value in block_state["attributes"].items():
+                setattr(block, name, value)
+
+        engine_state = block_state["engine"]
+        if block.engine is not None and engine_state is not None:
+            if engine_state["type"] == type(block.engine).__name__:
+                for name, value in engine_state["attributes"].items():
+                    setattr(block.engine, name, value)
+            else:
+                block.engine.set(engine_state["attributes"]["x"])
+
+        for event, event_state in zip(block.events, block_state["events"]):
+            for name, value in event_state.items():
+                setattr(event, name, value)
+
+    owned = {id(event) for block in simulation.blocks for event in block.events}
+    graph_events = [event for event in simulation.events if id(event) not in owned]
+    for key, event in zip(_event_keys(graph_events), graph_events):
+        for name, value in state["events"].get(key, {}).items():
+            setattr(event, name, value)
+
+    if state["engine"]["type"] == type(simulation.engine).__name__:
+        for name, value in state["engine"]["attributes"].items():
+            setattr(simulation.engine, name, value)
+
+    simulation.time = state["time"]
+    return not_restored
+
+
+class CheckpointStore:
+    """
+    Directory of checkpoint files, one per checkpoint id.
+
+    Files are replaced atomically, so a checkpoint survives the process being
+    killed while it is written.
+
+    Args:
+        root_dir: Directory of the checkpoint files, ``default_root_dir()`` if
+            not provided.
+    """
+
+    def __init__(self, root_dir: str = None):
+        self.root_dir = root_dir or default_root_dir()
+
+    def new_id(self) -> str:
+        """Return a new unique checkpoint id."""
+        return uuid.uuid4().hex
+
+    def path(self, checkpoint_id: str) -> str:
+        """
+        Return the path of the file of a checkpoint.
+
+        Raises:
+            ValueError: If the id is not a string of letters, digits, ``-``
+                and ``_``.
+        """
+        if not isinstance(checkpoint_id, str) or not _ID_PATTERN.match(checkpoint_id):
+            raise ValueError(f"Invalid checkpoint id: {checkpoint_id!r}")
+        return os.path.join(self.root_dir, f"{checkpoint_id}.pkl")
+
+    def __contains__(self, checkpoint_id):
+        try:
+            return os.path.exists(self.path(checkpoint_id))
+        except ValueError:
+            return False
+
+    def save(self, checkpoint_id: str, graph_data: dict, simulation: Simulation):
+        """
+        Save the state of a simulation with the graph data it was built from.
+
+        Args:
+            checkpoint_id: The id of the checkpoint, an existing one is replaced.
+            graph_data: The graph data of the model.
+            simulation: The simulation to checkpoint.
+
+        Returns:
+            The list of skipped attributes, see ``capture_state``.
+        """
+        state = capture_state(simulation)
+        path = self.path(checkpoint_id)
+        os.makedirs(self.root_dir, exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"graph": graph_data, "state": state}, f)
+        os.replace(tmp_path, path)
+        return state["skipped"]
+
+    def load(self, checkpoint_id: str) -> dict:
+        """
+        Load a checkpoint.
+
+        Args:
+            checkpoint_id: The id of the checkpoint.
+
+        Raises:
+            KeyError: If there is no checkpoint with this id.
+
+        Returns:
+            A dictionary with the ``graph`` data and the ``state``.
+        """
+        path = self.path(checkpoint_id)
+        if not os.path.exists(path):
+            raise KeyError(checkpoint_id)
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def delete(self, checkpoint_id: str):
+        """Remove a checkpoint if it exists."""
+        try:
+            os.remove(self.path(checkpoint_id))
+        except FileNotFoundError:
+            pass
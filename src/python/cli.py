@@ -0,0 +1,446 @@
+"""
+Command line interface.
+
+``pathview run`` runs graph files headless, without the web server::
+
+    pathview run example_graphs/ --jobs 4 --out results/ --format parquet
+
+Every graph is run once, or once per override file given with
+``--override``. Override files are JSON documents with any of the keys::
+
+    {
+        "solverParams": {"Solver": "ESDIRK43", "simulation_duration": "100"},
+        "globalVariables": {"k": "2.0"},
+        "nodes": {"<node id or label>": {"gain": "3"}}
+    }
+
+whose values replace the ones of the graph. For each run the scope
+recordings, the timings and the solver statistics are written to ``--out``,
+and a ``summary.json`` lists all runs. Files are named after the graph file
+(prefixed with its directory if two graphs have the same name). The exit
+status is 1 if any run failed, including runs whose worker process died.
+
+``pathview generate`` writes a synthetic graph (see ``pathview.synthetic``)::
+
+    pathview generate random 10000 --out random_10000.json
+
+``pathview export`` converts a graph file to a Python script, ``--batch``
+gives the standalone variant for batch queues (see ``convert_graph_to_python``)::
+
+    pathview export model.json --batch --out model.py
+    python model.py --sweep k=1,2,4 --jobs 3 --out results/
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from pathsim.blocks import Scope
+
+from .convert_to_python import convert_graph_to_python
+from .export import EXPORT_FORMATS, export_scopes
+from .pathsim_utils import make_pathsim_model
+from .profiling import SolverStats
+from .synthetic import TOPOLOGIES, generate_graph
+
+
+def find_graphs(paths) -> list[Path]:
+    """
+    Return the graph files in a list of files and directories.
+
+    Args:
+        paths: Paths of JSON files or of directories containing JSON files.
+
+    Raises:
+        FileNotFoundError: If a path does not exist.
+
+    Returns:
+        The graph files, directories expanded in sorted order.
+    """
+    graphs = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            graphs.extend(sorted(path.glob("*.json")))
+        elif path.exists():
+            graphs.append(path)
+        else:
+            raise FileNotFoundError(f"No such file or directory: {path}")
+    return graphs
+
+
+def apply_overrides(graph_data: dict, overrides: dict) -> dict:
+    """
+    Return a copy of graph data with overridden values.
+
+    Args:
+        graph_data: The graph data.
+        overrides: Dictionary with optional ``solverParams``,
+            ``globalVariables`` (name to value) and ``nodes`` (node id or
+            label to parameters) entries. Values are expressions, as in the
+            graph data.
+
+    Raises:
+        KeyError: If a global variable or node does not exist in the graph.
+
+    Returns:
+        The modified copy of the graph data.
+    """
+    graph_data = copy.deepcopy(graph_data)
+    graph_data.setdefault("solverParams", {}).update(overrides.get("solverParams", {}))
+
+    variables = {var["name"]: var for var in graph_data.get("globalVariables", [])}
+    for name, value in overrides.get("globalVariables", {}).items():
+        if name not in variables:
+            raise KeyError(f"Unknown global variable: {name}")
+        variables[name]["value"] = str(value)
+
+    for key, parameters in overrides.get("nodes", {}).items():
+        matches = [
+            node
+            for node in graph_data.get("nodes", [])
+            if str(node["id"]) == key or node["data"].get("label") == key
+        ]
+        if not matches:
+            raise KeyError(f"Unknown node: {key}")
+        for node in matches:
+            node["data"].update({k: str(v) for k, v in parameters.items()})
+    return graph_data
+
+
+def run_name(graph_path: str, override_path: str = None) -> str:
+    """Return the name of a run, that of its files in the output directory."""
+    name = Path(graph_path).stem
+    if override_path is not None:
+        name = f"{name}__{Path(override_path).stem}"
+    return name
+
+
+def unique_run_names(runs) -> list[str]:
+    """
+    Return distinct names for runs, so that their files don't overwrite each other.
+
+    Runs whose names clash (e.g. ``a/model.json`` and ``b/model.json``) are
+    prefixed with the directory of their graph (``a__model``, ``b__model``),
+    and numbered if they still clash.
+
+    Args:
+        runs: Pairs of graph path and override path (or None).
+
+    Returns:
+        The names, in the order of the runs.
+    """
+    names = [run_name(graph, override) for graph, override in runs]
+    clashing = {name for name in names if names.count(name) > 1}
+    names = [
+        f"{Path(graph).resolve().parent.name}__{name}" if name in clashing else name
+        for name, (graph, _) in zip(names, runs)
+    ]
+    seen = {}
+    unique = []
+    for name in names:
+        if names.count(name) > 1:
+            seen[name] = seen.get(name, 0) + 1
+            name = f"{name}_{seen[name]}"
+        unique.append(name)
+    return unique
+
+
+def _failed_run(name: str, graph_path: str, override_path: str, error: str) -> dict:
+    return {
+        "name": name,
+        "graph": str(graph_path),
+        "override": override_path and str(override_path),
+        "success": False,
+        "timing": {},
+        "files": [],
+        "error": error,
+    }
+
+
+def run_graph(
+    graph_path: str,
+    override_path: str = None,
+    out_dir: str = None,
+    fmt: str = "npz",
+    log: bool = False,
+    name: str = None,
+) -> dict:
+    """
+    Run one graph file and write its results.
+
+    Failures are reported in the returned dictionary and not raised, so that
+    a batch keeps going.
+
+    Args:
+        graph_path: Path of the graph file.
+        override_path: Optional path of an override file.
+        out_dir: Directory the results are written to, nothing is written if None.
+        fmt: Export format of the scope recordings, one of ``EXPORT_FORMATS``.
+        log: Whether the simulation logs its progress.
+        name: Name of the run and of its files, see ``run_name`` if None.
+
+    Returns:
+        A dictionary with the run ``name``, ``success``, ``timing`` in seconds,
+        solver ``stats``, the written ``files`` and the ``error`` if it failed.
+    """
+    if name is None:
+        name = run_name(graph_path, override_path)
+    result = {
+        "name": name,
+        "graph": str(graph_path),
+        "override": override_path and str(override_path),
+        "success": False,
+        "timing": {},
+        "files": [],
+    }
+    timing = result["timing"]
+
+    try:
+        start = time.perf_counter()
+        with open(graph_path) as f:
+            graph_data = json.load(f)
+        if override_path is not None:
+            with open(override_path) as f:
+                graph_data = apply_overrides(graph_data, json.load(f))
+        graph_data.setdefault("solverParams", {})["log"] = "true" if log else "false"
+
+        simulation, duration = make_pathsim_model(graph_data)
+        timing["build"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with SolverStats(simulation) as solver_stats:
+            simulation.run(duration)
+        timing["run"] = time.perf_counter() - start
+        result["stats"] = solver_stats.report()
+
+        if out_dir is not None:
+            start = time.perf_counter()
+            scopes = [b for b in simulation.blocks if isinstance(b, Scope)]
+            path = os.path.join(out_dir, f"{name}.{EXPORT_FORMATS[fmt][1]}")
+            with open(path, "wb") as f:
+                for chunk in export_scopes(scopes, fmt=fmt):
+                    f.write(chunk)
+            result["files"].append(path)
+            timing["export"] = time.perf_counter() - start
+
+        result["success"] = True
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["traceback"] = traceback.format_exc()
+
+    if out_dir is not None:
+        path = os.path.join(out_dir, f"{name}.json")
+        result["files"].append(path)
+        with open(path, "w") as f:
+            json.dump(result, f, indent=2, default=float)
+    return result
+
+
+def _run_isolated(run) -> dict:
+    """Run ``run_graph`` in a worker process of its own."""
+    graph, override, *_, name = run
+    try:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            return executor.submit(run_graph, *run).result()
+    except Exception as e:
+        return _failed_run(name, graph, override, f"{type(e).__name__}: {e}")
+
+
+def run_parallel(runs, jobs: int) -> list[dict]:
+    """
+    Run ``run_graph`` for each run on ``jobs`` worker processes.
+
+    A worker that dies (e.g. out of memory) breaks the whole pool and fails
+    every run that was not finished. These runs are run again each in its own
+    worker process, so that only the run that killed its worker fails.
+
+    Returns:
+        The results, in the order of the runs.
+    """
+    results = [None] * len(runs)
+    broken = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(run_graph, *run) for run in runs]
+        for i, (future, (graph, override, *_, name)) in enumerate(zip(futures, runs)):
+            try:
+                results[i] = future.result()
+            except BrokenProcessPool:
+                broken.append(i)
+                continue
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                results[i] = _failed_run(name, graph, override, error)
+            _print_result(results[i])
+
+    if broken:
+        with ThreadPoolExecutor(max_workers=jobs) as threads:
+            isolated = threads.map(_run_isolated, [runs[i] for i in broken])
+            for i, result in zip(broken, isolated):
+                results[i] = result
+                _print_result(result)
+    return results
+
+
+def run_command(args) -> int:
+    """Run the ``run`` subcommand and return the exit status."""
+    try:
+        graphs = find_graphs(args.paths)
+    except FileNotFoundError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    if not graphs:
+        print("error: no graph files found", file=sys.stderr)
+        return 2
+    if args.out is not None:
+        try:
+            # checks that the optional dependency of the format is installed
+            export_scopes([], fmt=args.format)
+        except ImportError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 2
+        os.makedirs(args.out, exist_ok=True)
+
+    pairs = [
+        (str(graph), override)
+        for graph in graphs
+        for override in (args.override or [None])
+    ]
+    runs = [
+        (graph, override, args.out, args.format, args.log, name)
+        for (graph, override), name in zip(pairs, unique_run_names(pairs))
+    ]
+
+    if args.jobs > 1:
+        results = run_parallel(runs, args.jobs)
+    else:
+        results = []
+        for run in runs:
+            results.append(run_graph(*run))
+            _print_result(results[-1])
+
+    failed = [r for r in results if not r["success"]]
+    print(f"{len(results) - len(failed)} succeeded, {len(failed)} failed")
+    if args.out is not None:
+        keys = ("name", "graph", "override", "success", "error", "timing")
+        summary = [{k: r.get(k) for k in keys} for r in results]
+        with open(os.path.join(args.out, "summary.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+    return 1 if failed else 0
+
+
+def generate_command(args) -> int:
+    """Run the ``generate`` subcommand and return the exit status."""
+    kwargs = {}
+    if args.seed is not None:
+        if args.topology != "random":
+            print("error: --seed only applies to the random topology", file=sys.stderr)
+            return 2
+        kwargs["seed"] = args.seed
+    try:
+        graph_data = generate_graph(args.topology, args.size, **kwargs)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    if args.out is None:
+        json.dump(graph_data, sys.stdout)
+    else:
+        with open(args.out, "w") as f:
+            json.dump(graph_data, f)
+    return 0
+
+
+def export_command(args) -> int:
+    """Run the ``export`` subcommand and return the exit status."""
+    try:
+        with open(args.graph) as f:
+            graph_data = json.load(f)
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    script = convert_graph_to_python(
+        graph_data, variant="batch" if args.batch else "script"
+    )
+    if args.out is None:
+        sys.stdout.write(script)
+    else:
+        with open(args.out, "w") as f:
+            f.write(script)
+    return 0
+
+
+def _print_result(result):
+    if result["success"]:
+        timing = ", ".join(f"{k} {v:.3f}s" for k, v in result["timing"].items())
+        print(f"ok     {result['name']} ({timing})")
+    else:
+        print(f"FAILED {result['name']}: {result['error']}")
+
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="pathview")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Run graph files without the web server.")
+    run.add_argument("paths", nargs="+", help="Graph JSON files or directories.")
+    run.add_argument(
+        "--override",
+        action="append",
+        metavar="FILE",
+        help="JSON file of values overriding the graph, can be repeated.",
+    )
+    run.add_argument(
+        "--jobs", "-j", type=int, default=1, help="Number of worker processes."
+    )
+    run.add_argument("--out", "-o", help="Directory the results are written to.")
+    run.add_argument(
+        "--format",
+        choices=list(EXPORT_FORMATS),
+        default="npz",
+        help="Format of the scope recordings.",
+    )
+    run.add_argument(
+        "--log", action="store_true", help="Log the progress of the simulations."
+    )
+    run.set_defaults(func=run_command)
+
+    generate = subparsers.add_parser(
+        "generate", help="Write a synthetic graph for scaling tests."
+    )
+    generate.add_argument("topology", choices=list(TOPOLOGIES))
+    generate.add_argument("size", type=int, help="Number of blocks.")
+    generate.add_argument("--seed", type=int, help="Seed of the random topology.")
+    generate.add_argument(
+        "--out", "-o", help="File the graph is written to, defaults to stdout."
+    )
+    generate.set_defaults(func=generate_command)
+
+    export = subparsers.add_parser("export", help="Convert a graph to a Python script.")
+    export.add_argument("graph", help="Graph JSON file.")
+    export.add_argument(
+        "--batch",
+        action="store_true",
+        help="Export a standalone module with a sweep command line, "
+        "saving the scopes to files instead of plotting them.",
+    )
+    export.add_argument(
+        "--out", "-o", help="File the script is written to, defaults to stdout."
+    )
+    export.set_defaults(func=export_command)
+    return parser
+
+
+def main(argv=None) -> int:
+    """Entry point of the ``pathview`` command."""
+    args = make_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
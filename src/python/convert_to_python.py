@@ -1,28 +1,74 @@
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+import functools
 import os
-from inspect import signature
 
 from .pathsim_utils import (
     map_str_to_object,
     map_str_to_event,
-    make_blocks,
-    make_global_variables,
-    get_input_index,
-    get_output_index,
-    find_block_by_id,
-    find_node_by_id,
+    input_port,
+    output_port,
     make_var_name,
+    signature_parameters,
 )
 
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
 
-def convert_graph_to_python(graph_data: dict) -> str:
-    """Convert graph data to a Python script as a string."""
-    # Get the directory of this file to properly reference templates
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    templates_dir = os.path.join(current_dir, "templates")
+# templates of the exported scripts: "script" plots the scopes, "batch" is a
+# standalone module with a sweep command line that saves the scopes to files
+SCRIPT_VARIANTS = {
+    "script": "template_with_macros.py",
+    "batch": "template_batch.py",
+}
 
-    environment = Environment(loader=FileSystemLoader(templates_dir))
-    template = environment.get_template("template_with_macros.py")
+
+@functools.lru_cache(maxsize=None)
+def get_environment() -> Environment:
+    """
+    Return the Jinja environment of the script templates.
+
+    The environment is created once per process and keeps the templates
+    (and the macros they import) compiled after their first use. The
+    templates ship with the package, so they are not checked for changes.
+
+    If the ``PATHVIEW_JINJA_CACHE_DIR`` environment variable is set, the
+    compiled templates are also stored there as bytecode, so that new
+    processes (e.g. server workers) skip compiling them.
+    """
+    bytecode_cache = None
+    cache_dir = os.getenv("PATHVIEW_JINJA_CACHE_DIR")
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    return Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        bytecode_cache=bytecode_cache,
+        auto_reload=False,
+    )
+
+
+def convert_graph_to_python(graph_data: dict, variant: str = "script") -> str:
+    """
+    Convert graph data to a Python script as a string.
+
+    Args:
+        graph_data: The graph data.
+        variant: One of ``SCRIPT_VARIANTS``. ``"script"`` runs the model and
+            plots its scopes. ``"batch"`` is a module for headless runs: its
+            command line overrides and sweeps global variables over several
+            processes, saves the scopes to NPZ or Parquet files and times the
+            build and run of every run.
+
+    Raises:
+        ValueError: If the variant is unknown.
+
+    Returns:
+        The Python script.
+    """
+    if variant not in SCRIPT_VARIANTS:
+        raise ValueError(
+            f"Unknown script variant: {variant}. Must be one of {list(SCRIPT_VARIANTS)}"
+        )
+    template = get_environment().get_template(SCRIPT_VARIANTS[variant])
 
     # Process the graph data
     context = process_graph_data_from_dict(graph_data)
@@ -50,23 +96,26 @@ def process_node_data(nodes: list[dict]) -> list[dict]:
         node["module_name"] = block_class.__module__
 
         # Add expected arguments
-        node["expected_arguments"] = signature(block_class).parameters
+        node["expected_arguments"] = signature_parameters(block_class)
 
     return nodes
 
 
+def _has_operations(node: dict) -> bool:
+    """Whether an adder node is built with operations, see ``get_parameters_for_block_class``."""
+    return node["type"] == "addsub" and bool(node["data"].get("operations"))
+
+
 # TODO: this is effectively a duplicate of pathsim_utils.make_connections
 # need to refactor
 def make_edge_data(data: dict) -> list[dict]:
     """
     Process edges to add source/target variable names and ports.
 
-    Does it by creating pathsim.blocks and Connections from the data with
-    ``make_blocks`` and ``make_connections`` functions.
-
-    Then, since the data (source/target blocks, ports) is already in the
-    connections, we can simply read the ports id from the actual pathsim
-    connections and add them to the edges.
+    Ports are resolved statically from the node types, with the same rules
+    (``input_port`` and ``output_port``) and in the same order as
+    ``make_connections``, so that no block has to be built: global variables
+    are not evaluated and the python code is not executed.
 
     Args:
         data: The graph data containing "nodes" and "edges".
@@ -74,42 +123,28 @@ def make_edge_data(data: dict) -> list[dict]:
     Returns:
         The processed edges with source/target variable names and ports.
     """
-    data = data.copy()
-
-    # we need the namespace since we call make_blocks
-
-    global_vars = data.get("globalVariables", {})
+    nodes_by_id = {node["id"]: node for node in data["nodes"]}
+    outgoing = {}
+    for edge in data["edges"]:
+        outgoing.setdefault(edge["source"], []).append(edge)
 
-    # Get the global variables namespace to use in eval calls
-    global_namespace = make_global_variables(global_vars)
-
-    # Create a combined namespace that includes built-in functions and global variables
-    eval_namespace = globals().copy()
-    eval_namespace.update(global_namespace)
-
-    # Execute python code first to define any variables that blocks might need
-    python_code = data.get("pythonCode", "")
-    if python_code:
-        exec(python_code, eval_namespace)
-
-    blocks, _ = make_blocks(data["nodes"], eval_namespace=eval_namespace)
-
-    # Process each node and its sorted incoming edges to create connections
-    block_to_input_index = {b: 0 for b in blocks}
+    # Process each node and its sorted outgoing edges to create connections
+    input_counts = {node_id: 0 for node_id in nodes_by_id}
     for node in data["nodes"]:
-        outgoing_edges = [
-            edge for edge in data["edges"] if edge["source"] == node["id"]
-        ]
-        outgoing_edges.sort(key=lambda x: x["target"])
-
-        block = find_block_by_id(node["id"], blocks)
+        outgoing_edges = sorted(outgoing.get(node["id"], []), key=lambda x: x["target"])
+        block_class = map_str_to_object[node["type"]]
 
         for edge in outgoing_edges:
-            target_block = find_block_by_id(edge["target"], blocks)
-            target_node = find_node_by_id(edge["target"], data["nodes"])
+            target_node = nodes_by_id[edge["target"]]
+            target_class = map_str_to_object[target_node["type"]]
 
-            output_index = get_output_index(block, edge)
-            input_index = get_input_index(target_block, edge, block_to_input_index)
+            output_index = output_port(block_class, edge)
+            input_index = input_port(
+                target_class,
+                edge,
+                input_counts[edge["target"]],
+                has_operations=_has_operations(target_node),
+            )
 
             # if it's a scope, find labels
             if target_node["type"] == "scope":
@@ -132,7 +167,7 @@ def make_edge_data(data: dict) -> list[dict]:
                 edge["target_port"] = f"['{input_index}']"
             else:
                 edge["target_port"] = f"[{input_index}]"
-            block_to_input_index[target_block] += 1
+            input_counts[edge["target"]] += 1
 
     return data["edges"]
 
@@ -157,7 +192,7 @@ def make_events_data(data: dict) -> list[dict]:
         event["module_name"] = event_class.__module__
 
         # Add expected arguments
-        event["expected_arguments"] = signature(event_class).parameters
+        event["expected_arguments"] = signature_parameters(event_class)
 
         if "func_evt" in event:
             # if the whole function in defined in the event, make sure it has a unique identifier
@@ -1,8 +1,10 @@
-from pathsim.blocks import ODE, Wrapper
+from pathsim.blocks import ODE, Wrapper, Scope
 from pathsim_chem import Splitter
 import pathsim.blocks
 import pathsim.events
+import copy
 import numpy as np
+import os
 
 
 class Process(ODE):
@@ -18,14 +20,15 @@ class Process(ODE):
     _port_map_out = {"inv": 0, "mass_flow_rate": 1}
 
     def __init__(self, residence_time=0, initial_value=0, source_term=0):
-        alpha = -1 / residence_time if residence_time != 0 else 0
-        super().__init__(
-            func=lambda x, u, t: x * alpha + sum(u) + source_term,
-            initial_value=initial_value,
-        )
         self.residence_time = residence_time
-        self.initial_value = initial_value
         self.source_term = source_term
+        # a bound method instead of a lambda keeps the block picklable
+        super().__init__(func=self._rhs, initial_value=initial_value)
+        self.initial_value = initial_value
+
+    def _rhs(self, x, u, t):
+        alpha = -1 / self.residence_time if self.residence_time != 0 else 0
+        return x * alpha + sum(u) + self.source_term
 
     def update(self, t):
         x = self.engine.get()
@@ -128,12 +131,139 @@ class Integrator(pathsim.blocks.Integrator):
         else:
             raise ValueError("reset_times must be a single value or a list of times")
 
-        def func_act(_):
-            self.reset()
-
-        event = pathsim.events.ScheduleList(times_evt=reset_times, func_act=func_act)
+        event = pathsim.events.ScheduleList(
+            times_evt=reset_times, func_act=self._reset_action
+        )
         return [event]
 
+    def _reset_action(self, t):
+        self.reset()
+
+
+class DiskScope(Scope):
+    """Scope that records to a memory-mapped file instead of an in-memory dict.
+
+    Samples are appended to a preallocated float64 file of shape
+    ``(capacity, 1 + n_ports)``, time being the first column. When the file is
+    full its capacity is doubled. ``read`` returns views into the map so the
+    recording is never copied into RAM.
+
+    Args:
+        sampling_rate: Number of samples per time unit, default is every timestep.
+        t_wait: Wait time before starting recording.
+        labels: Labels for the scope traces.
+        path: Path of the file the recording is written to.
+        initial_capacity: Number of rows preallocated before the first resize.
+    """
+
+    def __init__(
+        self,
+        sampling_rate=None,
+        t_wait=0.0,
+        labels=None,
+        path="scope.bin",
+        initial_capacity=4096,
+    ):
+        super().__init__(sampling_rate=sampling_rate, t_wait=t_wait, labels=labels)
+        self.path = path
+        self.initial_capacity = initial_capacity
+        self._buffer = None
+        self._n_samples = 0
+
+        # replace the internal event so that it writes to the file
+        if sampling_rate is not None:
+            self.events = [
+                pathsim.events.Schedule(
+                    t_start=t_wait, t_period=sampling_rate, func_act=self._record
+                )
+            ]
+
+    def reset(self):
+        super().reset()
+        self._n_samples = 0
+
+    def sample(self, t):
+        if self.sampling_rate is None and t >= self.t_wait:
+            self._record(t)
+
+    def read(self):
+        """Return the recorded time and data as views into the memory map.
+
+        Returns:
+            tuple of the time array and the data array with one row per port,
+            or ``(None, None)`` if nothing was recorded.
+        """
+        if self._n_samples == 0:
+            return None, None
+        recording = self._buffer[: self._n_samples]
+        return recording[:, 0], recording[:, 1:].T
+
+    def close(self):
+        """Flush the recording to disk and release the memory map."""
+        if self._buffer is not None:
+            self._buffer.flush()
+            self._buffer = None
+
+    def checkpoint_state(self):
+        """Return the state of the scope, with a copy of the recorded rows."""
+        rows = None
+        if self._buffer is not None:
+            rows = np.array(self._buffer[: self._n_samples])
+        return {
+            "inputs": copy.deepcopy(self.inputs),
+            "outputs": copy.deepcopy(self.outputs),
+            "_active": self._active,
+            "rows": rows,
+        }
+
+    def restore_checkpoint_state(self, state):
+        """Restore a state returned by ``checkpoint_state``, writing the rows to the file."""
+        self.inputs = state["inputs"]
+        self.outputs = state["outputs"]
+        self._active = state["_active"]
+        rows = state["rows"]
+        self.close()
+        self._n_samples = 0
+        if rows is not None and len(rows):
+            self._open(
+                n_columns=rows.shape[1], capacity=max(self.initial_capacity, len(rows))
+            )
+            self._buffer[: len(rows)] = rows
+            self._n_samples = len(rows)
+
+    def _record(self, t):
+        values = self.inputs.to_array()
+        if self._buffer is None:
+            self._open(n_columns=1 + len(values), capacity=self.initial_capacity)
+
+        # like the dict based Scope, a sample at an existing time overwrites it
+        if self._n_samples and self._buffer[self._n_samples - 1, 0] == t:
+            row = self._n_samples - 1
+        else:
+            if self._n_samples == len(self._buffer):
+                self._open(
+                    n_columns=self._buffer.shape[1], capacity=2 * len(self._buffer)
+                )
+            row = self._n_samples
+            self._n_samples += 1
+
+        self._buffer[row, 0] = t
+        self._buffer[row, 1:] = values
+
+    def _open(self, n_columns, capacity):
+        """Map the recording file with the given capacity, growing it if needed."""
+        if self._buffer is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            mode = "w+"
+        else:
+            self._buffer.flush()
+            with open(self.path, "r+b") as f:
+                f.truncate(capacity * n_columns * np.dtype(np.float64).itemsize)
+            mode = "r+"
+        self._buffer = np.memmap(
+            self.path, dtype=np.float64, mode=mode, shape=(capacity, n_columns)
+        )
+
 
 # FESTIM wall
 from pathsim.utils.register import Register
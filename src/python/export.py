@@ -0,0 +1,326 @@
+"""
+Streaming export of scope recordings to CSV, NPZ, Parquet and HDF5.
+
+Every exporter is a generator of ``bytes`` chunks that reads the recordings
+chunk by chunk straight from the NumPy arrays returned by ``Scope.read``, so
+the full dataset is never held as text (or copied) in memory.
+
+Scopes are exported either with one time column per scope
+(``time_base="per_scope"``, shorter scopes are padded with NaN) or on a shared
+time base made of the union of all sample times, onto which every scope is
+linearly interpolated (``time_base="shared"``).
+"""
+
+import csv
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+
+import numpy as np
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "npz": ("application/zip", "npz"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "hdf5": ("application/x-hdf5", "h5"),
+}
+
+TIME_BASES = ("per_scope", "shared")
+
+# number of rows read and written per chunk
+CHUNK_ROWS = 16384
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object collecting bytes until they are drained."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        self._position += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class _InterpolatedData:
+    """Lazy ``(n_ports, len(time))`` view of data interpolated onto ``time``."""
+
+    dtype = np.dtype(np.float64)
+    ndim = 2
+
+    def __init__(self, time, scope_time, data):
+        self.time = time
+        self.scope_time = scope_time
+        self.data = data
+        self.shape = (len(data), len(time))
+
+    def __getitem__(self, key):
+        ports, columns = key
+        chunk_time = self.time[columns]
+        return np.array(
+            [np.interp(chunk_time, self.scope_time, d) for d in self.data[ports]]
+        )
+
+
+def _iter_npy(archive, sink, name, array, chunk_rows):
+    """Write an array as ``<name>.npy`` in chunks of columns, yielding the output."""
+    header = {
+        "descr": np.lib.format.dtype_to_descr(array.dtype),
+        "fortran_order": False,
+        "shape": array.shape,
+    }
+    with archive.open(f"{name}.npy", mode="w", force_zip64=True) as f:
+        np.lib.format.write_array_header_2_0(f, header)
+        if array.ndim == 2:
+            # rows are ports, write them one after the other
+            for row in range(array.shape[0]):
+                for start in range(0, array.shape[1], chunk_rows):
+                    chunk = array[row : row + 1, start : start + chunk_rows]
+                    f.write(np.ascontiguousarray(chunk).tobytes())
+                    yield sink.drain()
+        else:
+            for start in range(0, len(array), chunk_rows):
+                f.write(
+                    np.ascontiguousarray(array[start : start + chunk_rows]).tobytes()
+                )
+                yield sink.drain()
+
+
+def scope_recordings(scopes) -> list[tuple[str, np.ndarray, np.ndarray, list[str]]]:
+    """
+    Read the recordings of scopes.
+
+    Args:
+        scopes: The Scope blocks to read.
+
+    Returns:
+        A list of ``(name, time, data, port_labels)`` tuples, one per scope that
+        recorded data. Names are unique (duplicates get the block id appended).
+    """
+    recordings = []
+    names = set()
+    for scope in scopes:
+        time, data = scope.read()
+        if time is None:
+            continue
+        name = getattr(scope, "label", None) or f"scope {scope.id}"
+        if name in names:
+            name = f"{name} ({scope.id})"
+        names.add(name)
+        port_labels = [
+            scope.labels[i] if i < len(scope.labels) else f"port {i}"
+            for i in range(len(data))
+        ]
+        recordings.append((name, time, data, port_labels))
+    return recordings
+
+
+def shared_time(recordings) -> np.ndarray:
+    """Return the sorted union of the sample times of all recordings."""
+    if not recordings:
+        return np.array([])
+    return np.unique(np.concatenate([rec[1] for rec in recordings]))
+
+
+def table_columns(recordings, time_base: str = "per_scope") -> list[str]:
+    """Return the column names of the tabular (CSV/Parquet) export."""
+    columns = ["time"] if time_base == "shared" else []
+    for name, _, _, port_labels in recordings:
+        if time_base == "per_scope":
+            columns.append(f"{name}: time")
+        columns.extend(f"{name}: {label}" for label in port_labels)
+    return columns
+
+
+def iter_table_chunks(recordings, time_base="per_scope", chunk_rows=CHUNK_ROWS):
+    """
+    Yield the tabular export as 2D float arrays of at most ``chunk_rows`` rows.
+
+    Args:
+        recordings: Recordings as returned by ``scope_recordings``.
+        time_base: ``"per_scope"`` or ``"shared"``.
+        chunk_rows: Maximum number of rows per chunk.
+
+    Yields:
+        Arrays of shape ``(rows, len(table_columns(recordings, time_base)))``.
+    """
+    if time_base not in TIME_BASES:
+        raise ValueError(f"Unknown time base: {time_base}. Must be one of {TIME_BASES}")
+    if not recordings:
+        return
+
+    if time_base == "shared":
+        time = shared_time(recordings)
+        n_rows = len(time)
+    else:
+        n_rows = max(len(rec[1]) for rec in recordings)
+
+    for start in range(0, n_rows, chunk_rows):
+        stop = min(start + chunk_rows, n_rows)
+        columns = []
+        if time_base == "shared":
+            chunk_time = time[start:stop]
+            columns.append(chunk_time)
+            for _, scope_time, data, _ in recordings:
+                columns.extend(np.interp(chunk_time, scope_time, d) for d in data)
+        else:
+            for _, scope_time, data, _ in recordings:
+                for d in [scope_time, *data]:
+                    column = np.full(stop - start, np.nan)
+                    part = d[start:stop]
+                    column[: len(part)] = part
+                    columns.append(column)
+        yield np.column_stack(columns)
+
+
+def iter_csv(recordings, time_base="per_scope", chunk_rows=CHUNK_ROWS):
+    """Yield the recordings as CSV, one chunk of rows at a time."""
+    header = io.StringIO()
+    csv.writer(header).writerow(table_columns(recordings, time_base))
+    yield header.getvalue().encode()
+
+    for chunk in iter_table_chunks(recordings, time_base, chunk_rows):
+        buffer = io.StringIO()
+        np.savetxt(buffer, chunk, delimiter=",", fmt="%.17g")
+        yield buffer.getvalue().encode()
+
+
+def iter_npz(recordings, time_base="per_scope", chunk_rows=CHUNK_ROWS):
+    """
+    Yield the recordings as an NPZ archive.
+
+    Each scope gets ``<name>/time``, ``<name>/data`` and ``<name>/labels``
+    arrays. With ``time_base="shared"`` the archive holds a single ``time``
+    array and every ``<name>/data`` is interpolated onto it.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        if time_base == "shared":
+            time = shared_time(recordings)
+            yield from _iter_npy(archive, sink, "time", time, chunk_rows)
+
+        for name, scope_time, data, port_labels in recordings:
+            if time_base == "shared":
+                data = _InterpolatedData(time, scope_time, data)
+            else:
+                yield from _iter_npy(
+                    archive, sink, f"{name}/time", scope_time, chunk_rows
+                )
+            yield from _iter_npy(archive, sink, f"{name}/data", data, chunk_rows)
+            yield from _iter_npy(
+                archive, sink, f"{name}/labels", np.array(port_labels), chunk_rows
+            )
+    yield sink.drain()
+
+
+def iter_parquet(recordings, time_base="per_scope", chunk_rows=CHUNK_ROWS):
+    """Yield the recordings as a Parquet file with one row group per chunk."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = table_columns(recordings, time_base)
+    schema = pa.schema([(column, pa.float64()) for column in columns])
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in iter_table_chunks(recordings, time_base, chunk_rows):
+            writer.write_table(pa.Table.from_arrays(list(chunk.T), schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def iter_hdf5(recordings, time_base="per_scope", chunk_rows=CHUNK_ROWS):
+    """
+    Yield the recordings as an HDF5 file with one group per scope.
+
+    HDF5 cannot be written to a stream, so the file is written to a temporary
+    directory first and then streamed from disk.
+    """
+    import h5py
+
+    tmp_dir = tempfile.mkdtemp(prefix="pathview-export-")
+    path = os.path.join(tmp_dir, "results.h5")
+    try:
+        with h5py.File(path, "w") as f:
+            if time_base == "shared":
+                time = shared_time(recordings)
+                f.create_dataset("time", data=time)
+
+            for name, scope_time, data, port_labels in recordings:
+                group = f.create_group(name.replace("/", "_"))
+                if time_base == "shared":
+                    data = _InterpolatedData(time, scope_time, data)
+                else:
+                    group.create_dataset("time", data=scope_time)
+                dataset = group.create_dataset("data", shape=data.shape, dtype="f8")
+                for start in range(0, data.shape[1], chunk_rows):
+                    dataset[:, start : start + chunk_rows] = data[
+                        :, start : start + chunk_rows
+                    ]
+                dataset.attrs["labels"] = port_labels
+
+        with open(path, "rb") as f:
+            while chunk := f.read(chunk_rows * 64):
+                yield chunk
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+EXPORTERS = {
+    "csv": iter_csv,
+    "npz": iter_npz,
+    "parquet": iter_parquet,
+    "hdf5": iter_hdf5,
+}
+
+_OPTIONAL_DEPENDENCIES = {"parquet": "pyarrow", "hdf5": "h5py"}
+
+
+def export_scopes(scopes, fmt="csv", time_base="per_scope", chunk_rows=CHUNK_ROWS):
+    """
+    Export the recordings of scopes as a stream of bytes.
+
+    The arguments are validated (and optional dependencies imported) eagerly,
+    so errors are raised here and not while the stream is consumed.
+
+    Args:
+        scopes: The Scope blocks to export.
+        fmt: One of ``EXPORT_FORMATS``.
+        time_base: ``"per_scope"`` or ``"shared"``.
+        chunk_rows: Maximum number of rows read per chunk.
+
+    Raises:
+        ValueError: If the format or time base is unknown.
+        ImportError: If the optional dependency of the format is not installed.
+
+    Returns:
+        A generator of bytes chunks.
+    """
+    if fmt not in EXPORTERS:
+        raise ValueError(
+            f"Unknown export format: {fmt}. Must be one of {list(EXPORTERS)}"
+        )
+    if time_base not in TIME_BASES:
+        raise ValueError(f"Unknown time base: {time_base}. Must be one of {TIME_BASES}")
+    if fmt in _OPTIONAL_DEPENDENCIES:
+        module = _OPTIONAL_DEPENDENCIES[fmt]
+        try:
+            __import__(module)
+        except ImportError:
+            raise ImportError(f"{module} is needed for the {fmt} export.")
+
+    return EXPORTERS[fmt](scope_recordings(scopes), time_base, chunk_rows)
@@ -0,0 +1,121 @@
+"""
+Plotly figures and CSV payloads of simulation results.
+
+The web app sends these with the results of /run-pathsim, and the benchmark
+suite times them. They only depend on the results (see ``pathview.results``),
+not on Flask.
+"""
+
+import base64
+
+import numpy as np
+from plotly.subplots import make_subplots
+
+from .export import scope_recordings
+
+
+def make_csv_payload(scopes):
+    """
+    Return the CSV payload of the scope recordings of a result.
+
+    Each scope keeps its own time column since scopes don't share time points.
+    """
+    csv_payload = {"scopes": []}
+
+    for name, scope_time, data, port_labels in scope_recordings(scopes):
+        csv_payload["scopes"].append(
+            {
+                "label": name,
+                "time": scope_time,
+                "series": dict(zip(port_labels, data)),
+            }
+        )
+
+    return csv_payload
+
+
+def csv_payload_size(scopes) -> int:
+    """Return the number of values of the CSV payload of the scope recordings."""
+    return sum(
+        len(scope_time) * (1 + len(data))
+        for _, scope_time, data, _ in scope_recordings(scopes)
+    )
+
+
+# traces with more points than this are drawn with WebGL
+SCATTERGL_THRESHOLD = 5000
+
+
+def encode_typed_array(array):
+    """Encode an array as a plotly.js typed array (base64 little-endian float64)."""
+    array = np.ascontiguousarray(array, dtype="<f8")
+    return {"dtype": "f8", "bdata": base64.b64encode(array).decode("ascii")}
+
+
+def make_trace(x, y, name, row):
+    axis_suffix = "" if row == 1 else str(row)
+    return {
+        "type": "scattergl" if len(x) > SCATTERGL_THRESHOLD else "scatter",
+        "x": encode_typed_array(x),
+        "y": encode_typed_array(y),
+        "mode": "lines",
+        "name": name,
+        "xaxis": f"x{axis_suffix}",
+        "yaxis": f"y{axis_suffix}",
+    }
+
+
+def make_plot(results):
+    """Build the plotly figure of the scopes and spectra of results as a plain dict.
+
+    Only the subplot layout goes through plotly, traces are written directly
+    with typed arrays to skip plotly's per-trace validation.
+    Returns None if there is nothing to plot.
+    """
+    scopes = results.scopes
+    spectra = results.spectra
+
+    # Share x only if there are only scopes or only spectra
+    shared_x = len(scopes) * len(spectra) == 0
+    n_rows = len(scopes) + len(spectra)
+
+    if n_rows == 0:
+        # No scopes or spectra to plot
+        return None
+
+    absolute_vertical_spacing = 0.05
+    relative_vertical_spacing = absolute_vertical_spacing / n_rows
+    fig = make_subplots(
+        rows=n_rows,
+        cols=1,
+        shared_xaxes=shared_x,
+        subplot_titles=[scope.label for scope in scopes]
+        + [spec.label for spec in spectra],
+        vertical_spacing=relative_vertical_spacing,
+    )
+    traces = []
+
+    # make scope plots
+    for i, scope in enumerate(scopes):
+        sim_time, data = scope.read()
+        if sim_time is None or data is None:
+            continue
+
+        for lb, d in zip(scope.labels, data):
+            traces.append(make_trace(sim_time, d, lb, row=i + 1))
+
+        fig.update_xaxes(title_text="Time", row=len(scopes), col=1)
+
+    # make spectrum plots
+    for i, spec in enumerate(spectra):
+        freq, data = spec.read()
+        if freq is None or data is None:
+            continue
+
+        for lb, d in zip(spec.labels, data):
+            traces.append(make_trace(freq, abs(d), lb, row=len(scopes) + i + 1))
+        fig.update_xaxes(title_text="Frequency", row=len(scopes) + i + 1, col=1)
+
+    fig.update_layout(height=500 * (len(scopes) + len(spectra)), hovermode="x unified")
+
+    return {"data": traces, "layout": fig.layout.to_plotly_json()}
@@ -0,0 +1,141 @@
+"""
+Coalesced, rate-limited delivery of log records to streaming clients.
+
+PathSim logs its progress many times per second. Publishing every record as
+its own server-sent event makes the browser re-render for every line, so
+``CoalescingLogHandler`` collects the records and publishes them to an
+``EventChannel`` in batches, one batch (a list of lines) every ``interval``
+seconds:
+
+- progress lines (``"TRANSIENT:  42% | ..."``) are summarised: only the
+  latest one of each batch is kept,
+- other lines are limited to ``max_lines_per_second`` (with bursts of up to
+  one second worth of lines), warnings and errors are always kept,
+- dropped lines are counted, and a batch with dropped lines ends with a line
+  telling how many.
+
+Emitting a record only appends it to a buffer: records are formatted by the
+flushing thread, and only the kept ones. Nothing is buffered when the
+channel has no subscribers.
+"""
+
+import collections
+import logging
+import re
+import threading
+import time
+
+# progress lines of pathsim.utils.progresstracker
+PROGRESS_PATTERN = re.compile(r"^\w+:\s+\d+% \|")
+
+
+class CoalescingLogHandler(logging.Handler):
+    """
+    Logging handler publishing batches of lines to an ``EventChannel``.
+
+    Args:
+        channel: The channel the batches are published to.
+        interval: Seconds between batches.
+        max_lines_per_second: Rate above which lines other than warnings
+            and errors are dropped.
+        level: Level of the handler.
+    """
+
+    def __init__(
+        self,
+        channel,
+        interval: float = 0.1,
+        max_lines_per_second: float = 50,
+        level=logging.NOTSET,
+    ):
+        super().__init__(level)
+        self.channel = channel
+        self.interval = interval
+        self.max_lines_per_second = max_lines_per_second
+        self.suppressed = 0
+        self._records = collections.deque()
+        self._pending = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._tokens = max_lines_per_second
+        self._refilled = time.monotonic()
+        self._thread = None
+
+    def emit(self, record):
+        # nothing is formatted nor kept when nobody listens
+        if not self.channel.has_subscribers:
+            return
+        self._records.append(record)
+        if not self._pending.is_set():
+            self._pending.set()
+        if self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._flush_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="log-flush", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._pending.wait()
+            # let the records of the interval accumulate
+            time.sleep(self.interval)
+            self._pending.clear()
+            self.flush()
+
+    def _take_tokens(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(
+            self.max_lines_per_second,
+            self._tokens + (now - self._refilled) * self.max_lines_per_second,
+        )
+        self._refilled = now
+        return self._tokens
+
+    def _is_progress(self, record) -> bool:
+        return isinstance(record.msg, str) and bool(PROGRESS_PATTERN.match(record.msg))
+
+    def flush(self):
+        """Publish the buffered records as one batch."""
+        with self._flush_lock:
+            records = []
+            while True:
+                try:
+                    records.append(self._records.popleft())
+                except IndexError:
+                    break
+            if not records:
+                return
+
+            # only the latest progress line is kept
+            last_progress = None
+            for i, record in enumerate(records):
+                if self._is_progress(record):
+                    last_progress = i
+
+            self._take_tokens()
+            lines, dropped = [], 0
+            for i, record in enumerate(records):
+                if record.levelno < logging.WARNING:
+                    if self._is_progress(record) and i != last_progress:
+                        dropped += 1
+                        continue
+                    if self._tokens < 1:
+                        dropped += 1
+                        continue
+                    self._tokens -= 1
+                try:
+                    message = self.format(record)
+                except Exception:
+                    self.handleError(record)
+                    continue
+                lines.extend(message.replace("\r", "\n").splitlines())
+
+            if dropped:
+                self.suppressed += dropped
+                lines.append(f"... {dropped} log lines suppressed")
+            if lines:
+                self.channel.publish(lines)
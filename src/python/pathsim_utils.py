@@ -18,7 +18,13 @@ Key mappings are provided for:
 - Solver types (NAME_TO_SOLVER): Maps string identifiers to PathSim solver classes
 """
 
+import copy
+import functools
 import math
+import os
+import shutil
+import tempfile
+import weakref
 import numpy as np
 from pathsim import Simulation, Connection
 from pathsim.events import Event
@@ -51,9 +57,13 @@ from .custom_pathsim_blocks import (
     Splitter3,
     FestimWall,
     Integrator,
+    DiskScope,
 )
 from pathsim_chem import Bubbler4, Splitter
+from .timing import phase
+from .checkpoint import capture_state, restore_state
 import inspect
+from typing import Mapping
 
 NAME_TO_SOLVER = {
     "RK4": pathsim.solvers.RK4,
@@ -166,6 +176,23 @@ map_str_to_event = {
 }
 
 
+@functools.lru_cache(maxsize=None)
+def signature_parameters(func) -> Mapping[str, inspect.Parameter]:
+    """
+    Return the parameters of the signature of a callable.
+
+    Signatures are computed once per callable (e.g. per block class), since
+    ``inspect.signature`` is slow compared to building most blocks.
+
+    Args:
+        func: The callable, e.g. a class or its ``__init__``.
+
+    Returns:
+        The read-only mapping of parameter names to ``inspect.Parameter``.
+    """
+    return inspect.signature(func).parameters
+
+
 def find_node_by_id(node_id: str, nodes: list[dict]) -> dict:
     """
     Find a node by its ID in a list of nodes.
@@ -377,7 +404,7 @@ def get_parameters_for_event_class(
         ValueError: If required parameters are missing, if function code execution fails,
                    or if parameter evaluation fails.
     """
-    parameters_for_class = inspect.signature(event_class.__init__).parameters
+    parameters_for_class = signature_parameters(event_class.__init__)
 
     # Create a local namespace for executing the event functions
     # we make a copy so that event functions aren't overwritten
@@ -441,7 +468,7 @@ def get_parameters_for_block_class(block_class, node, eval_namespace):
     Raises:
         ValueError: If required parameters are missing or if parameter evaluation fails.
     """
-    parameters_for_class = inspect.signature(block_class.__init__).parameters
+    parameters_for_class = signature_parameters(block_class.__init__)
     parameters = {}
     for k, value in parameters_for_class.items():
         if k == "self":
@@ -467,8 +494,29 @@ def get_parameters_for_block_class(block_class, node, eval_namespace):
     return parameters
 
 
+def make_disk_scope(
+    node: dict, scope_dir: str, eval_namespace: dict = None
+) -> DiskScope:
+    """
+    Construct a disk-backed scope from a scope node.
+
+    Args:
+        node: The scope node dictionary.
+        scope_dir: Directory in which the recording file is created.
+        eval_namespace: A namespace for evaluating expressions. Defaults to None.
+
+    Returns:
+        The constructed DiskScope, recording to ``<scope_dir>/<node id>.bin``.
+    """
+    parameters = get_parameters_for_block_class(
+        Scope, node, eval_namespace=eval_namespace
+    )
+    path = os.path.join(scope_dir, f"{node['id']}.bin")
+    return DiskScope(**parameters, path=path)
+
+
 def make_blocks(
-    nodes: list[dict], eval_namespace: dict = None
+    nodes: list[dict], eval_namespace: dict = None, scope_dir: str = None
 ) -> tuple[list[Block], list[Event]]:
     """
     Create Block objects from node data and collect any associated events.
@@ -476,6 +524,8 @@ def make_blocks(
     Args:
         nodes: List of node dictionaries containing block configuration data.
         eval_namespace: Optional namespace for evaluating expressions.
+        scope_dir: Optional directory. If given, scopes record to memory-mapped
+            files in this directory instead of keeping their data in memory.
 
     Returns:
         tuple: A tuple containing:
@@ -485,97 +535,178 @@ def make_blocks(
     blocks, events = [], []
 
     for node in nodes:
-        block = auto_block_construction(node, eval_namespace)
-        if hasattr(block, "create_reset_events"):
-            events.extend(block.create_reset_events())
-
+        if scope_dir is not None and node["type"] == "scope":
+            block = make_disk_scope(node, scope_dir, eval_namespace)
+        else:
+            block = auto_block_construction(node, eval_namespace)
         block.id = node["id"]
         block.label = node["data"]["label"]
+
+        if hasattr(block, "create_reset_events"):
+            for event in block.create_reset_events():
+                event.id, event.label = block.id, block.label
+                events.append(event)
         blocks.append(block)
 
     return blocks, events
 
 
-def get_input_index(block: Block, edge: dict, block_to_input_index: dict) -> int:
+def input_port(
+    block_class: type,
+    edge: dict,
+    next_index: int,
+    port_map: dict = None,
+    has_operations: bool = False,
+):
     """
-    Get the input index for a block based on the edge data.
+    Get the input port of the target of an edge from the target block class.
+
+    The rules only depend on the class of the block and on the edge handles,
+    so that ports can be resolved without instantiating the blocks.
 
     Args:
-        block: The block object to get the input index for.
+        block_class: The class of the target block.
         edge: The edge dictionary containing source and target information.
-        block_to_input_index: Dictionary mapping blocks to their current input index count.
+        next_index: The input index used if the target has a single input
+            handle, i.e. the number of edges connected to the target so far.
+        port_map: The input port map of the block, defaults to the one of
+            the class.
+        has_operations: Whether the block is an ``Adder`` with operations,
+            whose inputs are given by their handles.
 
     Returns:
-        int: The input index for the block.
+        int | str: The input index or port name.
 
     Raises:
         AssertionError: If the target block has multiple input ports but the connection
                        method hasn't been implemented for that block type.
     """
+    if port_map is None:
+        port_map = block_class._port_map_in
 
     if edge["targetHandle"] is not None:
-        if block._port_map_in:
+        if port_map:
             return edge["targetHandle"]
 
     # TODO maybe we could directly use the targetHandle as a port alias for these:
-    if type(block) in (Function, ODE, pathsim.blocks.Switch):
+    if block_class in (Function, ODE, pathsim.blocks.Switch):
         return int(edge["targetHandle"].replace("target-", ""))
-    if isinstance(block, Adder):
-        if block.operations:
+    if issubclass(block_class, Adder):
+        if has_operations:
             return int(edge["targetHandle"].replace("target-", ""))
 
     # make sure that the target block has only one input port (ie. that targetHandle is None)
     assert edge["targetHandle"] is None, (
-        f"Target block {block.id} has multiple input ports, "
+        f"Target block {edge['target']} has multiple input ports, "
         "but connection method hasn't been implemented."
     )
-    return block_to_input_index[block]
+    return next_index
 
 
-# TODO here we could only pass edge and not block
-def get_output_index(block: Block, edge: dict) -> int:
+def output_port(
+    block_class: type, edge: dict, port_map: dict = None, n_outputs: int = None
+):
     """
-    Get the output index for a block based on the edge data.
+    Get the output port of the source of an edge from the source block class.
+
+    Like ``input_port``, this doesn't need the block to be instantiated.
 
     Args:
-        block: The block object to get the output index for.
+        block_class: The class of the source block.
         edge: The edge dictionary containing source and target information.
+        port_map: The output port map of the block, defaults to the one of
+            the class.
+        n_outputs: The number of outputs of a Splitter block, to check the
+            handle against. Not checked if None.
 
     Returns:
-        int: The output index for the block.
+        int | str: The output index or port name.
 
     Raises:
         ValueError: If an invalid source handle is provided for a Splitter block.
         AssertionError: If the source block has multiple output ports but the connection
                        method hasn't been implemented for that block type.
     """
+    if port_map is None:
+        port_map = block_class._port_map_out
+
     if edge["sourceHandle"] is not None:
-        if block._port_map_out:
+        if port_map:
             return edge["sourceHandle"]
 
-    if isinstance(block, Splitter):
+    if issubclass(block_class, Splitter):
         # Splitter outputs are always in order, so we can use the handle directly
         assert edge["sourceHandle"], edge
         output_index = int(edge["sourceHandle"].replace("source", "")) - 1
-        if output_index >= block.n:
+        if n_outputs is not None and output_index >= n_outputs:
             raise ValueError(
                 f"Invalid source handle '{edge['sourceHandle']}' for {edge}."
             )
         return output_index
     # TODO maybe we could directly use the targetHandle as a port alias for these:
-    if type(block) in (Function, ODE):
+    if block_class in (Function, ODE):
         # Function and ODE outputs are always in order, so we can use the handle directly
         assert edge["sourceHandle"], edge
         return int(edge["sourceHandle"].replace("source-", ""))
 
     # make sure that the source block has only one output port (ie. that sourceHandle is None)
     assert edge["sourceHandle"] is None, (
-        f"Source block {block.id} has multiple output ports, "
+        f"Source block {edge['source']} has multiple output ports, "
         "but connection method hasn't been implemented."
     )
     return 0
 
 
+def get_input_index(block: Block, edge: dict, block_to_input_index: dict) -> int:
+    """
+    Get the input index for a block based on the edge data.
+
+    Args:
+        block: The block object to get the input index for.
+        edge: The edge dictionary containing source and target information.
+        block_to_input_index: Dictionary mapping blocks to their current input index count.
+
+    Returns:
+        int: The input index for the block.
+
+    Raises:
+        AssertionError: If the target block has multiple input ports but the connection
+                       method hasn't been implemented for that block type.
+    """
+    return input_port(
+        type(block),
+        edge,
+        block_to_input_index[block],
+        port_map=block._port_map_in,
+        has_operations=isinstance(block, Adder) and bool(block.operations),
+    )
+
+
+# TODO here we could only pass edge and not block
+def get_output_index(block: Block, edge: dict) -> int:
+    """
+    Get the output index for a block based on the edge data.
+
+    Args:
+        block: The block object to get the output index for.
+        edge: The edge dictionary containing source and target information.
+
+    Returns:
+        int: The output index for the block.
+
+    Raises:
+        ValueError: If an invalid source handle is provided for a Splitter block.
+        AssertionError: If the source block has multiple output ports but the connection
+                       method hasn't been implemented for that block type.
+    """
+    return output_port(
+        type(block),
+        edge,
+        port_map=block._port_map_out,
+        n_outputs=getattr(block, "n", None),
+    )
+
+
 def make_connections(nodes, edges, blocks) -> list[Connection]:
     """
     Create PathSim Connection objects from nodes, edges, and blocks data.
@@ -659,12 +790,16 @@ def make_events(events_data: list[dict], eval_namespace: dict = None) -> list[Ev
             raise ValueError(f"Unknown event type: {event_type}")
 
         event = auto_event_construction(event_data, eval_namespace)
+        event.id = event_data.get("id")
+        event.label = event_data["name"]
         events.append(event)
         eval_namespace[event_data["name"]] = event
     return events
 
 
-def make_default_scope(nodes, blocks) -> tuple[Scope, list[Connection]]:
+def make_default_scope(
+    nodes, blocks, scope_dir: str = None
+) -> tuple[Scope, list[Connection]]:
     """
     Create a default Scope block that connects to all other blocks in the simulation.
 
@@ -674,15 +809,21 @@ def make_default_scope(nodes, blocks) -> tuple[Scope, list[Connection]]:
     Args:
         nodes: List of node dictionaries containing block information (used for labels).
         blocks: List of Block objects to connect to the default scope.
+        scope_dir: Optional directory. If given, the default scope records to a
+            memory-mapped file in this directory.
 
     Returns:
         tuple: A tuple containing:
             - scope_default (Scope): The created default Scope block
             - connections_pathsim (list[Connection]): List of connections from blocks to the scope
     """
-    scope_default = Scope(
-        labels=[node["data"]["label"] for node in nodes],
-    )
+    labels = [node["data"]["label"] for node in nodes]
+    if scope_dir is None:
+        scope_default = Scope(labels=labels)
+    else:
+        scope_default = DiskScope(
+            labels=labels, path=os.path.join(scope_dir, "scope_default.bin")
+        )
     scope_default.id = "scope_default"
     scope_default.label = "Default Scope"
 
@@ -730,7 +871,53 @@ def make_var_name(node: dict) -> str:
     return var_name
 
 
-def make_pathsim_model(graph_data: dict) -> tuple[Simulation, float]:
+class ModelSimulation(Simulation):
+    """
+    Simulation built from graph data by ``make_pathsim_model``.
+
+    The user functions of a model (python code, event functions, lambdas in
+    block parameters) are executed from source text and can't be pickled, so
+    the simulation is pickled as its graph data and its state (see
+    ``checkpoint.capture_state``) and rebuilt from the graph data when
+    unpickled. This allows built models to be sent to worker processes or
+    stored on disk.
+
+    The copy of a model recording to disk (``scope_dir``) records to a new
+    temporary directory, with the rows recorded so far, so that the copy and
+    the original don't write to the same files. The directory of the copy is
+    removed when the copy is garbage collected (or at exit).
+    """
+
+    graph_data = None
+    scope_dir = None
+
+    def __reduce__(self):
+        if self.graph_data is None:
+            raise TypeError("Only simulations built from graph data can be pickled")
+        return (
+            _rebuild_simulation,
+            (self.graph_data, self.scope_dir, capture_state(self)),
+        )
+
+
+def _rebuild_simulation(graph_data, scope_dir, state):
+    if scope_dir is not None:
+        scope_dir = tempfile.mkdtemp(prefix="pathview-scopes-")
+    try:
+        simulation, _ = make_pathsim_model(graph_data, scope_dir=scope_dir)
+        restore_state(simulation, state)
+    except Exception:
+        if scope_dir is not None:
+            shutil.rmtree(scope_dir, ignore_errors=True)
+        raise
+    if scope_dir is not None:
+        weakref.finalize(simulation, shutil.rmtree, scope_dir, ignore_errors=True)
+    return simulation
+
+
+def make_pathsim_model(
+    graph_data: dict, scope_dir: str = None
+) -> tuple[Simulation, float]:
     """
     Create a complete PathSim simulation model from graph data.
 
@@ -746,6 +933,9 @@ def make_pathsim_model(graph_data: dict) -> tuple[Simulation, float]:
             - globalVariables: Dictionary of global variable definitions
             - events: List of event dictionaries (optional)
             - pythonCode: Custom Python code to execute (optional)
+        scope_dir: Optional directory. If given, scopes record to memory-mapped
+            files in this directory (see ``DiskScope``) so that long runs are
+            not limited by the available RAM.
 
     Returns:
         tuple: A tuple containing:
@@ -762,7 +952,8 @@ def make_pathsim_model(graph_data: dict) -> tuple[Simulation, float]:
     global_vars = graph_data.get("globalVariables", {})
 
     # Get the global variables namespace to use in eval calls
-    global_namespace = make_global_variables(global_vars)
+    with phase("global_variables"):
+        global_namespace = make_global_variables(global_vars)
 
     # Create a combined namespace that includes built-in functions and global variables
     eval_namespace = globals().copy()
@@ -772,7 +963,8 @@ def make_pathsim_model(graph_data: dict) -> tuple[Simulation, float]:
     python_code = graph_data.get("pythonCode", "")
     if python_code:
         try:
-            exec(python_code, eval_namespace)
+            with phase("python_code"):
+                exec(python_code, eval_namespace)
         except Exception as e:
             raise ValueError(f"Error executing custom Python code: {str(e)}")
 
@@ -781,14 +973,18 @@ def make_pathsim_model(graph_data: dict) -> tuple[Simulation, float]:
     )
 
     # Create blocks
-    blocks, events = make_blocks(nodes, eval_namespace)
+    with phase("make_blocks"):
+        blocks, events = make_blocks(nodes, eval_namespace, scope_dir=scope_dir)
 
-    connections_pathsim = make_connections(nodes, edges, blocks)
+    with phase("make_connections"):
+        connections_pathsim = make_connections(nodes, edges, blocks)
 
     # Add a Scope block if none exists
     # This ensures that there is always a scope to collect outputs
     if not any(isinstance(block, Scope) for block in blocks):
-        scope_default, connections_scope_def = make_default_scope(nodes, blocks)
+        scope_default, connections_scope_def = make_default_scope(
+            nodes, blocks, scope_dir=scope_dir
+        )
         blocks.append(scope_default)
         connections_pathsim.extend(connections_scope_def)
 
@@ -797,14 +993,18 @@ def make_pathsim_model(graph_data: dict) -> tuple[Simulation, float]:
         var_name = make_var_name(node)
         eval_namespace[var_name] = find_block_by_id(node["id"], blocks)
 
-    events += make_events(graph_data.get("events", []), eval_namespace)
+    with phase("make_events"):
+        events += make_events(graph_data.get("events", []), eval_namespace)
 
     # Create the simulation
-    simulation = Simulation(
-        blocks,
-        connections_pathsim,
-        events=events,
-        **solver_prms,  # Unpack solver parameters
-        **extra_params,  # Unpack extra parameters
-    )
+    with phase("make_simulation"):
+        simulation = ModelSimulation(
+            blocks,
+            connections_pathsim,
+            events=events,
+            **solver_prms,  # Unpack solver parameters
+            **extra_params,  # Unpack extra parameters
+        )
+    simulation.graph_data = copy.deepcopy(graph_data)
+    simulation.scope_dir = scope_dir
     return simulation, duration
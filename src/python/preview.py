@@ -0,0 +1,125 @@
+"""
+Coarse preview runs of a simulation.
+
+A preview gives a rough result in a fraction of the time of a full run: the
+solver settings of the built model are loosened (``factor`` times larger
+timesteps and error tolerances) and the scopes keep at most ``max_points``
+samples. The settings are restored afterwards, so the same model can then be
+reset and run at full accuracy without being built again::
+
+    with PreviewSettings(simulation, duration):
+        simulation.run(duration)
+    preview = SimulationResults.from_blocks(simulation.blocks)
+
+    simulation.reset()
+    simulation.run(duration)
+"""
+
+from pathsim import Simulation
+from pathsim.blocks import Scope
+
+from .profiling import _Instrumentation
+
+# factor by which the timesteps and tolerances are loosened
+PREVIEW_FACTOR = 10.0
+
+# samples kept per scope
+PREVIEW_POINTS = 500
+
+# the timesteps are not loosened beyond duration / MIN_PREVIEW_STEPS
+MIN_PREVIEW_STEPS = 100
+
+# error tolerances of the solvers that are loosened
+TOLERANCES = ("tolerance_lte_abs", "tolerance_lte_rel")
+
+
+def _coarsen_step(dt, factor: float, limit: float):
+    """Return ``dt`` times ``factor``, but no more than ``limit`` unless it was."""
+    if dt is None:
+        return None
+    return max(dt, min(dt * factor, limit))
+
+
+class PreviewSettings(_Instrumentation):
+    """
+    Loosens the solver settings and decimates the scopes of a simulation.
+
+    Usage::
+
+        with PreviewSettings(simulation, duration):
+            simulation.run(duration)
+
+    Args:
+        simulation: The simulation.
+        duration: The duration of the preview run.
+        factor: Factor by which the timestep, maximum timestep and error
+            tolerances are multiplied.
+        max_points: Maximum number of samples recorded by each scope (that
+            records every timestep).
+    """
+
+    def __init__(
+        self,
+        simulation: Simulation,
+        duration: float,
+        factor: float = PREVIEW_FACTOR,
+        max_points: int = PREVIEW_POINTS,
+    ):
+        super().__init__(simulation)
+        self.duration = duration
+        self.factor = factor
+        self.max_points = max_points
+        self._settings = None
+
+    def install(self):
+        """Loosen the solver settings and wrap the sampling of the scopes."""
+        simulation = self.simulation
+        # the engine of the simulation has the default tolerances of the solver
+        tolerances = {
+            name: simulation.solver_kwargs.get(name, getattr(simulation.engine, name))
+            for name in TOLERANCES
+            if hasattr(simulation.engine, name)
+        }
+        self._settings = (
+            simulation.dt,
+            simulation.dt_max,
+            dict(simulation.solver_kwargs),
+            tolerances,
+        )
+
+        limit = self.duration / MIN_PREVIEW_STEPS
+        simulation.dt = _coarsen_step(simulation.dt, self.factor, limit)
+        simulation.dt_max = _coarsen_step(simulation.dt_max, self.factor, limit)
+        simulation._set_solver(
+            **{name: value * self.factor for name, value in tolerances.items()}
+        )
+
+        interval = self.duration / self.max_points
+        for block in simulation.blocks:
+            if isinstance(block, Scope) and block.sampling_rate is None:
+                self._patch(block, "sample", self._decimate(interval))
+        super().install()
+
+    def _decimate(self, interval: float):
+        def wrap_sample(sample):
+            last = [None]
+
+            def wrapper(t):
+                if last[0] is None or t - last[0] >= interval or t < last[0]:
+                    last[0] = t
+                    sample(t)
+
+            return wrapper
+
+        return wrap_sample
+
+    def uninstall(self):
+        """Restore the solver settings and the sampling of the scopes."""
+        super().uninstall()
+        if self._settings is not None:
+            simulation = self.simulation
+            simulation.dt, simulation.dt_max, solver_kwargs, tolerances = self._settings
+            # the engines of the blocks are cast with the original tolerances
+            simulation._set_solver(**tolerances)
+            simulation.solver_kwargs = solver_kwargs
+            self._settings = None
@@ -0,0 +1,472 @@
+"""
+Profiling and solver statistics of simulation runs.
+
+``BlockProfiler`` wraps the ``update``, ``solve`` and ``step`` methods of every
+block and the ``func_evt`` and ``func_act`` functions of every event of a
+simulation with timing code. ``SolverStats`` wraps the timestep and algebraic
+loop methods of the simulation to record how the solver behaved. Both restore
+the original methods afterwards, and nothing is wrapped unless they are used.
+
+Times are attributed to graph nodes through the ``id`` and ``label``
+attributes set on blocks and events when the model is built, so the reports
+can be mapped back onto the graph.
+
+``SolverStats`` keeps running aggregates rather than one value per step, so
+its memory does not grow with the length of the run.
+"""
+
+import math
+import time
+
+import numpy as np
+from pathsim import Simulation
+
+BLOCK_METHODS = ("update", "solve", "step")
+EVENT_FUNCTIONS = ("func_evt", "func_act")
+
+
+class _NodeStats:
+    def __init__(self, node_id, label, node_type, kind):
+        self.id = node_id
+        self.label = label
+        self.type = node_type
+        self.kind = kind
+        self.methods = {}
+
+    def method(self, name: str) -> list:
+        return self.methods.setdefault(name, [0.0, 0])
+
+    @property
+    def time(self) -> float:
+        return sum(stats[0] for stats in self.methods.values())
+
+    @property
+    def calls(self) -> int:
+        return sum(stats[1] for stats in self.methods.values())
+
+
+def _timed(func, stats):
+    perf_counter = time.perf_counter
+
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats[0] += perf_counter() - start
+            stats[1] += 1
+
+    return wrapper
+
+
+class _Instrumentation:
+    """Base class wrapping attributes of objects and restoring them afterwards."""
+
+    def __init__(self, simulation: Simulation):
+        self.simulation = simulation
+        self.wall_time = 0.0
+        self._patched = []
+        self._start = None
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *exc):
+        self.uninstall()
+
+    def install(self):
+        self._start = time.perf_counter()
+
+    def uninstall(self):
+        """Restore the original methods."""
+        if self._start is not None:
+            self.wall_time += time.perf_counter() - self._start
+            self._start = None
+        for obj, name, had_attribute, original in reversed(self._patched):
+            if had_attribute:
+                setattr(obj, name, original)
+            else:
+                delattr(obj, name)
+        self._patched.clear()
+
+    def _patch(self, obj, name: str, make_wrapper):
+        func = getattr(obj, name, None)
+        if func is None:
+            return
+        had_attribute = name in vars(obj)
+        self._patched.append((obj, name, had_attribute, vars(obj).get(name)))
+        setattr(obj, name, make_wrapper(func))
+
+    def _elapsed(self) -> float:
+        if self._start is None:
+            return self.wall_time
+        return self.wall_time + time.perf_counter() - self._start
+
+    def _graph_events(self):
+        """Yield the events of the simulation that don't belong to a block."""
+        owned_events = {
+            id(event)
+            for block in self.simulation.blocks
+            for event in getattr(block, "events", [])
+        }
+        for event in self.simulation.events:
+            if id(event) not in owned_events:
+                yield event
+
+
+class BlockProfiler(_Instrumentation):
+    """
+    Profiles the blocks and events of a simulation while it runs.
+
+    Usage::
+
+        with BlockProfiler(simulation) as profiler:
+            simulation.run(duration)
+        report = profiler.report()
+
+    Args:
+        simulation: The simulation to profile.
+    """
+
+    def __init__(self, simulation: Simulation):
+        super().__init__(simulation)
+        self._stats = []
+
+    def install(self):
+        """Wrap the block methods and event functions with timing code."""
+        for block in self.simulation.blocks:
+            stats = self._add_stats(block, "block")
+            for name in BLOCK_METHODS:
+                self._patch_timed(block, name, stats)
+            # internal events of a block (e.g. sampling of scopes) count
+            # towards the block
+            for event in getattr(block, "events", []):
+                for name in EVENT_FUNCTIONS:
+                    self._patch_timed(event, name, stats, prefix="event.")
+
+        for event in self._graph_events():
+            stats = self._add_stats(event, "event")
+            for name in EVENT_FUNCTIONS:
+                self._patch_timed(event, name, stats)
+
+        super().install()
+
+    def _add_stats(self, obj, kind: str) -> _NodeStats:
+        stats = _NodeStats(
+            getattr(obj, "id", None),
+            getattr(obj, "label", None),
+            type(obj).__name__,
+            kind,
+        )
+        self._stats.append(stats)
+        return stats
+
+    def _patch_timed(self, obj, name: str, stats: _NodeStats, prefix: str = ""):
+        method_stats = stats.method(prefix + name)
+        self._patch(obj, name, lambda func: _timed(func, method_stats))
+
+    def report(self) -> dict:
+        """
+        Return the profile of the run, most expensive nodes first.
+
+        Returns:
+            A dictionary with the ``wall_time`` of the run in seconds, the
+            ``profiled_time`` spent in blocks and events and a list of
+            ``nodes``. Each node has its ``id``, ``label``, ``type``, ``kind``
+            (``"block"`` or ``"event"``), cumulative ``time`` in seconds,
+            number of ``calls``, ``share`` of the wall time and a breakdown of
+            ``time`` and ``calls`` per method.
+        """
+        wall_time = self._elapsed()
+        nodes = [
+            {
+                "id": stats.id,
+                "label": stats.label,
+                "type": stats.type,
+                "kind": stats.kind,
+                "time": stats.time,
+                "calls": stats.calls,
+                "share": stats.time / wall_time if wall_time > 0 else 0.0,
+                "methods": {
+                    name: {"time": method_time, "calls": calls}
+                    for name, (method_time, calls) in stats.methods.items()
+                    if calls
+                },
+            }
+            for stats in self._stats
+        ]
+        nodes.sort(key=lambda node: node["time"], reverse=True)
+        return {
+            "wall_time": wall_time,
+            "profiled_time": sum(node["time"] for node in nodes),
+            "nodes": nodes,
+        }
+
+
+class _Summary:
+    """Running total, count and maximum of integer values."""
+
+    def __init__(self):
+        self.total = 0
+        self.count = 0
+        self.max = 0
+
+    def add(self, value: int):
+        self.total += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def report(self) -> dict:
+        if not self.count:
+            return {"total": 0, "mean": 0.0, "max": 0}
+        return {
+            "total": int(self.total),
+            "mean": self.total / self.count,
+            "max": int(self.max),
+        }
+
+
+# resolution of the timestep histogram recorded while running, in bins per
+# decade, rebinned to ``SolverStats.histogram_bins`` bins in the report
+_HISTOGRAM_RESOLUTION = 32
+
+
+class _DtTrace:
+    """
+    Timestep history decimated while running to at most ``2 * points`` steps.
+
+    Consecutive steps are merged into buckets of ``stride`` steps, keeping the
+    smallest timestep of every bucket so that the steps where the solver
+    struggled remain visible. The stride doubles when the buffer is full.
+    """
+
+    def __init__(self, points: int):
+        self.points = points
+        self.stride = 1
+        self.times = []
+        self.dts = []
+        self._bucket = None
+        self._count = 0
+
+    def add(self, t: float, dt: float):
+        if self._bucket is None or dt < self._bucket[1]:
+            self._bucket = (t, dt)
+        self._count += 1
+        if self._count < self.stride:
+            return
+        self.times.append(self._bucket[0])
+        self.dts.append(self._bucket[1])
+        self._bucket = None
+        self._count = 0
+        if len(self.dts) >= 2 * self.points:
+            self._merge()
+
+    def _merge(self):
+        times, dts = [], []
+        for i in range(0, len(self.dts) - 1, 2):
+            j = i if self.dts[i] <= self.dts[i + 1] else i + 1
+            times.append(self.times[j])
+            dts.append(self.dts[j])
+        self.times, self.dts = times, dts
+        self.stride *= 2
+
+    def report(self) -> dict:
+        times, dts = list(self.times), list(self.dts)
+        if self._bucket is not None:
+            times.append(self._bucket[0])
+            dts.append(self._bucket[1])
+        times, dts = np.array(times), np.array(dts)
+        if len(dts) > self.points:
+            buckets = np.array_split(np.arange(len(dts)), self.points)
+            index = np.array([b[np.argmin(dts[b])] for b in buckets if len(b)])
+            times, dts = times[index], dts[index]
+        return {"time": times.tolist(), "dt": dts.tolist()}
+
+
+class SolverStats(_Instrumentation):
+    """
+    Records statistics about the solver while a simulation runs.
+
+    Usage::
+
+        with SolverStats(simulation) as stats:
+            simulation.run(duration)
+        report = stats.report()
+
+    Args:
+        simulation: The simulation to observe.
+        dt_trace_points: If given, the report includes the timestep history
+            downsampled to at most this many points.
+        histogram_bins: Number of logarithmic bins of the timestep histogram.
+    """
+
+    def __init__(
+        self,
+        simulation: Simulation,
+        dt_trace_points: int = None,
+        histogram_bins: int = 20,
+    ):
+        super().__init__(simulation)
+        self.dt_trace_points = dt_trace_points
+        self.histogram_bins = histogram_bins
+        self.rejected = 0
+        self.evals = 0
+        self.accepted = 0
+        # running aggregates of the accepted timesteps
+        self._dt_sum = 0.0
+        self._dt_min = math.inf
+        self._dt_max = 0.0
+        self._dt_min_positive = math.inf
+        self._dt_bins = {}
+        self._dt_trace = _DtTrace(dt_trace_points) if dt_trace_points else None
+        self._solver_iterations = _Summary()
+        self._loop_iterations = _Summary()
+        self._limit_reached = 0
+        self._loop_updates = 0
+        self._start_time = simulation.time
+        self._event_offsets = {}
+
+    def install(self):
+        """Wrap the timestep and algebraic loop methods of the simulation."""
+        simulation = self.simulation
+        self._start_time = simulation.time
+        self._event_offsets = {
+            id(event): len(event._times) for event in self._graph_events()
+        }
+
+        iterations_max = simulation.iterations_max
+
+        def wrap_timestep(timestep):
+            def wrapper(*args, **kwargs):
+                time_before = simulation.time
+                result = timestep(*args, **kwargs)
+                success, _, _, evals, solver_its = result
+                self.evals += evals
+                if success:
+                    self._add_step(simulation.time, simulation.time - time_before)
+                    if not simulation.engine.is_explicit:
+                        self._solver_iterations.add(solver_its)
+                        if solver_its >= iterations_max:
+                            self._limit_reached += 1
+                else:
+                    self.rejected += 1
+                return result
+
+            return wrapper
+
+        def wrap_booster_update(update):
+            def wrapper(*args, **kwargs):
+                self._loop_updates += 1
+                return update(*args, **kwargs)
+
+            return wrapper
+
+        def wrap_loops(loops):
+            n_boosters = len(simulation.boosters)
+
+            def wrapper(*args, **kwargs):
+                updates_before = self._loop_updates
+                try:
+                    return loops(*args, **kwargs)
+                finally:
+                    its = (self._loop_updates - updates_before) // n_boosters
+                    self._loop_iterations.add(its)
+                    # the loop solver stops one iteration short of the limit
+                    if its >= iterations_max - 1:
+                        self._limit_reached += 1
+
+            return wrapper
+
+        self._patch(simulation, "timestep", wrap_timestep)
+        if simulation.boosters:
+            for booster in simulation.boosters:
+                self._patch(booster, "update", wrap_booster_update)
+            self._patch(simulation, "_loops", wrap_loops)
+
+        super().install()
+
+    def _add_step(self, t: float, dt: float):
+        self.accepted += 1
+        self._dt_sum += dt
+        self._dt_min = min(self._dt_min, dt)
+        self._dt_max = max(self._dt_max, dt)
+        if dt > 0:
+            self._dt_min_positive = min(self._dt_min_positive, dt)
+            key = math.floor(math.log10(dt) * _HISTOGRAM_RESOLUTION)
+            self._dt_bins[key] = self._dt_bins.get(key, 0) + 1
+        if self._dt_trace is not None:
+            self._dt_trace.add(t, dt)
+
+    def _dt_histogram(self) -> dict:
+        if not self._dt_bins:
+            return {"edges": [], "counts": []}
+        low, high = self._dt_min_positive, self._dt_max
+        # the recorded bins are placed by their geometric center
+        keys = np.array(list(self._dt_bins))
+        counts = np.array(list(self._dt_bins.values()))
+        centers = np.clip(10 ** ((keys + 0.5) / _HISTOGRAM_RESOLUTION), low, high)
+        if np.isclose(low, high):
+            edges = np.array([low, high])
+        else:
+            edges = np.geomspace(low, high, self.histogram_bins + 1)
+        counts, edges = np.histogram(centers, bins=edges, weights=counts)
+        return {"edges": edges.tolist(), "counts": counts.astype(int).tolist()}
+
+    def report(self) -> dict:
+        """
+        Return the statistics of the run.
+
+        Returns:
+            A dictionary with the solver name, accepted and rejected step
+            counts, a summary and logarithmic histogram of the accepted
+            timesteps, the implicit solver and algebraic loop fixed-point
+            iterations (with ``iterations_max`` and ``tolerance_fpi`` and the
+            number of times the iteration limit was reached), the trigger
+            times of the graph events, the number of system evaluations, the
+            simulated and wall time and the wall time per simulated second.
+            With ``dt_trace_points`` it also has a downsampled ``dt_trace``.
+        """
+        simulation = self.simulation
+        wall_time = self._elapsed()
+        sim_time = simulation.time - self._start_time
+        accepted = self.accepted
+
+        events = []
+        for event in self._graph_events():
+            event_times = event._times[self._event_offsets.get(id(event), 0) :]
+            events.append(
+                {
+                    "id": getattr(event, "id", None),
+                    "label": getattr(event, "label", None),
+                    "type": type(event).__name__,
+                    "times": [float(t) for t in event_times],
+                }
+            )
+
+        report = {
+            "solver": type(simulation.engine).__name__,
+            "steps": {"accepted": accepted, "rejected": self.rejected},
+            "dt": {
+                "min": float(self._dt_min) if accepted else None,
+                "max": float(self._dt_max) if accepted else None,
+                "mean": self._dt_sum / accepted if accepted else None,
+                "histogram": self._dt_histogram(),
+            },
+            "fixed_point": {
+                "iterations_max": simulation.iterations_max,
+                "tolerance_fpi": simulation.tolerance_fpi,
+                "solver_iterations": self._solver_iterations.report(),
+                "loop_iterations": self._loop_iterations.report(),
+                "limit_reached": self._limit_reached,
+            },
+            "events": events,
+            "evals": self.evals,
+            "sim_time": sim_time,
+            "wall_time": wall_time,
+            "wall_time_per_sim_second": wall_time / sim_time if sim_time > 0 else None,
+        }
+        if self._dt_trace is not None:
+            report["dt_trace"] = self._dt_trace.report()
+        return report
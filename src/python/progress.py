@@ -0,0 +1,291 @@
+"""
+Progress and ETA of simulation runs.
+
+A ``Progress`` is the shared state of one run: the simulation loop writes a
+few numbers to it at every accepted timestep (through ``ProgressTracker``,
+which wraps ``Simulation.timestep`` like ``SolverStats``), and readers take
+``snapshot``s of it from other threads. The ETA is extrapolated by the
+readers from the wall time per simulated second over the last few seconds,
+so the loop does no extra work for it.
+
+Runs are registered in a ``ProgressRegistry`` under an id chosen by the
+client, so that progress can be polled or streamed while the request that
+runs the simulation is still pending::
+
+    progress = registry.create(run_id)
+    progress.start(simulation.time, simulation.time + duration)
+    with ProgressTracker(simulation, progress):
+        simulation.run(duration)
+    progress.finish()
+
+An id can only be reused once its run is finished. Anyone knowing the id of
+a run can read its progress, but only the holder of its ``token`` (chosen by
+the client or issued by the server) can cancel it.
+"""
+
+import collections
+import re
+import secrets
+import threading
+import time
+
+from pathsim import Simulation
+
+from .profiling import _Instrumentation
+
+# states of a run, in order
+STATES = ("queued", "building", "running", "done", "failed", "cancelled")
+FINISHED_STATES = ("done", "failed", "cancelled")
+
+# wall time in seconds over which the rate of the simulation is measured
+ETA_WINDOW = 5.0
+
+RUN_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class RunIdInUse(ValueError):
+    """A run that is not finished is already registered under the id."""
+
+
+class Progress:
+    """
+    Shared progress state of a simulation run.
+
+    Args:
+        run_id: The id of the run.
+        state: The initial state, one of ``STATES``.
+        token: The secret needed to cancel the run, a random one if None.
+    """
+
+    def __init__(self, run_id: str, state: str = "queued", token: str = None):
+        self.run_id = run_id
+        self.state = state
+        self.token = token or secrets.token_urlsafe(16)
+        self.error = None
+        self.cancelled = False
+        # written by the simulation loop
+        self.time = 0.0
+        self.dt = None
+        self.steps = 0
+        self.rejected = 0
+        # simulated time span of the run
+        self.start_time = 0.0
+        self.end_time = 0.0
+        self.created = time.monotonic()
+        self._started = None
+        self._finished = None
+        self._samples = collections.deque()
+        self._lock = threading.Lock()
+
+    def set_state(self, state: str):
+        if state not in STATES:
+            raise ValueError(f"Unknown state: {state}. Must be one of {STATES}")
+        self.state = state
+
+    def start(self, start_time: float, end_time: float):
+        """Mark the run as running from ``start_time`` to ``end_time``."""
+        self.start_time = self.time = start_time
+        self.end_time = end_time
+        self._started = time.monotonic()
+        self._samples.append((self._started, start_time))
+        self.state = "running"
+
+    def cancel(self):
+        """
+        Ask for the run to stop.
+
+        A ``ProgressTracker`` stops the simulation at its next timestep, the
+        run is then finished as cancelled.
+        """
+        self.cancelled = True
+
+    def authorizes(self, token: str) -> bool:
+        """Whether ``token`` is the token of the run."""
+        return isinstance(token, str) and secrets.compare_digest(token, self.token)
+
+    def finish(self, error: str = None):
+        """Mark the run as done, cancelled, or failed with an error message."""
+        self._finished = time.monotonic()
+        self.error = error
+        if error is not None:
+            self.state = "failed"
+        elif self.cancelled:
+            self.state = "cancelled"
+        else:
+            self.state = "done"
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def _rate(self, now: float, sim_time: float):
+        """Simulated seconds per wall second over the last ``ETA_WINDOW``."""
+        with self._lock:
+            samples = self._samples
+            if not samples or now - samples[-1][0] >= 0.1 * ETA_WINDOW:
+                samples.append((now, sim_time))
+            while len(samples) > 2 and now - samples[1][0] >= ETA_WINDOW:
+                samples.popleft()
+            wall_0, sim_0 = samples[0]
+        if now - wall_0 <= 0 or sim_time <= sim_0:
+            return None
+        return (sim_time - sim_0) / (now - wall_0)
+
+    def snapshot(self) -> dict:
+        """
+        Return the current progress.
+
+        Returns:
+            A dictionary with the ``run_id``, ``state``, ``error``, simulated
+            ``time`` and ``end_time``, ``fraction`` done, number of accepted
+            ``steps`` and ``rejected`` steps, last timestep ``dt``, ``elapsed``
+            wall time in seconds since the run started (or was created, if
+            not started), simulated seconds per wall second (``rate``) and
+            estimated remaining wall time (``eta``, None if unknown).
+        """
+        now = time.monotonic()
+        sim_time = self.time
+        span = self.end_time - self.start_time
+        fraction = 0.0
+        if self.state == "done":
+            fraction = 1.0
+        elif span > 0:
+            fraction = min(max((sim_time - self.start_time) / span, 0.0), 1.0)
+
+        rate = eta = None
+        if self.state == "running":
+            rate = self._rate(now, sim_time)
+            if rate:
+                eta = (self.end_time - sim_time) / rate
+        elif self.state == "done":
+            eta = 0.0
+
+        started = self._started if self._started is not None else self.created
+        end = self._finished if self._finished is not None else now
+        return {
+            "run_id": self.run_id,
+            "state": self.state,
+            "error": self.error,
+            "time": sim_time,
+            "end_time": self.end_time,
+            "fraction": fraction,
+            "steps": self.steps,
+            "rejected": self.rejected,
+            "dt": self.dt,
+            "elapsed": end - started,
+            "rate": rate,
+            "eta": eta,
+        }
+
+
+class ProgressTracker(_Instrumentation):
+    """
+    Updates a ``Progress`` at every timestep of a simulation, and stops the
+    simulation when the run is cancelled.
+
+    Usage::
+
+        with ProgressTracker(simulation, progress):
+            simulation.run(duration)
+
+    Args:
+        simulation: The simulation to observe.
+        progress: The progress state updated.
+    """
+
+    def __init__(self, simulation: Simulation, progress: Progress):
+        super().__init__(simulation)
+        self.progress = progress
+
+    def install(self):
+        """Wrap the timestep method of the simulation."""
+        simulation = self.simulation
+        progress = self.progress
+
+        def wrap_timestep(timestep):
+            def wrapper(*args, **kwargs):
+                time_before = simulation.time
+                result = timestep(*args, **kwargs)
+                if result[0]:
+                    progress.steps += 1
+                    progress.dt = simulation.time - time_before
+                    progress.time = simulation.time
+                else:
+                    progress.rejected += 1
+                if progress.cancelled:
+                    simulation.stop()
+                return result
+
+            return wrapper
+
+        self._patch(simulation, "timestep", wrap_timestep)
+        super().install()
+
+
+class ProgressRegistry:
+    """
+    Thread-safe registry of the progress of runs.
+
+    Finished runs are kept until ``max_finished`` more recent runs finished,
+    so that their final state can still be read.
+
+    Args:
+        max_finished: Number of finished runs kept.
+    """
+
+    def __init__(self, max_finished: int = 64):
+        self.max_finished = max_finished
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._runs)
+
+    def __contains__(self, run_id):
+        return run_id in self._runs
+
+    def create(self, run_id: str, state: str = "queued", token: str = None) -> Progress:
+        """
+        Register a new run, replacing any finished run with the same id.
+
+        Args:
+            run_id: The id of the run, letters, digits, ``-`` and ``_``.
+            state: The initial state.
+            token: The secret needed to cancel the run, a random one if None.
+
+        Raises:
+            ValueError: If the id or the token is invalid.
+            RunIdInUse: If a run with the same id is not finished.
+
+        Returns:
+            The progress of the run.
+        """
+        if not isinstance(run_id, str) or not RUN_ID_PATTERN.match(run_id):
+            raise ValueError(f"Invalid run id: {run_id!r}")
+        if token is not None and (not isinstance(token, str) or len(token) < 16):
+            raise ValueError("Invalid cancel token, it must have 16 characters or more")
+        progress = Progress(run_id, state, token=token)
+        with self._lock:
+            current = self._runs.get(run_id)
+            if current is not None and not current.finished:
+                raise RunIdInUse(f"Run {run_id} is already in progress")
+            self._runs[run_id] = progress
+            self._prune()
+        return progress
+
+    def get(self, run_id: str) -> Progress:
+        """Return the progress of a run, None if unknown."""
+        return self._runs.get(run_id)
+
+    def active(self) -> list:
+        """Return the progress of the runs that are not finished."""
+        with self._lock:
+            self._prune()
+            return [p for p in self._runs.values() if not p.finished]
+
+    def _prune(self):
+        finished = [p for p in self._runs.values() if p.finished]
+        if len(finished) > self.max_finished:
+            finished.sort(key=lambda p: p._finished)
+            for progress in finished[: len(finished) - self.max_finished]:
+                del self._runs[progress.run_id]
@@ -0,0 +1,128 @@
+"""
+In-memory cache of finished simulation results.
+
+Results are kept in a least-recently-used order and identified by a random
+result id. A result can own a run directory (for instance the memory-mapped
+recordings of ``DiskScope`` blocks); the directory is deleted when the result
+is evicted from the cache.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of simulation results.
+
+    Args:
+        max_entries: Maximum number of results kept before the least recently
+            used one is evicted.
+        root_dir: Directory under which run directories are created. A
+            temporary directory is created on first use if not provided.
+    """
+
+    def __init__(self, max_entries: int = 8, root_dir: str = None):
+        self.max_entries = max_entries
+        self.root_dir = root_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, result_id):
+        return result_id in self._entries
+
+    def new_id(self) -> str:
+        """Return a new unique result id."""
+        return uuid.uuid4().hex
+
+    def make_run_dir(self, result_id: str) -> str:
+        """
+        Create the run directory of a result.
+
+        Args:
+            result_id: The id of the result owning the directory.
+
+        Returns:
+            The path of the created directory.
+        """
+        with self._lock:
+            if self.root_dir is None:
+                self.root_dir = tempfile.mkdtemp(prefix="pathview-results-")
+        run_dir = os.path.join(self.root_dir, result_id)
+        os.makedirs(run_dir, exist_ok=True)
+        return run_dir
+
+    def put(self, result_id: str, result, run_dir: str = None):
+        """
+        Store a result, evicting the least recently used ones if the cache is full.
+
+        Args:
+            result_id: The id of the result.
+            result: The result object.
+            run_dir: Optional directory owned by the result, removed on eviction.
+        """
+        with self._lock:
+            self._entries[result_id] = (result, run_dir)
+            self._entries.move_to_end(result_id)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[1])
+
+        for _, evicted_dir in evicted:
+            _remove_dir(evicted_dir)
+
+    def get(self, result_id: str):
+        """
+        Return a result and mark it as recently used.
+
+        Args:
+            result_id: The id of the result.
+
+        Returns:
+            The result, or None if it is not (or no longer) in the cache.
+        """
+        with self._lock:
+            if result_id not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(result_id)
+            return self._entries[result_id][0]
+
+    def evict(self, result_id: str):
+        """
+        Remove a result and its run directory.
+
+        This also cleans up a run directory created with ``make_run_dir``
+        for a result that was never stored, e.g. after a failed run.
+
+        Args:
+            result_id: The id of the result.
+        """
+        with self._lock:
+            self._entries.pop(result_id, None)
+            root_dir = self.root_dir
+        if root_dir is not None:
+            _remove_dir(os.path.join(root_dir, result_id))
+
+    def clear(self):
+        """Remove all results and their run directories."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for _, run_dir in entries:
+            _remove_dir(run_dir)
+
+
+def _remove_dir(run_dir):
+    if run_dir is not None:
+        shutil.rmtree(run_dir, ignore_errors=True)
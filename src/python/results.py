@@ -0,0 +1,204 @@
+"""
+Simulation results as NumPy arrays.
+
+``simulate`` builds and runs a model and returns a ``SimulationResults``
+object holding the recordings of its scopes and spectra. Nothing in here
+depends on Flask or Plotly: figures and JSON payloads are built from the
+results by the web app, notebooks and scripts use the arrays directly::
+
+    import pathview
+
+    results = pathview.simulate("example_graphs/pid.json", duration=10)
+    time, data = results["scope 5"].read()
+"""
+
+import json
+import os
+
+import numpy as np
+from pathsim.blocks import Scope, Spectrum
+
+from .pathsim_utils import make_pathsim_model
+
+
+class Recording:
+    """
+    Recorded data of a scope or spectrum block.
+
+    Recordings can be used wherever the blocks are read, e.g. by
+    ``export_scopes``, since they have the same ``id``, ``label``, ``labels``
+    and ``read`` interface.
+
+    Args:
+        id: The node id of the block.
+        label: The label of the block.
+        kind: ``"scope"`` or ``"spectrum"``.
+        time: The recorded time points of a scope or the frequencies of a
+            spectrum, None if nothing was recorded.
+        data: The recorded data, one row per input port, complex for spectra.
+            None if nothing was recorded.
+        labels: The labels of the input ports.
+    """
+
+    def __init__(self, id, label, kind, time, data, labels):
+        self.id = id
+        self.label = label
+        self.kind = kind
+        self.time = time
+        self.data = data
+        self.labels = labels
+
+    def __repr__(self):
+        n_points = 0 if self.time is None else len(self.time)
+        return (
+            f"Recording(id={self.id!r}, label={self.label!r}, kind={self.kind!r}, "
+            f"ports={len(self.labels)}, points={n_points})"
+        )
+
+    @classmethod
+    def from_block(cls, block) -> "Recording":
+        """Read the recording of a ``Scope`` or ``Spectrum`` block."""
+        kind = "spectrum" if isinstance(block, Spectrum) else "scope"
+        time, data = block.read()
+        if data is not None:
+            data = np.asarray(data)
+        n_ports = 0 if data is None else len(data)
+        block_labels = list(getattr(block, "labels", None) or [])
+        labels = [
+            block_labels[i] if i < len(block_labels) else f"port {i}"
+            for i in range(n_ports)
+        ]
+        return cls(
+            id=getattr(block, "id", None),
+            label=getattr(block, "label", None),
+            kind=kind,
+            time=time,
+            data=data,
+            labels=labels,
+        )
+
+    def read(self):
+        """Return the ``(time, data)`` arrays, like ``Scope.read``."""
+        return self.time, self.data
+
+    def series(self) -> dict:
+        """Return the data of each input port keyed by port label."""
+        if self.data is None:
+            return {}
+        return dict(zip(self.labels, self.data))
+
+
+class SimulationResults:
+    """
+    Recordings of the scopes and spectra of a simulation.
+
+    Recordings are indexed by node id or by label, in the order of the blocks
+    in the model::
+
+        results["scope 5"].time
+        results["5"].series()["x"]
+
+    Args:
+        recordings: The recordings.
+        time: The simulation time at the end of the run.
+        stats: Optional solver statistics, see ``SolverStats.report``.
+    """
+
+    def __init__(self, recordings, time: float = None, stats: dict = None):
+        self.recordings = list(recordings)
+        self.time = time
+        self.stats = stats
+
+    @classmethod
+    def from_blocks(cls, blocks, time: float = None, stats: dict = None):
+        """
+        Read the recordings of the scopes and spectra among blocks.
+
+        Args:
+            blocks: Blocks of a simulation, other than scopes and spectra are
+                ignored.
+            time: The simulation time at the end of the run.
+            stats: Optional solver statistics.
+
+        Returns:
+            The results.
+        """
+        recordings = [
+            Recording.from_block(block)
+            for block in blocks
+            if isinstance(block, (Scope, Spectrum))
+        ]
+        return cls(recordings, time=time, stats=stats)
+
+    @property
+    def scopes(self) -> list[Recording]:
+        """The recordings of the scopes."""
+        return [r for r in self.recordings if r.kind == "scope"]
+
+    @property
+    def spectra(self) -> list[Recording]:
+        """The recordings of the spectra."""
+        return [r for r in self.recordings if r.kind == "spectrum"]
+
+    def keys(self) -> list:
+        """Return the node ids of the recordings."""
+        return [r.id for r in self.recordings]
+
+    def __getitem__(self, key) -> Recording:
+        for recording in self.recordings:
+            if str(recording.id) == str(key):
+                return recording
+        for recording in self.recordings:
+            if recording.label == key:
+                return recording
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self.recordings)
+
+    def __len__(self):
+        return len(self.recordings)
+
+    def __repr__(self):
+        return f"SimulationResults({self.recordings!r})"
+
+
+def simulate(
+    graph,
+    duration: float = None,
+    scope_dir: str = None,
+    log: bool = False,
+) -> SimulationResults:
+    """
+    Build and run a model and return its recordings.
+
+    Args:
+        graph: The graph data, or the path of a graph JSON file.
+        duration: Simulated time. Defaults to the ``simulation_duration`` of
+            the graph.
+        scope_dir: Optional directory where scopes record to memory-mapped
+            files (see ``DiskScope``), for runs too long to record in memory.
+        log: Whether the simulation logs its progress.
+
+    Returns:
+        The results of the simulation.
+    """
+    if isinstance(graph, (str, os.PathLike)):
+        with open(graph) as f:
+            graph = json.load(f)
+
+    graph = dict(graph)
+    graph["solverParams"] = {
+        **graph.get("solverParams", {}),
+        "log": "true" if log else "false",
+    }
+    simulation, graph_duration = make_pathsim_model(graph, scope_dir=scope_dir)
+    simulation.run(graph_duration if duration is None else duration)
+    return SimulationResults.from_blocks(simulation.blocks, time=simulation.time)
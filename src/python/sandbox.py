@@ -0,0 +1,331 @@
+"""
+Execution of user code in a pool of warm interpreter subprocesses.
+
+The code of the Python editor is executed in worker processes rather than in
+the web worker, so that it cannot block or crash the server, and so that
+capturing its output does not swap the ``sys.stdout`` of threads serving
+other requests.
+
+Workers are started with the ``spawn`` method (the server may have threads)
+and import NumPy and PathSim once, before taking their first call. Every
+call runs in a fresh namespace and is limited in time (the worker is killed
+and replaced when the limit is exceeded) and in memory (through the address
+space limit of the worker, where ``resource`` is available). The variables
+defined by the code are returned as previews of bounded size, see
+``preview_value``::
+
+    pool = ExecutionPool(size=2, timeout=10)
+    result = pool.execute("import numpy as np\\nx = np.zeros(10**6)")
+    result["variables"]["x"]
+    # {'type': 'ndarray', 'shape': [1000000], 'dtype': 'float64', 'head': [...]}
+"""
+
+import importlib
+import io
+import multiprocessing
+import os
+import queue
+import reprlib
+import threading
+from contextlib import redirect_stderr, redirect_stdout
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# modules imported by the workers before their first call
+WARM_MODULES = ("numpy", "pathsim", "pathsim.blocks", "pathsim.solvers")
+
+# maximum number of characters of the captured output
+MAX_OUTPUT_CHARS = 10_000
+
+# seconds a new worker has to import the warm modules
+STARTUP_TIMEOUT = 60.0
+
+
+class ExecutionError(Exception):
+    """The code could not be executed by a worker."""
+
+
+class ExecutionTimeout(ExecutionError):
+    """The code ran longer than the time limit."""
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}... ({len(text) - max_chars} more characters)"
+
+
+def preview_value(value, max_items: int = 8, max_chars: int = 200, _depth: int = 0):
+    """
+    Return a JSON-serialisable preview of bounded size of a value.
+
+    Numbers, booleans and ``None`` are returned as they are and strings are
+    truncated. NumPy arrays are summarised by their shape, dtype and first
+    elements, without converting the whole array. Lists, tuples and
+    dictionaries keep their first items (down to two levels of nesting),
+    anything else is returned as a truncated ``repr``.
+
+    Args:
+        value: The value.
+        max_items: Maximum number of elements or items kept.
+        max_chars: Maximum number of characters of strings.
+
+    Returns:
+        The preview.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return _truncate(value, max_chars)
+    if isinstance(value, np.generic):
+        return preview_value(value.item(), max_items, max_chars, _depth)
+    if isinstance(value, np.ndarray):
+        return {
+            "type": "ndarray",
+            "shape": list(value.shape),
+            "dtype": str(value.dtype),
+            "head": [
+                preview_value(v, max_items, max_chars, _depth + 1)
+                for v in value.flat[:max_items].tolist()
+            ],
+        }
+    if isinstance(value, (list, tuple)) and _depth < 2:
+        preview = [
+            preview_value(v, max_items, max_chars, _depth + 1)
+            for v in value[:max_items]
+        ]
+        if len(value) > max_items:
+            preview.append(f"... ({len(value) - max_items} more items)")
+        return preview
+    if isinstance(value, dict) and _depth < 2:
+        preview = {}
+        for i, (k, v) in enumerate(value.items()):
+            if i == max_items:
+                preview["..."] = f"{len(value) - max_items} more items"
+                break
+            preview[str(k)] = preview_value(v, max_items, max_chars, _depth + 1)
+        return preview
+
+    short_repr = reprlib.Repr()
+    short_repr.maxstring = short_repr.maxother = max_chars
+    try:
+        return _truncate(short_repr.repr(value), max_chars)
+    except Exception:
+        return f"<{type(value).__name__} object>"
+
+
+def execute(code: str) -> dict:
+    """
+    Execute code in a fresh namespace and describe what it defined.
+
+    This runs in the current process, ``ExecutionPool`` calls it in its
+    workers.
+
+    Args:
+        code: The Python code.
+
+    Returns:
+        Dictionary with ``success``, and either ``error`` or ``output`` (the
+        captured standard output), ``variables`` (previews of the values) and
+        ``functions`` (names of the functions).
+    """
+    namespace = {}
+    stdout_capture = io.StringIO()
+    stderr_capture = io.StringIO()
+    try:
+        with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
+            exec(code, namespace)
+    except SyntaxError as e:
+        return {"success": False, "error": f"Syntax Error: {e}"}
+    except MemoryError:
+        return {"success": False, "error": "Runtime Error: memory limit exceeded"}
+    except Exception as e:
+        return {"success": False, "error": f"Runtime Error: {e}"}
+
+    error_output = stderr_capture.getvalue()
+    if error_output:
+        return {"success": False, "error": _truncate(error_output, MAX_OUTPUT_CHARS)}
+
+    variables, functions = {}, []
+    for name, value in namespace.items():
+        if name.startswith("__"):
+            continue
+        if callable(value) and hasattr(value, "__name__"):
+            functions.append(name)
+        else:
+            variables[name] = preview_value(value)
+    output = stdout_capture.getvalue()
+    return {
+        "success": True,
+        "output": _truncate(output, MAX_OUTPUT_CHARS) if output else None,
+        "variables": variables,
+        "functions": functions,
+    }
+
+
+def _address_space_bytes() -> int:
+    """Virtual memory size of the current process, 0 if unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _worker_main(conn, memory_limit):
+    for name in WARM_MODULES:
+        importlib.import_module(name)
+
+    # the limit is on top of the memory mapped by the interpreter and the
+    # warm modules (thread stacks, BLAS buffers...)
+    if memory_limit and resource is not None and _address_space_bytes():
+        limit = _address_space_bytes() + memory_limit
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    conn.send("ready")
+    while True:
+        try:
+            code = conn.recv()
+        except EOFError:
+            return
+        conn.send(execute(code))
+
+
+class _Worker:
+    def __init__(self, context, memory_limit):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, memory_limit), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.calls = 0
+
+    def wait_ready(self):
+        if not self.ready:
+            if not self.conn.poll(STARTUP_TIMEOUT):
+                raise ExecutionError("The execution process did not start")
+            self.conn.recv()
+            self.ready = True
+
+    def stop(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class ExecutionPool:
+    """
+    Thread-safe pool of warm worker processes executing user code.
+
+    Workers are started on the first call (or with ``start``). A worker that
+    timed out, died or served ``max_calls`` calls is replaced by a new one,
+    which warms up while the other workers serve calls.
+
+    Args:
+        size: Number of worker processes.
+        timeout: Time limit of a call in seconds, also the longest time a
+            call waits for a free worker.
+        memory_limit: Memory a call can allocate in bytes, on top of the
+            memory used by a warm worker. None for no limit.
+        max_calls: Number of calls after which a worker is replaced, so that
+            changes to modules made by user code do not accumulate.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        timeout: float = 10.0,
+        memory_limit: int = 1024 * 2**20,
+        max_calls: int = 100,
+    ):
+        self.size = size
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.max_calls = max_calls
+        self.calls = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        """Start the workers, if not started yet."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for _ in range(self.size):
+            self._spawn()
+
+    def _spawn(self):
+        self._idle.put(_Worker(self._context, self.memory_limit))
+
+    def execute(self, code: str) -> dict:
+        """
+        Execute code in a worker, see ``execute`` for the result.
+
+        Args:
+            code: The Python code.
+
+        Raises:
+            ExecutionTimeout: If the code ran longer than ``timeout``.
+            ExecutionError: If no worker was free within ``timeout`` or the
+                worker died, e.g. killed for exceeding the memory limit.
+
+        Returns:
+            The result of the call.
+        """
+        self.start()
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise ExecutionError("All execution processes are busy, try again later")
+
+        try:
+            worker.wait_ready()
+            worker.conn.send(code)
+            if not worker.conn.poll(self.timeout):
+                self.timeouts += 1
+                raise ExecutionTimeout(
+                    f"Execution timed out after {self.timeout:g} seconds"
+                )
+            result = worker.conn.recv()
+        except ExecutionError:
+            self._replace(worker)
+            raise
+        except (EOFError, OSError):
+            self.crashes += 1
+            self._replace(worker)
+            raise ExecutionError("The execution process died")
+
+        self.calls += 1
+        worker.calls += 1
+        if worker.calls >= self.max_calls:
+            self._replace(worker)
+        else:
+            self._idle.put(worker)
+        return result
+
+    def _replace(self, worker):
+        worker.stop()
+        self._spawn()
+
+    def shutdown(self):
+        """Stop the idle workers."""
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._started = False
@@ -0,0 +1,95 @@
+"""
+Fast JSON serialisation and compression of NumPy-heavy payloads.
+
+``dumps`` serialises NumPy arrays natively with orjson when it is installed
+and falls back to the standard library encoder otherwise. Complex values are
+encoded as ``{"real": ..., "imag": ...}``. ``compress`` applies
+gzip or brotli (if installed) to serialised bodies above a size threshold.
+"""
+
+import gzip
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# bodies smaller than this are not worth compressing
+COMPRESSION_THRESHOLD = 1024
+
+# most preferred first
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _make_default(default=None):
+    """Wrap a ``default`` hook so that it also handles NumPy objects."""
+
+    def _default(obj):
+        if isinstance(obj, np.ndarray):
+            # orjson only serialises C-contiguous arrays of numeric dtypes
+            if orjson is not None and obj.dtype.kind in "biuf":
+                return np.ascontiguousarray(obj)
+            if obj.dtype.kind == "c":
+                # the phase is kept, taking the magnitude is up to the caller
+                return {"real": obj.real.tolist(), "imag": obj.imag.tolist()}
+            return obj.tolist()
+        if isinstance(obj, (complex, np.complexfloating)):
+            return {"real": obj.real, "imag": obj.imag}
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if default is not None:
+            return default(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    return _default
+
+
+def dumps(obj, default=None) -> bytes:
+    """
+    Serialise an object to JSON.
+
+    Args:
+        obj: The object to serialise, may contain NumPy arrays and scalars.
+        default: Optional hook called for objects that can't be serialised.
+
+    Returns:
+        The JSON document as UTF-8 bytes.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            obj,
+            default=_make_default(default),
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(obj, default=_make_default(default)).encode()
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """
+    Compress a body with a content encoding.
+
+    Args:
+        body: The bytes to compress.
+        encoding: One of ``SUPPORTED_ENCODINGS``.
+
+    Raises:
+        ValueError: If the encoding is not supported.
+
+    Returns:
+        The compressed bytes.
+    """
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=1)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(body, quality=4)
+    raise ValueError(
+        f"Unsupported encoding: {encoding}. Must be one of {SUPPORTED_ENCODINGS}"
+    )
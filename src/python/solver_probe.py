@@ -0,0 +1,276 @@
+"""
+Solver recommendation by probing a short window of the simulation.
+
+``probe_solvers`` runs the first part of a simulation with a few candidate
+solvers in parallel worker processes, records how each solver behaved with
+``SolverStats`` and ranks the candidates by their projected runtime for the
+full duration. Comparing the step sizes of explicit and implicit solvers
+gives an estimate of how stiff the model is.
+
+The worker processes are spawned once and shared by all probes, so that each
+probe doesn't pay for starting them and importing pathsim again.
+"""
+
+import copy
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from .pathsim_utils import NAME_TO_SOLVER, make_pathsim_model
+from .profiling import SolverStats
+
+DEFAULT_CANDIDATES = ("RKBS32", "RKDP54", "ESDIRK43", "GEAR52A")
+
+# fraction of the simulation duration that is probed
+DEFAULT_WINDOW_FRACTION = 0.05
+
+# wall time in seconds after which a candidate is stopped, building its
+# model included
+DEFAULT_TIME_BUDGET = 2.0
+
+# wall time in seconds allowed on top of the time budget for the worker
+# processes to start (and import pathsim) before a probe is given up
+WORKER_START_TIME = 10.0
+
+# ratio of implicit to explicit mean step size above which a model is stiff
+STIFFNESS_RATIO = 10.0
+
+# share of rejected explicit steps above which a model is stiff
+STIFFNESS_REJECTION_RATE = 0.2
+
+
+# worker processes shared by the probes, see _submit_probes
+_pool = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+
+def _submit_probes(max_workers: int, graph_data, candidates, window, time_budget):
+    """
+    Submit the probes of the candidates to the shared pool of workers.
+
+    The pool is replaced if it has less than ``max_workers`` workers or is
+    broken (a worker died). The probes already submitted to a replaced pool
+    still run to completion.
+
+    Returns:
+        The pool and the futures of the probes, in the order of the candidates.
+    """
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is not None and (_pool._broken or _pool_size < max_workers):
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            # spawned rather than forked: the server calling this has threads
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _pool_size = max_workers
+        return _pool, [
+            _pool.submit(_probe, graph_data, solver, window, time_budget)
+            for solver in candidates
+        ]
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """
+    Stop the workers of a pool whose probes went over their time budget.
+
+    The workers are terminated, since a model being built can't be stopped
+    otherwise. Other probes running on the pool fail as if their worker died.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    for process in list(pool._processes.values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _probe(graph_data: dict, solver: str, window: float, time_budget: float) -> dict:
+    """Run the probe window with one solver and return its statistics."""
+    start = time.perf_counter()
+    graph_data = copy.deepcopy(graph_data)
+    solver_params = graph_data.setdefault("solverParams", {})
+    solver_params["Solver"] = solver
+    solver_params["log"] = "false"
+
+    try:
+        simulation, duration = make_pathsim_model(graph_data)
+        if window is None:
+            window = duration * DEFAULT_WINDOW_FRACTION
+
+        # the budget left after building the model
+        remaining = time_budget - (time.perf_counter() - start)
+        if remaining <= 0:
+            raise TimeoutError("Building the model exceeded the time budget")
+
+        # stop solvers that are far too slow instead of waiting for them
+        timer = threading.Timer(remaining, simulation.stop)
+        timer.start()
+        try:
+            with SolverStats(simulation) as solver_stats:
+                simulation.run(window)
+        finally:
+            timer.cancel()
+    except Exception as e:
+        return {"solver": solver, "success": False, "error": str(e)}
+
+    stats = solver_stats.report()
+    steps = stats["steps"]
+    total_steps = steps["accepted"] + steps["rejected"]
+    sim_time = stats["sim_time"]
+    projected = (
+        stats["wall_time"] * duration / sim_time if sim_time > 0 else float("inf")
+    )
+    return {
+        "solver": solver,
+        "success": True,
+        "explicit": simulation.engine.is_explicit,
+        "adaptive": simulation.engine.is_adaptive,
+        "completed": sim_time >= window * (1 - 1e-9),
+        "sim_time": sim_time,
+        "wall_time": stats["wall_time"],
+        "projected_runtime": projected,
+        "accepted_steps": steps["accepted"],
+        "rejected_steps": steps["rejected"],
+        "rejection_rate": steps["rejected"] / total_steps if total_steps else 0.0,
+        "mean_dt": stats["dt"]["mean"],
+        "evals": stats["evals"],
+    }
+
+
+def _probe_result(future, solver: str, timeout: float = None) -> dict:
+    """
+    Return the result of a probe, a failed one if its worker crashed or it
+    did not finish within ``timeout`` seconds.
+    """
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        return {
+            "solver": solver,
+            "success": False,
+            "error": "The probe exceeded its time budget",
+        }
+    except BrokenProcessPool:
+        return {"solver": solver, "success": False, "error": "The probe process died"}
+    except Exception as e:
+        return {"solver": solver, "success": False, "error": str(e)}
+
+
+def estimate_stiffness(results: list[dict]) -> dict:
+    """
+    Estimate the stiffness of a model from the probe results.
+
+    Args:
+        results: The results of the candidates as returned by ``_probe``.
+
+    Returns:
+        A dictionary with the ratio of the largest mean step size of the
+        implicit adaptive solvers to the one of the explicit adaptive solvers
+        (``dt_ratio``, None if either is missing), the lowest rejection rate
+        of the explicit adaptive solvers and whether the model is ``stiff``.
+    """
+    adaptive = [r for r in results if r["success"] and r["adaptive"] and r["mean_dt"]]
+    explicit = [r for r in adaptive if r["explicit"]]
+    implicit = [r for r in adaptive if not r["explicit"]]
+
+    dt_ratio = None
+    if explicit and implicit:
+        dt_ratio = max(r["mean_dt"] for r in implicit) / max(
+            r["mean_dt"] for r in explicit
+        )
+    rejection_rate = min((r["rejection_rate"] for r in explicit), default=None)
+
+    stiff = (dt_ratio is not None and dt_ratio > STIFFNESS_RATIO) or (
+        rejection_rate is not None and rejection_rate > STIFFNESS_REJECTION_RATE
+    )
+    return {"dt_ratio": dt_ratio, "rejection_rate": rejection_rate, "stiff": stiff}
+
+
+def probe_solvers(
+    graph_data: dict,
+    candidates=None,
+    window: float = None,
+    time_budget: float = DEFAULT_TIME_BUDGET,
+    max_workers: int = None,
+) -> dict:
+    """
+    Rank candidate solvers by probing the first part of a simulation.
+
+    Args:
+        graph_data: The graph data of the model.
+        candidates: Names of solvers in ``NAME_TO_SOLVER`` to try. Defaults to
+            ``DEFAULT_CANDIDATES`` and the solver selected in the graph.
+        window: Simulated time to probe. Defaults to ``DEFAULT_WINDOW_FRACTION``
+            of the simulation duration.
+        time_budget: Wall time in seconds after which a candidate is stopped,
+            building its model included. Probes running in worker processes
+            that go over it (plus ``WORKER_START_TIME``) are terminated.
+        max_workers: Maximum number of worker processes. With 1 the candidates
+            are probed one after the other in this process.
+
+    Raises:
+        ValueError: If there are no candidates or one is not a known solver.
+
+    Returns:
+        A dictionary with the ``recommendation`` (the name of the solver with
+        the lowest projected runtime, or None if all failed), the ``ranking``
+        of all candidates (failed candidates last) and the ``stiffness``
+        estimate.
+    """
+    if candidates is None:
+        candidates = list(DEFAULT_CANDIDATES)
+        selected = graph_data.get("solverParams", {}).get("Solver")
+        if selected in NAME_TO_SOLVER and selected not in candidates:
+            candidates.append(selected)
+    if not isinstance(candidates, (list, tuple)) or not candidates:
+        raise ValueError("The candidate solvers must be a non-empty list")
+    for solver in candidates:
+        if not isinstance(solver, str) or solver not in NAME_TO_SOLVER:
+            raise ValueError(
+                f"Invalid solver: {solver}. Must be one of {list(NAME_TO_SOLVER.keys())}."
+            )
+
+    if max_workers is None:
+        max_workers = min(len(candidates), os.cpu_count() or 1)
+
+    start = time.perf_counter()
+    if max_workers > 1:
+        pool, futures = _submit_probes(
+            max_workers, graph_data, candidates, window, time_budget
+        )
+        # the candidates run in rounds of max_workers
+        rounds = math.ceil(len(candidates) / max_workers)
+        deadline = time.monotonic() + WORKER_START_TIME + rounds * time_budget
+        results = [
+            _probe_result(future, solver, max(0.0, deadline - time.monotonic()))
+            for future, solver in zip(futures, candidates)
+        ]
+        if not all(future.done() for future in futures):
+            _discard_pool(pool)
+    else:
+        results = [
+            _probe(graph_data, solver, window, time_budget) for solver in candidates
+        ]
+
+    ranking = sorted(
+        results,
+        key=lambda r: (not r["success"], r.get("projected_runtime", float("inf"))),
+    )
+    recommendation = ranking[0]["solver"] if ranking[0]["success"] else None
+    return {
+        "recommendation": recommendation,
+        "ranking": ranking,
+        "stiffness": estimate_stiffness(results),
+        "wall_time": time.perf_counter() - start,
+    }
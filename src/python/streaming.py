@@ -0,0 +1,152 @@
+"""
+Event channels streamed to clients as server-sent events.
+
+An ``EventChannel`` is published to from any thread (the logging handler,
+simulation threads...) and fans the events out to its subscribers. Blocking
+subscriptions (``subscribe``) serve the WSGI streaming routes, one thread per
+client. Asyncio subscriptions (``subscribe_async``) serve the same routes
+from an event loop (see ``pathview.asgi``), where an idle client only costs a
+suspended coroutine and an empty queue.
+
+Subscriber queues are bounded: when a client does not keep up, new events
+for it are dropped and counted rather than buffered without limit.
+"""
+
+import asyncio
+import queue
+import threading
+
+# events buffered per subscriber
+DEFAULT_MAX_QUEUE = 1000
+
+
+class Subscription:
+    """Blocking subscription to an ``EventChannel``."""
+
+    def __init__(self, channel, max_queue: int):
+        self._channel = channel
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def get(self, timeout: float = None):
+        """
+        Return the next event.
+
+        Args:
+            timeout: Seconds to wait for an event, forever if None.
+
+        Raises:
+            queue.Empty: If no event was published within the timeout.
+        """
+        return self._queue.get(timeout=timeout)
+
+    def close(self):
+        self._channel._unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncSubscription:
+    """Asyncio subscription to an ``EventChannel``, bound to the running loop."""
+
+    def __init__(self, channel, max_queue: int):
+        self._channel = channel
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def _put_nowait(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def put(self, event):
+        # events are published from other threads
+        try:
+            self._loop.call_soon_threadsafe(self._put_nowait, event)
+        except RuntimeError:
+            # the loop is closed, the client is gone
+            self.close()
+
+    async def get(self):
+        """Return the next event."""
+        return await self._queue.get()
+
+    def close(self):
+        self._channel._unsubscribe(self)
+
+
+class EventChannel:
+    """
+    Thread-safe fan-out of events to blocking and asyncio subscribers.
+
+    Args:
+        max_queue: Maximum number of events buffered per subscriber.
+    """
+
+    def __init__(self, max_queue: int = DEFAULT_MAX_QUEUE):
+        self.max_queue = max_queue
+        self._subscribers = ()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    @property
+    def has_subscribers(self) -> bool:
+        """Whether anyone listens, publishers can skip preparing events if not."""
+        return bool(self._subscribers)
+
+    def publish(self, event):
+        """Send an event to all current subscribers, without blocking."""
+        # the tuple is replaced, never mutated, so it is read without the lock
+        for subscriber in self._subscribers:
+            subscriber.put(event)
+
+    def subscribe(self) -> Subscription:
+        """Return a blocking subscription, to be closed when done."""
+        return self._add(Subscription(self, self.max_queue))
+
+    def subscribe_async(self) -> AsyncSubscription:
+        """Return a subscription for the running event loop, to be closed when done."""
+        return self._add(AsyncSubscription(self, self.max_queue))
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscribers = self._subscribers + (subscription,)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers = tuple(
+                s for s in self._subscribers if s is not subscription
+            )
+
+
+def format_sse(data: str, event: str = None) -> str:
+    """
+    Return a server-sent event frame.
+
+    Args:
+        data: The data of the event, each line becomes a ``data:`` field.
+        event: The event type, ``message`` if None.
+
+    Returns:
+        The frame, terminated by a blank line.
+    """
+    lines = data.split("\n") if data else [""]
+    frame = "".join(f"data: {line}\n" for line in lines)
+    if event is not None:
+        frame = f"event: {event}\n{frame}"
+    return frame + "\n"
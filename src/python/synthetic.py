@@ -0,0 +1,316 @@
+"""
+Synthetic graphs for scaling tests.
+
+The example graphs have at most a few dozen nodes, so costs growing with the
+number of nodes and edges go unnoticed. The generators in this module emit
+valid PathView graph data of any size, made of real node types of
+``map_str_to_object``, in a few topologies:
+
+- ``chain``: a source followed by a chain of amplifiers, integrators and
+  ``tanh`` blocks.
+- ``tree``: a source fanning out through a tree of amplifiers whose leaves
+  are integrators summed by an adder.
+- ``random``: a random DAG of amplifiers, adders, integrators and ``tanh``
+  blocks, with feedback loops closed through integrators so that there are
+  no algebraic loops.
+- ``mimo``: stages of three-way amplifier fan-outs feeding multi-input
+  multi-output ``Function`` blocks.
+
+Every graph records a few of its blocks in a scope, is simulated with a
+fixed-step solver and has exactly the requested number of blocks (for sizes
+above the few blocks every topology needs)::
+
+    from pathview.synthetic import generate_graph
+
+    graph_data = generate_graph("random", 10_000, seed=1)
+"""
+
+import random
+
+from .pathsim_utils import map_str_to_object, signature_parameters
+
+# number of blocks recorded by the scope of a graph
+MAX_SCOPE_INPUTS = 8
+
+DEFAULT_SOLVER_PARAMS = {
+    "dt": "0.01",
+    "dt_min": "1e-6",
+    "dt_max": "1.0",
+    "Solver": "SSPRK22",
+    "tolerance_fpi": "1e-6",
+    "iterations_max": "100",
+    "log": "false",
+    "simulation_duration": "1",
+    "extra_params": "{}",
+}
+
+# layout of the nodes on the canvas
+_X_SPACING = 200
+_Y_SPACING = 120
+
+
+class _GraphBuilder:
+    """Accumulates nodes and edges with consecutive ids."""
+
+    def __init__(self):
+        self.nodes = []
+        self.edges = []
+        self._functions = set()
+
+    def add_node(self, node_type: str, column: int = 0, row: int = 0, **data) -> str:
+        """Add a node, parameters not given are left to their default value."""
+        block_class = map_str_to_object[node_type]
+        parameters = signature_parameters(block_class.__init__)
+        node_id = str(len(self.nodes))
+        node_data = {k: "" for k in parameters if k != "self"}
+        node_data.update({k: str(v) for k, v in data.items()})
+        node_data["label"] = f"{node_type} {node_id}"
+        if block_class is map_str_to_object["function"]:
+            self._functions.add(node_id)
+        self.nodes.append(
+            {
+                "id": node_id,
+                "type": node_type,
+                "position": {"x": column * _X_SPACING, "y": row * _Y_SPACING},
+                "data": node_data,
+            }
+        )
+        return node_id
+
+    def add_edge(
+        self, source: str, target: str, source_handle=None, target_handle=None
+    ):
+        # the ports of functions are always given by their handles
+        if source_handle is None and source in self._functions:
+            source_handle = "source-0"
+        self.edges.append(
+            {
+                "id": f"e{source}-{target}-{len(self.edges)}",
+                "source": source,
+                "target": target,
+                "sourceHandle": source_handle,
+                "targetHandle": target_handle,
+            }
+        )
+
+    def add_scope(self, sources: list[str], column: int = 0):
+        """Add a scope recording up to ``MAX_SCOPE_INPUTS`` of the sources."""
+        step = max(1, len(sources) // MAX_SCOPE_INPUTS)
+        scope = self.add_node("scope", column=column)
+        for source in sources[::step][:MAX_SCOPE_INPUTS]:
+            self.add_edge(source, scope)
+
+    def graph(self, solver_params: dict = None) -> dict:
+        return {
+            "nodes": self.nodes,
+            "edges": self.edges,
+            "nodeCounter": len(self.nodes),
+            "solverParams": {**DEFAULT_SOLVER_PARAMS, **(solver_params or {})},
+            "globalVariables": [],
+            "events": [],
+            "pythonCode": "",
+        }
+
+
+def _add_processing_block(builder, kind: str, column: int, row: int) -> str:
+    if kind == "amplifier":
+        return builder.add_node("amplifier", column, row, gain=-0.9)
+    if kind == "integrator":
+        return builder.add_node("integrator", column, row, initial_value=0.1)
+    return builder.add_node(kind, column, row)
+
+
+def chain_graph(n_blocks: int, solver_params: dict = None) -> dict:
+    """
+    Return a chain of blocks.
+
+    Args:
+        n_blocks: Number of blocks, at least 3 (source, one block and scope).
+        solver_params: Solver parameters replacing the defaults.
+
+    Returns:
+        The graph data.
+    """
+    _check_size(n_blocks, 3)
+    kinds = ("amplifier", "integrator", "tanh")
+    builder = _GraphBuilder()
+    previous = builder.add_node("sinusoidalsource", frequency=1, amplitude=1, phase=0)
+    chain = []
+    for i in range(n_blocks - 2):
+        block = _add_processing_block(builder, kinds[i % len(kinds)], i + 1, 0)
+        builder.add_edge(previous, block)
+        chain.append(block)
+        previous = block
+    builder.add_scope(chain, column=n_blocks)
+    return builder.graph(solver_params)
+
+
+def tree_graph(n_blocks: int, branching: int = 2, solver_params: dict = None) -> dict:
+    """
+    Return a tree fanning out from a source, whose leaves are summed.
+
+    Args:
+        n_blocks: Number of blocks, at least 4 (source, one leaf, adder and scope).
+        branching: Number of children of each inner node.
+        solver_params: Solver parameters replacing the defaults.
+
+    Returns:
+        The graph data.
+    """
+    _check_size(n_blocks, 4)
+    builder = _GraphBuilder()
+
+    # tree nodes are numbered breadth first from the root (0), so the parent
+    # of node k is (k - 1) // branching and nodes without children are leaves
+    n_tree = n_blocks - 2
+    tree = [builder.add_node("sinusoidalsource", frequency=1, amplitude=1, phase=0)]
+    depth = [0]
+    leaves = []
+    for k in range(1, n_tree):
+        parent = (k - 1) // branching
+        depth.append(depth[parent] + 1)
+        is_leaf = k * branching + 1 >= n_tree
+        kind = "integrator" if is_leaf else "amplifier"
+        tree.append(_add_processing_block(builder, kind, depth[k], k))
+        builder.add_edge(tree[parent], tree[k])
+        if is_leaf:
+            leaves.append(tree[k])
+
+    adder = builder.add_node("adder", column=depth[-1] + 1)
+    for leaf in leaves:
+        builder.add_edge(leaf, adder)
+    builder.add_scope([adder], column=depth[-1] + 2)
+    return builder.graph(solver_params)
+
+
+def random_graph(
+    n_blocks: int,
+    feedback: float = 0.05,
+    max_inputs: int = 3,
+    seed: int = 0,
+    solver_params: dict = None,
+) -> dict:
+    """
+    Return a random DAG with feedback loops.
+
+    Blocks are created in order and take their inputs from earlier blocks.
+    A fraction of the integrators also feed back into an earlier adder.
+
+    Args:
+        n_blocks: Number of blocks, at least 3 (source, one block and scope).
+        feedback: Probability that an integrator closes a feedback loop.
+        max_inputs: Maximum number of inputs of the adders.
+        seed: Seed of the random generator, the same seed gives the same graph.
+        solver_params: Solver parameters replacing the defaults.
+
+    Returns:
+        The graph data.
+    """
+    _check_size(n_blocks, 3)
+    rng = random.Random(seed)
+    kinds = ("amplifier", "adder", "integrator", "tanh")
+    builder = _GraphBuilder()
+    outputs = [builder.add_node("sinusoidalsource", frequency=1, amplitude=1, phase=0)]
+    adders, feedbacks = [], []
+    # blocks are chosen among the latest ones so that the graph gets deep
+    window = 32
+
+    for i in range(n_blocks - 2):
+        kind = rng.choice(kinds)
+        block = _add_processing_block(builder, kind, i // 10 + 1, i % 10)
+        n_inputs = rng.randint(1, max_inputs) if kind == "adder" else 1
+        for source in rng.sample(outputs[-window:], min(n_inputs, len(outputs))):
+            builder.add_edge(source, block)
+        if kind == "adder":
+            adders.append(block)
+        if kind == "integrator" and adders and rng.random() < feedback:
+            feedbacks.append((block, rng.choice(adders[-window:])))
+        outputs.append(block)
+
+    for integrator, adder in feedbacks:
+        builder.add_edge(integrator, adder)
+    builder.add_scope(outputs[1:], column=(n_blocks - 2) // 10 + 2)
+    return builder.graph(solver_params)
+
+
+def mimo_graph(n_blocks: int, solver_params: dict = None) -> dict:
+    """
+    Return stages of fan-outs and multi-input multi-output functions.
+
+    Each stage splits the signal in three amplifiers, mixes the three parts
+    in a 3 to 2 ``Function`` and merges them back in a 2 to 1 ``Function``.
+    The remaining blocks are amplifiers.
+
+    Args:
+        n_blocks: Number of blocks, at least 2 (source and scope).
+        solver_params: Solver parameters replacing the defaults.
+
+    Returns:
+        The graph data.
+    """
+    _check_size(n_blocks, 2)
+    builder = _GraphBuilder()
+    previous = builder.add_node("sinusoidalsource", frequency=1, amplitude=1, phase=0)
+    stage_outputs = []
+    n_stages, n_extra = divmod(n_blocks - 2, 5)
+
+    for stage in range(n_stages):
+        column = 3 * stage + 1
+        parts = [
+            builder.add_node("amplifier", column, row, gain=1 / 3) for row in range(3)
+        ]
+        mix = builder.add_node(
+            "function", column + 1, 0, func="lambda a, b, c: (a + b, b - c)"
+        )
+        merge = builder.add_node("function", column + 2, 0, func="lambda a, b: a - b")
+        for i, part in enumerate(parts):
+            builder.add_edge(previous, part)
+            builder.add_edge(part, mix, None, f"target-{i}")
+        for i in range(2):
+            builder.add_edge(mix, merge, f"source-{i}", f"target-{i}")
+        stage_outputs.append(merge)
+        previous = merge
+
+    for i in range(n_extra):
+        block = _add_processing_block(builder, "amplifier", 3 * n_stages + i + 1, 0)
+        builder.add_edge(previous, block)
+        stage_outputs.append(block)
+        previous = block
+
+    builder.add_scope(stage_outputs or [previous], column=n_blocks)
+    return builder.graph(solver_params)
+
+
+TOPOLOGIES = {
+    "chain": chain_graph,
+    "tree": tree_graph,
+    "random": random_graph,
+    "mimo": mimo_graph,
+}
+
+
+def _check_size(n_blocks: int, minimum: int):
+    if n_blocks < minimum:
+        raise ValueError(f"At least {minimum} blocks are needed, got {n_blocks}")
+
+
+def generate_graph(topology: str, n_blocks: int, **kwargs) -> dict:
+    """
+    Return synthetic graph data.
+
+    Args:
+        topology: One of ``TOPOLOGIES``.
+        n_blocks: Number of blocks of the graph.
+        **kwargs: Other arguments of the generator of the topology.
+
+    Raises:
+        ValueError: If the topology is unknown or the size too small for it.
+
+    Returns:
+        The graph data.
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(
+            f"Unknown topology: {topology}. Must be one of {list(TOPOLOGIES)}"
+        )
+    return TOPOLOGIES[topology](n_blocks, **kwargs)
@@ -0,0 +1,281 @@
+"""
+Model exported from PathView as a batch script.
+
+The model is built and run without plotting, so that it can run on headless
+compute nodes. Global variables can be overridden from the command line and
+swept over, the runs are spread over processes and the scope recordings are
+saved to NPZ or Parquet files::
+
+    python model.py --set k=2 --sweep x0=0.1,0.2,0.5 --jobs 3 --out results/
+
+Every run writes its scope recordings to ``--out``, and ``summary.json``
+lists the overrides and the build and run times of every run.
+"""
+
+import argparse
+import ast
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+import pathsim
+from pathsim import Simulation, Connection
+import pathview
+import pathsim_chem
+{# Import macros #}
+{% from 'block_macros.py' import create_block, create_integrator_block, create_bubbler_block, create_connections, create_event -%}
+
+{%- if pythonCode %}
+{{ pythonCode }}
+{% endif %}
+# Global variables that can be overridden
+VARIABLES = [{% for var in globalVariables %}"{{ var["name"] }}"{% if not loop.last %}, {% endif %}{% endfor %}]
+
+# Names of the blocks, in the order of Simulation.blocks
+BLOCK_NAMES = [{% for node in nodes %}"{{ node["var_name"] }}"{% if not loop.last %}, {% endif %}{% endfor %}]
+
+DURATION = {{ solverParams["simulation_duration"] }}
+LOG = {{ solverParams["log"].capitalize() }}
+
+
+def build(overrides=None):
+    """Return the simulation, with global variables replaced by ``overrides``."""
+    {%- if globalVariables %}
+    global {{ globalVariables | map(attribute="name") | join(", ") }}
+    {%- endif %}
+    overrides = overrides or {}
+
+    # Create global variables
+    {% for var in globalVariables -%}
+    {{ var["name"] }} = overrides.get("{{ var["name"] }}", {{ var["value"] }})
+    {% endfor %}
+    # Create blocks
+    blocks, events = [], []
+
+    {% for node in nodes -%}
+    {%- if node["type"] == "integrator" -%}
+    {{ create_integrator_block(node) | indent(4) }}
+    {%- elif node["type"] == "bubbler" -%}
+    {{ create_bubbler_block(node) | indent(4) }}
+    {%- else -%}
+    {{ create_block(node) | indent(4) }}
+    {%- endif %}
+    blocks.append({{ node["var_name"] }})
+
+    {% endfor %}
+    # Create events
+    {% for event in events -%}
+    {{ create_event(event) | indent(4) }}
+    events.append({{ event["name"] }})
+    {% endfor %}
+    # Create connections
+    {{ create_connections(edges) | indent(4) }}
+
+    return Simulation(
+        blocks,
+        connections,
+        events=events,
+        Solver=pathsim.solvers.{{ solverParams["Solver"] }},
+        dt={{ solverParams["dt"] }},
+        {%- if solverParams["dt_max"] != '' -%}
+        dt_max={{ solverParams["dt_max"] }},
+        {%- endif -%}
+        {%- if solverParams["dt_min"] != '' -%}
+        dt_min={{ solverParams["dt_min"] }},
+        {%- endif -%}
+        iterations_max={{ solverParams["iterations_max"] }},
+        log=LOG,
+        tolerance_fpi={{ solverParams["tolerance_fpi"] }},
+        {%- if solverParams["extra_params"] != '' -%}
+        **{{ solverParams["extra_params"] }},
+        {%- endif -%}
+    )
+
+
+def scope_recordings(simulation):
+    """Return ``{name: (time, data, labels)}`` for the scopes of a simulation."""
+    recordings = {}
+    for name, block in zip(BLOCK_NAMES, simulation.blocks):
+        if isinstance(block, pathsim.blocks.Scope):
+            time_, data = block.read()
+            if time_ is None or data is None:
+                # the scope recorded nothing
+                continue
+            labels = [
+                block.labels[p] if p < len(block.labels) else f"port {p}"
+                for p in range(len(data))
+            ]
+            recordings[name] = (np.asarray(time_), np.asarray(data), labels)
+    return recordings
+
+
+def save_npz(path, recordings):
+    arrays = {}
+    for name, (time_, data, labels) in recordings.items():
+        arrays[f"{name}_time"] = time_
+        arrays[f"{name}_data"] = data
+        arrays[f"{name}_labels"] = np.array(labels)
+    np.savez(path, **arrays)
+    return [path]
+
+
+def save_parquet(path, recordings):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("pyarrow is needed for the parquet format") from e
+
+    paths = []
+    for name, (time_, data, labels) in recordings.items():
+        columns = {"time": time_}
+        for label, d in zip(labels, data):
+            # labels are not necessarily unique
+            while label in columns:
+                label += "_"
+            columns[label] = d
+        paths.append(f"{path}_{name}.parquet")
+        pq.write_table(pa.table(columns), paths[-1])
+    return paths
+
+
+WRITERS = {"npz": save_npz, "parquet": save_parquet}
+
+
+def run(overrides=None, duration=None, out=None, name="run", fmt="npz"):
+    """
+    Build and run the model once.
+
+    Args:
+        overrides: Values of global variables replacing the ones of the model.
+        duration: Simulation duration, defaults to the one of the model.
+        out: Directory the scope recordings are written to, not written if None.
+        name: Prefix of the files written.
+        fmt: Format of the scope recordings, ``"npz"`` or ``"parquet"``.
+
+    Returns:
+        Dictionary with the overrides, the build and run times in seconds and
+        the files written.
+    """
+    start = time.perf_counter()
+    simulation = build(overrides)
+    built = time.perf_counter()
+    simulation.run(DURATION if duration is None else duration)
+    finished = time.perf_counter()
+
+    files = []
+    if out is not None:
+        recordings = scope_recordings(simulation)
+        path = os.path.join(out, name + (".npz" if fmt == "npz" else ""))
+        files = WRITERS[fmt](path, recordings)
+    return {
+        "name": name,
+        "overrides": {k: repr(v) for k, v in (overrides or {}).items()},
+        "timing": {"build": built - start, "run": finished - built},
+        "files": [os.path.basename(f) for f in files],
+    }
+
+
+def _run_job(job):
+    return run(**job)
+
+
+def parse_value(text):
+    """Evaluate a Python literal, other values are kept as strings."""
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def parse_assignment(text, parser):
+    name, sep, value = text.partition("=")
+    if not sep:
+        parser.error(f"expected NAME=VALUE, got {text!r}")
+    if name not in VARIABLES:
+        parser.error(f"unknown global variable {name!r}, must be one of {VARIABLES}")
+    return name, value
+
+
+def make_jobs(args, parser):
+    """Return the keyword arguments of ``run`` for every run of the sweep."""
+    fixed = {
+        name: parse_value(value)
+        for name, value in (parse_assignment(a, parser) for a in args.set)
+    }
+    sweeps = [parse_assignment(a, parser) for a in args.sweep]
+    names = [name for name, _ in sweeps]
+    grids = [[parse_value(v) for v in values.split(",")] for _, values in sweeps]
+
+    jobs = []
+    for i, values in enumerate(itertools.product(*grids)):
+        jobs.append(
+            {
+                "overrides": {**fixed, **dict(zip(names, values))},
+                "duration": args.duration,
+                "out": args.out,
+                "name": f"run_{i:04d}",
+                "fmt": args.format,
+            }
+        )
+    return jobs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Override a global variable, can be repeated.",
+    )
+    parser.add_argument(
+        "--sweep",
+        action="append",
+        default=[],
+        metavar="NAME=V1,V2,...",
+        help="Run once per value of a global variable, several sweeps are combined.",
+    )
+    parser.add_argument("--duration", type=float, help="Simulation duration.")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1, help="Number of worker processes."
+    )
+    parser.add_argument("--out", "-o", help="Directory the results are written to.")
+    parser.add_argument(
+        "--format",
+        choices=list(WRITERS),
+        default="npz",
+        help="Format of the scope recordings.",
+    )
+    args = parser.parse_args(argv)
+    jobs = make_jobs(args, parser)
+
+    if args.out is not None:
+        os.makedirs(args.out, exist_ok=True)
+
+    start = time.perf_counter()
+    if args.jobs > 1 and len(jobs) > 1:
+        with multiprocessing.Pool(min(args.jobs, len(jobs))) as pool:
+            results = pool.map(_run_job, jobs, chunksize=1)
+    else:
+        results = [run(**job) for job in jobs]
+    total = time.perf_counter() - start
+
+    for result in results:
+        timing = ", ".join(f"{k} {v:.3f}s" for k, v in result["timing"].items())
+        print(f"{result['name']} {result['overrides']} ({timing})")
+    print(f"{len(results)} runs in {total:.3f}s")
+
+    if args.out is not None:
+        with open(os.path.join(args.out, "summary.json"), "w") as f:
+            json.dump({"total": total, "runs": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Per-phase timing of model building, simulation and response generation.
+
+A ``PhaseTimer`` is activated for the current context (e.g. one web request)
+with ``PhaseTimer.activate``. Code anywhere below then records the duration
+of its phases with the ``phase`` context manager, which does nothing when no
+timer is active. Durations are measured with the monotonic
+``time.perf_counter`` clock.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current_timer = ContextVar("pathview_phase_timer", default=None)
+
+
+class PhaseTimer:
+    """
+    Collects the durations of named phases.
+
+    Phases with the same name are accumulated.
+
+    Attributes:
+        phases: Dictionary mapping phase names to durations in seconds, in the
+            order in which the phases first ran.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def activate(self):
+        """Make this timer the one ``phase`` records to, for the current context."""
+        token = self.bind()
+        try:
+            yield self
+        finally:
+            self.unbind(token)
+
+    def bind(self):
+        """Activate the timer until ``unbind`` is called with the returned token."""
+        return _current_timer.set(self)
+
+    def unbind(self, token):
+        _current_timer.reset(token)
+
+    def add(self, name: str, duration: float):
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    @property
+    def elapsed(self) -> float:
+        """Time since the timer was created, in seconds."""
+        return time.perf_counter() - self.start
+
+    def server_timing(self) -> str:
+        """Format the phases as a ``Server-Timing`` HTTP header value."""
+        return ", ".join(
+            f"{name};dur={1e3 * duration:.3f}" for name, duration in self.phases.items()
+        )
+
+
+def current_timer() -> PhaseTimer:
+    """Return the active timer, or None."""
+    return _current_timer.get()
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Record the duration of the enclosed block in the active timer.
+
+    Args:
+        name: The name of the phase.
+    """
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - start)
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+import src.backend as backend
+from pathview.admission import AdmissionQueue, QueueFull, QueueTimeout
+from pathview.synthetic import generate_graph
+from src.backend import app
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.005)
+
+
+def queue_in_background(queue, order, client, lane):
+    """Queue a request that records its admission and releases its slot."""
+
+    def target():
+        with queue.admit(client, lane=lane):
+            order.append((client, lane))
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread
+
+
+def test_admit_and_release():
+    queue = AdmissionQueue(max_running=2)
+
+    first = queue.admit("a")
+    second = queue.admit("b")
+    assert queue.running == 2
+    assert first.wait == 0.0 and first.lane == "interactive"
+
+    first.release()
+    first.release()
+    assert queue.running == 1
+    with second:
+        pass
+    assert queue.running == 0
+
+    with pytest.raises(ValueError):
+        queue.admit("a", lane="urgent")
+
+
+def test_queue_full():
+    queue = AdmissionQueue(max_running=1, max_queued=1, max_queued_per_client=1)
+    running = queue.admit("a")
+    order = []
+    thread = queue_in_background(queue, order, "b", "interactive")
+    wait_for(lambda: queue.queued == 1)
+
+    with pytest.raises(QueueFull) as exc_info:
+        queue.admit("c")
+    assert exc_info.value.retry_after >= 1
+    assert queue.rejected == 1
+
+    running.release()
+    thread.join()
+    assert order == [("b", "interactive")]
+    assert queue.queued == queue.running == 0
+
+
+def test_queue_per_client_limit():
+    queue = AdmissionQueue(max_running=1, max_queued=8, max_queued_per_client=2)
+    running = queue.admit("a")
+    order = []
+    threads = [queue_in_background(queue, order, "a", "batch") for _ in range(2)]
+    wait_for(lambda: queue.queued == 2)
+
+    with pytest.raises(QueueFull):
+        queue.admit("a", lane="batch")
+    # other clients and lanes still get in
+    threads.append(queue_in_background(queue, order, "b", "batch"))
+    wait_for(lambda: queue.queued == 3)
+
+    running.release()
+    for thread in threads:
+        thread.join()
+    assert len(order) == 3
+
+
+def test_queue_rejected_client_leaves_no_waiters():
+    queue = AdmissionQueue(max_running=1, max_queued_per_client=0)
+    running = queue.admit("a")
+    with pytest.raises(QueueFull):
+        queue.admit("b")
+    assert queue._waiting["interactive"] == {}
+
+    running.release()
+    assert queue.running == 0
+    with queue.admit("b") as ticket:
+        assert ticket.wait == 0.0
+
+
+def test_queue_timeout():
+    queue = AdmissionQueue(max_running=1, timeout=0.05)
+    with queue.admit("a"):
+        with pytest.raises(QueueTimeout):
+            queue.admit("b")
+    assert queue.queued == 0
+    assert queue.depth() == 0
+    # the slot is free again
+    with queue.admit("b") as ticket:
+        assert ticket.wait == 0.0
+
+
+def test_lanes_and_fairness():
+    queue = AdmissionQueue(max_running=1, max_queued=16)
+    running = queue.admit("x")
+    order, threads = [], []
+    # client "a" submits three batch runs, then "b" one batch run and "c" an
+    # interactive run
+    for client, lane in [("a", "batch")] * 3 + [("b", "batch"), ("c", "interactive")]:
+        threads.append(queue_in_background(queue, order, client, lane))
+        wait_for(lambda: queue.queued == len(threads))
+    assert queue.depth("batch") == 4
+    assert queue.depth("interactive") == 1
+
+    running.release()
+    for thread in threads:
+        thread.join()
+
+    assert order == [
+        ("c", "interactive"),
+        ("a", "batch"),
+        ("b", "batch"),
+        ("a", "batch"),
+        ("a", "batch"),
+    ]
+
+
+def test_run_pathsim_rejected_when_queue_full(monkeypatch):
+    queue = AdmissionQueue(max_running=1, max_queued=0)
+    monkeypatch.setattr(backend, "admission_queue", queue)
+    client = app.test_client()
+    graph = generate_graph("chain", 3)
+
+    response = client.post("/run-pathsim", json={"graph": graph, "priority": "urgent"})
+    assert response.status_code == 400
+
+    with queue.admit("other"):
+        response = client.post(
+            "/run-pathsim", json={"graph": graph, "run_id": "rejected", "plot": False}
+        )
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.json["retry_after"] == int(response.headers["Retry-After"])
+    assert client.get("/progress/rejected").json["state"] == "failed"
+    assert backend.queue_rejected.value(lane="interactive", reason="full") >= 1
+
+    response = client.post(
+        "/run-pathsim", json={"graph": graph, "priority": "batch", "plot": False}
+    )
+    assert response.status_code == 200
+    assert queue.running == 0
+    assert backend.queue_wait.count(lane="batch") >= 1
+
+
+def test_admission_limits():
+    assert backend.admission_limits(8, max_running=2, max_queued=32) == (2, 4)
+    assert backend.admission_limits(8, max_running=2, max_queued=1) == (2, 1)
+    assert backend.admission_limits(4, max_running=8, max_queued=8) == (2, 0)
+    assert backend.admission_limits(1, max_running=2, max_queued=2) == (1, 0)
+    assert (
+        backend.admission_queue.max_running + backend.admission_queue.max_queued
+        <= backend.WSGI_THREADS - backend.RESERVED_THREADS
+    )
+
+
+async def asgi_request(application, path, method="GET", body=b""):
+    """Send a request to an ASGI application, returning its status."""
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    return messages[0]["status"]
+
+
+def test_health_served_while_queue_full(monkeypatch):
+    threads = 4
+    max_running, max_queued = backend.admission_limits(
+        threads, max_running=2, max_queued=32
+    )
+    queue = AdmissionQueue(
+        max_running=max_running,
+        max_queued=max_queued,
+        max_queued_per_client=max_queued,
+        timeout=5,
+    )
+    monkeypatch.setattr(backend, "admission_queue", queue)
+    application = backend.AsgiApp(app, threads=threads)
+    body = json.dumps({"graph": {"nodes": [], "edges": []}, "plot": False}).encode()
+
+    async def scenario():
+        running = [queue.admit("other") for _ in range(max_running)]
+        queued = [
+            asyncio.ensure_future(
+                asgi_request(application, "/run-pathsim", "POST", body)
+            )
+            for _ in range(max_queued)
+        ]
+        while queue.queued < max_queued:
+            await asyncio.sleep(0.005)
+
+        # the queue is full: further runs are rejected and other routes
+        # are still served
+        rejected = await asyncio.wait_for(
+            asgi_request(application, "/run-pathsim", "POST", body), timeout=5
+        )
+        health = await asyncio.wait_for(asgi_request(application, "/health"), 5)
+        metrics = await asyncio.wait_for(asgi_request(application, "/metrics"), 5)
+
+        for ticket in running:
+            ticket.release()
+        await asyncio.gather(*queued)
+        return rejected, health, metrics
+
+    try:
+        rejected, health, metrics = asyncio.run(scenario())
+    finally:
+        application.executor.shutdown(wait=True)
+    assert rejected == 429
+    assert health == 200
+    assert metrics == 200
+    assert queue.queued == queue.running == 0
@@ -0,0 +1,83 @@
+import json
+import os
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cloudpickle")
+
+from pathview import artifacts
+from pathview.artifacts import ArtifactStore, compile_model, load_model
+from pathview.pathsim_utils import make_pathsim_model
+
+
+def load_graph(name):
+    with open(Path("example_graphs") / name) as f:
+        return json.load(f)
+
+
+def read_scopes(simulation):
+    return [b.read() for b in simulation.blocks if hasattr(b, "read")]
+
+
+@pytest.mark.parametrize("name", ["thermostat.json", "stick_slip.json"])
+def test_compiled_model_matches_built_model(name):
+    graph_data = load_graph(name)
+    built, duration = make_pathsim_model(graph_data)
+    loaded, loaded_duration = load_model(compile_model(graph_data))
+
+    assert loaded_duration == duration
+    built.run(duration)
+    loaded.run(loaded_duration)
+    for (time, data), (time_loaded, data_loaded) in zip(
+        read_scopes(built), read_scopes(loaded)
+    ):
+        np.testing.assert_array_equal(time_loaded, time)
+        np.testing.assert_array_equal(data_loaded, data)
+
+
+def test_loaded_models_are_independent():
+    artifact = compile_model(load_graph("pid.json"))
+    first, duration = load_model(artifact)
+    second, _ = load_model(artifact)
+
+    first.run(duration)
+    assert second.time == 0
+    assert first.logger is not second.logger
+
+
+def test_version_mismatch(monkeypatch):
+    artifact = compile_model(load_graph("pid.json"))
+    monkeypatch.setattr(artifacts, "ARTIFACT_FORMAT", artifacts.ARTIFACT_FORMAT + 1)
+    with pytest.raises(ValueError):
+        load_model(artifact)
+
+
+def test_store(tmp_path, monkeypatch):
+    graph_data = load_graph("pid.json")
+    store = ArtifactStore(root_dir=str(tmp_path))
+
+    store.load(graph_data)
+    store.load(graph_data)
+    assert (store.hits, store.misses) == (1, 1)
+
+    # a new version invalidates and replaces the artifact
+    old_files = os.listdir(tmp_path)
+    monkeypatch.setattr(artifacts, "ARTIFACT_FORMAT", artifacts.ARTIFACT_FORMAT + 1)
+    store.load(graph_data)
+    assert store.misses == 2
+    new_files = os.listdir(tmp_path)
+    assert len(new_files) == 1
+    assert new_files != old_files
+
+    # the loaded model can still be pickled without cloudpickle
+    simulation, _ = store.load(graph_data)
+    assert pickle.loads(pickle.dumps(simulation)).time == 0
+
+
+def test_missing_cloudpickle(monkeypatch):
+    monkeypatch.setattr(artifacts, "cloudpickle", None)
+    with pytest.raises(ImportError, match=r"pathview\[artifacts\]"):
+        compile_model(load_graph("thermostat.json"))
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import logging
+import threading
+
+from src.backend import app, asgi_app, log_channel
+
+
+def make_scope(path, method="GET", headers=()):
+    return {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(k.encode(), v.encode()) for k, v in headers],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+
+
+class Client:
+    """Drives one request of an ASGI application."""
+
+    def __init__(self, scope, body=b""):
+        self.scope = scope
+        self.requests = asyncio.Queue()
+        self.requests.put_nowait(
+            {"type": "http.request", "body": body, "more_body": False}
+        )
+        self.messages = asyncio.Queue()
+
+    async def receive(self):
+        return await self.requests.get()
+
+    async def send(self, message):
+        await self.messages.put(message)
+
+    def start(self, application):
+        return asyncio.ensure_future(application(self.scope, self.receive, self.send))
+
+    async def next_body(self):
+        while True:
+            message = await asyncio.wait_for(self.messages.get(), timeout=5)
+            if message["type"] == "http.response.body":
+                return message["body"].decode()
+
+    def disconnect(self):
+        self.requests.put_nowait({"type": "http.disconnect"})
+
+
+async def request(path, method="GET", body=b"", headers=()):
+    client = Client(make_scope(path, method, headers), body)
+    await client.start(asgi_app)
+    start = await client.messages.get()
+    chunks = []
+    while not client.messages.empty():
+        chunks.append((await client.messages.get())["body"])
+    return start, b"".join(chunks)
+
+
+def test_wsgi_routes():
+    start, body = asyncio.run(request("/health"))
+    assert start["status"] == 200
+    assert json.loads(body)["status"] == "healthy"
+
+    with open("example_graphs/pid.json") as f:
+        graph = json.load(f)
+    start, body = asyncio.run(
+        request(
+            "/convert-to-python",
+            method="POST",
+            body=json.dumps({"graph": graph}).encode(),
+            headers=[("content-type", "application/json")],
+        )
+    )
+    assert start["status"] == 200
+    assert json.loads(body)["success"]
+
+    start, _ = asyncio.run(request("/results/unknown/plot"))
+    assert start["status"] == 404
+
+
+def test_log_stream():
+    async def main():
+        client = Client(make_scope("/logs/stream"))
+        task = client.start(asgi_app)
+        assert (await client.next_body()).startswith("retry:")
+
+        logging.getLogger("pathsim").info("first\rsecond")
+        assert "first" in await client.next_body()
+
+        client.disconnect()
+        await asyncio.wait_for(task, timeout=5)
+
+    n_subscribers = len(log_channel)
+    asyncio.run(main())
+    assert len(log_channel) == n_subscribers
+
+
+def test_idle_streams_hold_no_threads():
+    async def main():
+        clients = [Client(make_scope("/logs/stream")) for _ in range(1000)]
+        tasks = [client.start(asgi_app) for client in clients]
+        for client in clients:
+            await client.next_body()
+        assert len(log_channel) >= 1000
+        assert threading.active_count() < 50
+
+        log_channel.publish(["hello"])
+        for client in clients:
+            assert "hello" in await client.next_body()
+
+        for client in clients:
+            client.disconnect()
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=10)
+
+    asyncio.run(main())
+    assert len(log_channel) == 0
+
+
+def test_lifespan():
+    async def main():
+        messages = asyncio.Queue()
+        for message in ("lifespan.startup", "lifespan.shutdown"):
+            messages.put_nowait({"type": message})
+        sent = []
+
+        async def send(message):
+            sent.append(message["type"])
+
+        await asgi_app({"type": "lifespan"}, messages.get, send)
+        return sent
+
+    assert asyncio.run(main()) == [
+        "lifespan.startup.complete",
+        "lifespan.shutdown.complete",
+    ]
+
+
+def test_wsgi_log_stream():
+    response = app.test_client().get("/logs/stream", buffered=False)
+    chunks = iter(response.response)
+
+    assert next(chunks).startswith(b"retry:")
+    log_channel.publish(["a log line", "another"])
+    assert next(chunks) == b"data: a log line\ndata: another\n\n"
+    response.close()
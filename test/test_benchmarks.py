@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from benchmarks.suite import STAGES, compare_results, load_graphs, main, run_suite
+
+
+def make_results(times):
+    return {
+        "meta": {},
+        "benchmarks": {
+            graph: {stage: {"min": t, "median": t} for stage, t in stages.items()}
+            for graph, stages in times.items()
+        },
+        "skipped": {},
+    }
+
+
+def test_run_suite(tmp_path):
+    with open("example_graphs/pid.json") as f:
+        graph_data = json.load(f)
+    graph_data["solverParams"]["simulation_duration"] = "1"
+    path = tmp_path / "pid.json"
+    path.write_text(json.dumps(graph_data))
+
+    results = run_suite(load_graphs([path]), repeats=2)
+
+    stages = results["benchmarks"]["pid"]
+    assert set(stages) == set(STAGES)
+    for timing in stages.values():
+        assert len(timing["times"]) == 2
+        assert 0 < timing["min"] <= timing["median"]
+    assert results["meta"]["repeats"] == 2
+
+
+def test_failing_graph_is_skipped(tmp_path):
+    broken = tmp_path / "broken.json"
+    broken.write_text(json.dumps({"nodes": [{"id": "1"}]}))
+
+    results = run_suite(
+        load_graphs([broken], synthetic=["chain:5"]), repeats=1, stages=["build"]
+    )
+
+    assert set(results["benchmarks"]) == {"chain_5"}
+    assert results["skipped"]["broken"].startswith("failed")
+
+
+def test_synthetic_graphs_selected_stages():
+    graphs = load_graphs(synthetic=["chain:10", "mimo:20"])
+
+    results = run_suite(graphs, repeats=1, stages=["build", "run"])
+
+    assert set(results["benchmarks"]) == {"chain_10", "mimo_20"}
+    for stages in results["benchmarks"].values():
+        assert set(stages) == {"build", "run"}
+
+
+def test_invalid_synthetic_graph():
+    with pytest.raises(ValueError):
+        load_graphs(synthetic=["chain"])
+
+
+def test_compare_results():
+    baseline = make_results({"a": {"run": 1.0, "plot": 0.001}, "b": {"run": 1.0}})
+    results = make_results({"a": {"run": 1.5, "plot": 0.0015}, "c": {"run": 1.0}})
+
+    comparisons = compare_results(results, baseline, threshold=0.2, noise_floor=1e-3)
+
+    regressed = {(c["graph"], c["stage"]): c["regressed"] for c in comparisons}
+    # plot is 50 % slower but by less than the noise floor, "c" is new
+    assert regressed == {("a", "run"): True, ("a", "plot"): False}
+
+
+def test_threshold_fails_run(tmp_path, monkeypatch):
+    baseline = make_results({"pid": {stage: 1.0 for stage in STAGES}})
+    baseline_path = tmp_path / "baseline.json"
+    baseline_path.write_text(json.dumps(baseline))
+
+    def fake_suite(graphs, repeats, stages):
+        return make_results({"pid": {stage: 1.1 for stage in STAGES}})
+
+    monkeypatch.setattr("benchmarks.suite.run_suite", fake_suite)
+    output = tmp_path / "results.json"
+
+    args = ["example_graphs/pid.json", "-b", str(baseline_path), "-o", str(output)]
+    assert main(args + ["--threshold", "0.2"]) == 0
+    assert main(args + ["--threshold", "0.05"]) == 1
+    assert len(json.loads(output.read_text())["comparison"]["stages"]) == len(STAGES)
@@ -0,0 +1,103 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from pathview.checkpoint import CheckpointStore, capture_state, restore_state
+from pathview.pathsim_utils import make_pathsim_model
+
+
+def load_graph(name):
+    with open(Path("example_graphs") / name) as f:
+        return json.load(f)
+
+
+def read_scopes(simulation):
+    return [b.read() for b in simulation.blocks if hasattr(b, "read")]
+
+
+@pytest.mark.parametrize("name", ["thermostat.json", "bouncing_ball.json"])
+def test_resume_matches_continued_run(name):
+    graph_data = load_graph(name)
+
+    reference, duration = make_pathsim_model(graph_data)
+    reference.run(duration / 2)
+    reference.run(duration / 2)
+
+    first, _ = make_pathsim_model(graph_data)
+    first.run(duration / 2)
+    state = capture_state(first)
+
+    resumed, _ = make_pathsim_model(graph_data)
+    assert restore_state(resumed, state) == []
+    assert resumed.time == first.time
+    resumed.run(duration / 2)
+
+    for (time_ref, data_ref), (time, data) in zip(
+        read_scopes(reference), read_scopes(resumed)
+    ):
+        np.testing.assert_array_equal(time, time_ref)
+        np.testing.assert_array_equal(data, data_ref)
+
+
+def test_resume_with_changed_parameters():
+    graph_data = load_graph("pid.json")
+    simulation, duration = make_pathsim_model(graph_data)
+    simulation.run(duration / 2)
+    state = capture_state(simulation)
+
+    gain_node = next(n for n in graph_data["nodes"] if n["id"] == "feedback_gain")
+    gain_node["data"]["gain"] = "2.0"
+    branch, _ = make_pathsim_model(graph_data)
+    restore_state(branch, state)
+
+    gain_block = next(b for b in branch.blocks if b.id == "feedback_gain")
+    assert gain_block.gain == 2.0
+    assert branch.time == simulation.time
+
+
+def test_disk_scope_checkpoint(tmp_path):
+    graph_data = load_graph("pid.json")
+    simulation, duration = make_pathsim_model(graph_data, scope_dir=tmp_path / "a")
+    simulation.run(duration / 2)
+    state = capture_state(simulation)
+
+    resumed, _ = make_pathsim_model(graph_data, scope_dir=tmp_path / "b")
+    restore_state(resumed, state)
+    (time, _), (time_resumed, _) = read_scopes(simulation)[0], read_scopes(resumed)[0]
+    np.testing.assert_array_equal(time, time_resumed)
+
+
+def test_store(tmp_path):
+    graph_data = load_graph("pid.json")
+    simulation, _ = make_pathsim_model(graph_data)
+    simulation.run(1.0)
+
+    store = CheckpointStore(root_dir=str(tmp_path))
+    checkpoint_id = store.new_id()
+    store.save(checkpoint_id, graph_data, simulation)
+
+    assert checkpoint_id in store
+    checkpoint = store.load(checkpoint_id)
+    assert checkpoint["graph"] == graph_data
+    assert checkpoint["state"]["time"] == simulation.time
+
+    store.delete(checkpoint_id)
+    assert checkpoint_id not in store
+    with pytest.raises(KeyError):
+        store.load(checkpoint_id)
+    with pytest.raises(ValueError):
+        store.path("../etc/passwd")
+    for invalid in (5, None):
+        with pytest.raises(ValueError):
+            store.path(invalid)
+        assert invalid not in store
+
+
+def test_store_default_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+    # stores of different processes share the directory
+    assert CheckpointStore().root_dir == CheckpointStore().root_dir
+    assert CheckpointStore().root_dir == str(tmp_path / "pathview" / "checkpoints")
@@ -0,0 +1,172 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from pathview.cli import apply_overrides, find_graphs, main, unique_run_names
+
+
+def load_graph(name):
+    with open(Path("example_graphs") / name) as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def graphs_dir(tmp_path):
+    graphs = tmp_path / "graphs"
+    graphs.mkdir()
+    for name in ["pid.json", "linear_feedback.json"]:
+        graph_data = load_graph(name)
+        graph_data["solverParams"]["simulation_duration"] = "1"
+        (graphs / name).write_text(json.dumps(graph_data))
+    return graphs
+
+
+def test_find_graphs(graphs_dir):
+    assert [p.name for p in find_graphs([graphs_dir])] == [
+        "linear_feedback.json",
+        "pid.json",
+    ]
+    with pytest.raises(FileNotFoundError):
+        find_graphs([graphs_dir / "missing.json"])
+
+
+def test_apply_overrides():
+    graph_data = load_graph("pid.json")
+    overrides = {
+        "solverParams": {"Solver": "RKDP54"},
+        "nodes": {"Feedback Gain": {"gain": 2}},
+    }
+    result = apply_overrides(graph_data, overrides)
+
+    assert result["solverParams"]["Solver"] == "RKDP54"
+    node = next(n for n in result["nodes"] if n["id"] == "feedback_gain")
+    assert node["data"]["gain"] == "2"
+    # the original graph is unchanged
+    assert graph_data["solverParams"]["Solver"] == "SSPRK22"
+
+    with pytest.raises(KeyError):
+        apply_overrides(graph_data, {"nodes": {"missing": {}}})
+    with pytest.raises(KeyError):
+        apply_overrides(graph_data, {"globalVariables": {"missing": 1}})
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_run(graphs_dir, tmp_path, jobs):
+    out = tmp_path / "out"
+    status = main(["run", str(graphs_dir), "--jobs", str(jobs), "--out", str(out)])
+
+    assert status == 0
+    for name in ["pid", "linear_feedback"]:
+        with np.load(out / f"{name}.npz") as data:
+            assert len(data.files) > 0
+        result = json.loads((out / f"{name}.json").read_text())
+        assert result["success"]
+        assert set(result["timing"]) == {"build", "run", "export"}
+        assert result["stats"]["steps"]["accepted"] > 0
+
+    summary = json.loads((out / "summary.json").read_text())
+    assert [r["name"] for r in summary] == ["linear_feedback", "pid"]
+
+
+def test_run_with_overrides(graphs_dir, tmp_path):
+    override = tmp_path / "fast.json"
+    override.write_text(json.dumps({"solverParams": {"Solver": "RKDP54"}}))
+    out = tmp_path / "out"
+
+    status = main(
+        [
+            "run",
+            str(graphs_dir / "pid.json"),
+            "--override",
+            str(override),
+            "-o",
+            str(out),
+        ]
+    )
+
+    assert status == 0
+    assert (out / "pid__fast.npz").exists()
+
+
+def test_run_keeps_going_after_failure(graphs_dir, tmp_path):
+    (graphs_dir / "broken.json").write_text(json.dumps({"nodes": [{"id": "1"}]}))
+    out = tmp_path / "out"
+
+    status = main(["run", str(graphs_dir), "--out", str(out)])
+
+    assert status == 1
+    summary = {r["name"]: r for r in json.loads((out / "summary.json").read_text())}
+    assert not summary["broken"]["success"]
+    assert summary["broken"]["error"]
+    assert summary["pid"]["success"]
+    assert summary["linear_feedback"]["success"]
+
+
+def test_run_survives_dead_worker(graphs_dir, tmp_path):
+    graph_data = load_graph("pid.json")
+    graph_data["pythonCode"] = "import os\nos._exit(1)"
+    (graphs_dir / "killer.json").write_text(json.dumps(graph_data))
+    out = tmp_path / "out"
+
+    status = main(["run", str(graphs_dir), "--jobs", "2", "--out", str(out)])
+
+    assert status == 1
+    summary = {r["name"]: r for r in json.loads((out / "summary.json").read_text())}
+    assert set(summary) == {"killer", "linear_feedback", "pid"}
+    assert not summary["killer"]["success"]
+    assert "BrokenProcessPool" in summary["killer"]["error"]
+    # the other runs are not failed by the dead worker
+    assert summary["pid"]["success"]
+    assert summary["linear_feedback"]["success"]
+
+
+def test_run_names_are_unique(graphs_dir, tmp_path):
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "pid.json").write_text((graphs_dir / "pid.json").read_text())
+    out = tmp_path / "out"
+
+    status = main(
+        ["run", str(graphs_dir / "pid.json"), str(other / "pid.json"), "-o", str(out)]
+    )
+
+    assert status == 0
+    assert (out / "graphs__pid.npz").exists()
+    assert (out / "other__pid.npz").exists()
+    summary = json.loads((out / "summary.json").read_text())
+    assert [r["name"] for r in summary] == ["graphs__pid", "other__pid"]
+
+
+def test_unique_run_names():
+    runs = [
+        ("a/m.json", None),
+        ("b/m.json", None),
+        ("a/m.json", None),
+        ("c.json", None),
+    ]
+    assert unique_run_names(runs) == ["a__m_1", "b__m", "a__m_2", "c"]
+
+
+def test_run_missing_path(tmp_path):
+    assert main(["run", str(tmp_path / "missing")]) == 2
+
+
+def test_generate(tmp_path):
+    path = tmp_path / "random.json"
+
+    assert main(["generate", "random", "30", "--seed", "2", "-o", str(path)]) == 0
+    assert len(json.loads(path.read_text())["nodes"]) == 30
+    assert main(["run", str(path)]) == 0
+    assert main(["generate", "chain", "30", "--seed", "2"]) == 2
+
+
+def test_export(tmp_path):
+    path = tmp_path / "model.py"
+
+    assert main(["export", "example_graphs/pid.json", "--batch", "-o", str(path)]) == 0
+    namespace = {"__name__": "model"}
+    exec(path.read_text(), namespace)
+    assert callable(namespace["build"])
+    assert main(["export", str(tmp_path / "missing.json")]) == 2
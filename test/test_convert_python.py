@@ -1,4 +1,5 @@
 from pathview import convert_graph_to_python
+from pathview.synthetic import generate_graph
 import json
 import pytest
 from pathlib import Path
@@ -167,5 +168,151 @@ def test_bubbler_has_reset_times():
     assert "bubbler_1.create_reset_events()" in code
 
 
+def test_ports_resolved_without_building_blocks(monkeypatch):
+    """Test that the script is generated without instantiating any block."""
+    import pathview.pathsim_utils
+
+    def fail(*args, **kwargs):
+        raise AssertionError("blocks must not be built to convert a graph")
+
+    monkeypatch.setattr(pathview.pathsim_utils, "auto_block_construction", fail)
+    monkeypatch.setattr(pathview.pathsim_utils, "make_global_variables", fail)
+
+    data = generate_graph("mimo", 20)
+    data["pythonCode"] = "raise RuntimeError('python code must not be executed')"
+    code = convert_graph_to_python(data)
+
+    assert "amplifier_3_3[0], function_4_4[2]" in code
+    assert "function_4_4[1], function_5_5[1]" in code
+    assert code.count("Connection(") == len(data["edges"])
+
+
+def test_festim_graph_converts_without_festim():
+    """Test that ports of FestimWall nodes are resolved from their port maps."""
+    with open("example_graphs/festim_two_walls.json") as f:
+        data = json.load(f)
+
+    code = convert_graph_to_python(data)
+
+    assert "['c_0']" in code
+    assert "['flux_L']" in code
+
+
+def test_template_environment_is_cached():
+    """Test that the templates are compiled once and reused."""
+    from pathview.convert_to_python import get_environment
+
+    environment = get_environment()
+    template = environment.get_template("template_with_macros.py")
+
+    convert_graph_to_python(generate_graph("chain", 5))
+
+    assert get_environment() is environment
+    assert environment.get_template("template_with_macros.py") is template
+
+
+def test_bytecode_cache(tmp_path, monkeypatch):
+    """Test that compiled templates are stored in PATHVIEW_JINJA_CACHE_DIR."""
+    from pathview.convert_to_python import get_environment
+
+    monkeypatch.setenv("PATHVIEW_JINJA_CACHE_DIR", str(tmp_path / "jinja"))
+    get_environment.cache_clear()
+    try:
+        code = convert_graph_to_python(generate_graph("chain", 5))
+        assert len(list((tmp_path / "jinja").iterdir())) == 2
+
+        # a new environment loads the templates from the bytecode cache
+        get_environment.cache_clear()
+        assert convert_graph_to_python(generate_graph("chain", 5)) == code
+    finally:
+        monkeypatch.delenv("PATHVIEW_JINJA_CACHE_DIR")
+        get_environment.cache_clear()
+
+
+def test_unknown_variant():
+    with pytest.raises(ValueError):
+        convert_graph_to_python(generate_graph("chain", 5), variant="notebook")
+
+
+@pytest.mark.parametrize(
+    "example", ["pid", "bouncing_ball", "thermostat", "stick_slip"]
+)
+def test_batch_variant_builds(example):
+    """Test that the batch script builds the model without running it."""
+    with open(f"example_graphs/{example}.json") as f:
+        data = json.load(f)
+
+    code = convert_graph_to_python(data, variant="batch")
+    namespace = {"__name__": "batch"}
+    exec(code, namespace)
+
+    simulation = namespace["build"]()
+    assert len(simulation.blocks) == len(namespace["BLOCK_NAMES"])
+    assert "matplotlib" not in code
+
+
+@pytest.mark.parametrize("fmt", ["npz", "parquet"])
+def test_batch_variant_sweep(tmp_path, fmt):
+    """Test a sweep of the standalone batch script over two processes."""
+    import subprocess
+    import sys
+
+    import numpy as np
+
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+
+    with open("example_graphs/harmonic_oscillator.json") as f:
+        data = json.load(f)
+    script = tmp_path / "model.py"
+    script.write_text(convert_graph_to_python(data, variant="batch"))
+    out = tmp_path / "results"
+
+    args = ["--set", "m=2.0", "--sweep", "k=1,4", "--duration", "2", "-j", "2"]
+    subprocess.run(
+        [sys.executable, str(script), *args, "-o", str(out), "--format", fmt],
+        check=True,
+        capture_output=True,
+    )
+
+    summary = json.loads((out / "summary.json").read_text())
+    runs = summary["runs"]
+    assert [run["overrides"] for run in runs] == [
+        {"m": "2.0", "k": "1"},
+        {"m": "2.0", "k": "4"},
+    ]
+    for run in runs:
+        assert set(run["timing"]) == {"build", "run"}
+        assert all(t > 0 for t in run["timing"].values())
+
+    if fmt == "npz":
+        recordings = [np.load(out / run["files"][0]) for run in runs]
+        name = next(k for k in recordings[0] if k.endswith("_data"))
+        arrays = [r[name] for r in recordings]
+    else:
+        import pyarrow.parquet as pq
+
+        tables = [pq.read_table(out / run["files"][0]) for run in runs]
+        arrays = [t.drop(["time"]).to_pandas().to_numpy() for t in tables]
+    # a stiffer spring gives a different trajectory
+    assert arrays[0].shape == arrays[1].shape
+    assert not np.allclose(arrays[0], arrays[1])
+
+
+
+def test_batch_variant_skips_empty_scopes():
+    """Test that scopes that recorded nothing are left out of the recordings."""
+    with open("example_graphs/pid.json") as f:
+        data = json.load(f)
+
+    code = convert_graph_to_python(data, variant="batch")
+    namespace = {"__name__": "batch"}
+    exec(code, namespace)
+
+    # the model is not run, so no scope recorded anything
+    simulation = namespace["build"]()
+    assert namespace["scope_recordings"](simulation) == {}
+
+
 if __name__ == "__main__":
     test_nested_templates()
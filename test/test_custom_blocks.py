@@ -26,3 +26,44 @@ def test_bubbler():
 
     sim = Simulation(blocks, connections)
     sim.run(20)
+
+
+def test_disk_scope_matches_scope(tmp_path):
+    """DiskScope records the same data as Scope, including across resizes."""
+    from pathview.custom_pathsim_blocks import DiskScope
+    import numpy as np
+
+    recordings = []
+    for scope in [pathsim.blocks.Scope(), DiskScope(path=tmp_path / "scope.bin")]:
+        source = pathsim.blocks.Source(lambda t: t**2)
+        integrator = pathsim.blocks.Integrator()
+        blocks = [source, integrator, scope]
+        connections = [
+            Connection(source, integrator, scope[0]),
+            Connection(integrator, scope[1]),
+        ]
+        if isinstance(scope, DiskScope):
+            scope.initial_capacity = 16
+
+        sim = Simulation(blocks, connections, dt=0.01, log=False)
+        sim.run(1)
+        recordings.append(scope.read())
+
+    (time_ref, data_ref), (time, data) = recordings
+    assert len(time) > 16
+    assert isinstance(time, np.memmap)
+    np.testing.assert_array_equal(time, time_ref)
+    np.testing.assert_array_equal(data, data_ref)
+
+
+def test_disk_scope_with_sampling_rate(tmp_path):
+    from pathview.custom_pathsim_blocks import DiskScope
+
+    source = pathsim.blocks.Constant(3)
+    scope = DiskScope(sampling_rate=0.1, path=tmp_path / "scope.bin")
+    sim = Simulation([source, scope], [Connection(source, scope)], dt=0.01, log=False)
+    sim.run(1)
+
+    time, data = scope.read()
+    assert 10 <= len(time) <= 11
+    assert (data[0] == 3).all()
@@ -0,0 +1,79 @@
+import io
+
+import numpy as np
+import pytest
+from pathsim.blocks import Scope
+
+from pathview.export import export_scopes
+
+
+def make_scope(label, time, data, labels=None):
+    scope = Scope(labels=labels)
+    scope.label = label
+    scope.recording = {t: np.array(row) for t, row in zip(time, np.transpose(data))}
+    return scope
+
+
+@pytest.fixture
+def scopes():
+    """Two scopes with different, non aligned time points."""
+    return [
+        make_scope("fast", [0.0, 0.5, 1.0, 1.5, 2.0], [[0, 1, 2, 3, 4]], labels=["x"]),
+        make_scope("slow", [0.0, 2.0], [[0, 10], [5, 5]], labels=["y", "z"]),
+    ]
+
+
+def test_csv_one_time_column_per_scope(scopes):
+    content = b"".join(export_scopes(scopes, "csv", chunk_rows=2)).decode()
+    table = np.genfromtxt(io.StringIO(content), delimiter=",", names=True)
+
+    assert content.splitlines()[0] == "fast: time,fast: x,slow: time,slow: y,slow: z"
+    np.testing.assert_array_equal(table["fast_time"], [0, 0.5, 1, 1.5, 2])
+    np.testing.assert_array_equal(table["slow_time"][:2], [0, 2])
+    assert np.isnan(table["slow_time"][2:]).all()
+
+
+def test_csv_shared_time_base(scopes):
+    content = b"".join(export_scopes(scopes, "csv", time_base="shared")).decode()
+    table = np.genfromtxt(io.StringIO(content), delimiter=",", skip_header=1)
+
+    np.testing.assert_array_equal(table[:, 0], [0, 0.5, 1, 1.5, 2])
+    np.testing.assert_array_equal(table[:, 1], [0, 1, 2, 3, 4])
+    np.testing.assert_array_equal(table[:, 2], [0, 2.5, 5, 7.5, 10])
+
+
+@pytest.mark.parametrize("time_base", ["per_scope", "shared"])
+def test_npz_roundtrip(scopes, time_base):
+    content = b"".join(export_scopes(scopes, "npz", time_base=time_base, chunk_rows=2))
+    archive = np.load(io.BytesIO(content))
+
+    if time_base == "shared":
+        np.testing.assert_array_equal(archive["time"], [0, 0.5, 1, 1.5, 2])
+        np.testing.assert_array_equal(archive["slow/data"][1], [5] * 5)
+    else:
+        np.testing.assert_array_equal(archive["slow/time"], [0, 2])
+        np.testing.assert_array_equal(archive["slow/data"], [[0, 10], [5, 5]])
+    assert list(archive["slow/labels"]) == ["y", "z"]
+
+
+def test_parquet(scopes):
+    pq = pytest.importorskip("pyarrow.parquet")
+    content = b"".join(export_scopes(scopes, "parquet", chunk_rows=2))
+    table = pq.read_table(io.BytesIO(content))
+
+    assert table.num_rows == 5
+    assert table.column("fast: x").to_pylist() == [0, 1, 2, 3, 4]
+
+
+def test_hdf5(scopes):
+    h5py = pytest.importorskip("h5py")
+    content = b"".join(export_scopes(scopes, "hdf5", chunk_rows=2))
+
+    with h5py.File(io.BytesIO(content), "r") as f:
+        np.testing.assert_array_equal(f["slow/data"][()], [[0, 10], [5, 5]])
+        assert list(f["slow/data"].attrs["labels"]) == ["y", "z"]
+
+
+def test_unknown_format(scopes):
+    with pytest.raises(ValueError):
+        export_scopes(scopes, "xlsx")
@@ -0,0 +1,77 @@
+import json
+
+from benchmarks.load_test import (
+    DEFAULT_MIX,
+    LoadTest,
+    LocalServer,
+    load_graphs,
+    main,
+    percentile,
+)
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) is None
+
+
+def test_load_graphs_scales_duration():
+    (graph_data,) = load_graphs(["example_graphs/pid.json"], duration_scale=0.1)
+    assert graph_data["solverParams"]["simulation_duration"] == "(35) * 0.1"
+    assert graph_data["solverParams"]["log"] == "false"
+
+
+def test_load_test_reports_every_endpoint():
+    graphs = load_graphs(["example_graphs/pid.json"], duration_scale=0.01)
+    with LocalServer() as server:
+        test = LoadTest(server.url, graphs, seed=1)
+        report = test.run(concurrency=4, duration=2, streams=3)
+
+    endpoints = report["endpoints"]
+    assert set(endpoints) == {"all", *DEFAULT_MIX}
+    assert endpoints["all"]["requests"] == sum(
+        stats["requests"] for name, stats in endpoints.items() if name != "all"
+    )
+    for stats in endpoints.values():
+        assert stats["errors"] == 0
+        assert stats["throughput"] > 0
+        latency = stats["latency"]
+        assert 0 < latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+
+    # the streams stayed open for the whole test
+    streams = report["streams"]
+    assert streams["open"] == 3
+    assert streams["errors"] == 0
+    assert streams["events"] >= 3
+    assert 0 < streams["connect"]["p50"] <= streams["connect"]["max"]
+
+
+def test_main_writes_report(tmp_path):
+    output = tmp_path / "load.json"
+    status = main(
+        [
+            "--duration",
+            "1",
+            "--mix",
+            "run-pathsim=0",
+            "--streams",
+            "2",
+            "--output",
+            str(output),
+        ]
+    )
+
+    assert status == 0
+    report = json.loads(output.read_text())
+    assert set(report["endpoints"]) == {
+        "all",
+        "convert-to-python",
+        "default-values",
+        "get-docs",
+    }
+    assert report["settings"]["server"] == "werkzeug"
+    assert report["streams"]["open"] == 2
@@ -0,0 +1,86 @@
+import logging
+
+from pathview.log_stream import CoalescingLogHandler
+from pathview.streaming import EventChannel
+
+
+class CountingFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(levelname)s %(message)s")
+        self.calls = 0
+
+    def format(self, record):
+        self.calls += 1
+        return super().format(record)
+
+
+def make_record(msg, level=logging.INFO):
+    return logging.LogRecord("test", level, __file__, 0, msg, None, None)
+
+
+def make_handler(channel, **kwargs):
+    handler = CoalescingLogHandler(channel, **kwargs)
+    handler.setFormatter(CountingFormatter())
+    return handler
+
+
+def test_batches_and_summarises_progress():
+    channel = EventChannel()
+    handler = make_handler(channel, interval=60)
+
+    with channel.subscribe() as subscription:
+        handler.emit(make_record("STARTING -> TRANSIENT (Duration: 10.00s)"))
+        for i in range(100):
+            handler.emit(make_record(f"TRANSIENT: {i:3d}% | elapsed: 00:00:00"))
+        handler.emit(make_record("FINISHED -> TRANSIENT"))
+        handler.flush()
+
+        lines = subscription.get(timeout=1)
+
+    assert lines == [
+        "INFO STARTING -> TRANSIENT (Duration: 10.00s)",
+        "INFO TRANSIENT:  99% | elapsed: 00:00:00",
+        "INFO FINISHED -> TRANSIENT",
+        "... 99 log lines suppressed",
+    ]
+    # only the kept records are formatted
+    assert handler.formatter.calls == 3
+    assert handler.suppressed == 99
+
+
+def test_rate_limit_keeps_warnings():
+    channel = EventChannel()
+    handler = make_handler(channel, interval=60, max_lines_per_second=5)
+
+    with channel.subscribe() as subscription:
+        for i in range(20):
+            handler.emit(make_record(f"line {i}"))
+        handler.emit(make_record("multi\rline", level=logging.ERROR))
+        handler.flush()
+
+        lines = subscription.get(timeout=1)
+
+    assert lines[:5] == [f"INFO line {i}" for i in range(5)]
+    assert lines[5:] == ["ERROR multi", "line", "... 15 log lines suppressed"]
+
+
+def test_nothing_kept_without_subscribers():
+    channel = EventChannel()
+    handler = make_handler(channel)
+
+    logger = logging.Logger("test_nothing_kept")
+    logger.addHandler(handler)
+    for i in range(1000):
+        logger.info("line %d", i)
+
+    assert handler.formatter.calls == 0
+    assert not handler._records
+
+
+def test_flushed_in_background():
+    channel = EventChannel()
+    handler = make_handler(channel, interval=0.01)
+
+    with channel.subscribe() as subscription:
+        handler.emit(make_record("hello"))
+        assert subscription.get(timeout=5) == ["INFO hello"]
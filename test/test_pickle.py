@@ -0,0 +1,84 @@
+import gc
+import json
+import os
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from pathview.custom_pathsim_blocks import Integrator, Process
+from pathview.pathsim_utils import make_pathsim_model
+from pathview.synthetic import generate_graph
+
+example_graphs_dir = Path("example_graphs")
+all_examples_files = list(example_graphs_dir.glob("*.json"))
+
+
+def read_scopes(simulation):
+    return [b.read() for b in simulation.blocks if hasattr(b, "read")]
+
+
+@pytest.mark.parametrize(
+    "filename", all_examples_files, ids=[f.stem for f in all_examples_files]
+)
+def test_pickle_round_trip(filename):
+    if "festim" in filename.stem.lower():
+        pytest.importorskip("festim")
+
+    with open(filename, "r") as f:
+        graph_data = json.load(f)
+
+    simulation, duration = make_pathsim_model(graph_data)
+    simulation.run(duration / 2)
+
+    copied = pickle.loads(pickle.dumps(simulation))
+    assert copied.time == simulation.time
+
+    simulation.run(duration / 2)
+    copied.run(duration / 2)
+    for (time, data), (time_copied, data_copied) in zip(
+        read_scopes(simulation), read_scopes(copied)
+    ):
+        if time is None:
+            assert time_copied is None
+            continue
+        np.testing.assert_array_equal(time_copied, time)
+        np.testing.assert_array_equal(data_copied, data)
+
+
+def test_pickle_custom_blocks():
+    process = Process(residence_time=2, initial_value=1, source_term=3)
+    copied = pickle.loads(pickle.dumps(process))
+    assert copied.func(1.0, [0.5], 0) == process.func(1.0, [0.5], 0) == 3.0
+
+    integrator = Integrator(initial_value=1.0, reset_times=[1.0, 2.0])
+    (event,) = pickle.loads(pickle.dumps(integrator.create_reset_events()))
+    assert event.times_evt == [1.0, 2.0]
+
+
+def test_pickle_disk_scopes(tmp_path):
+    simulation, duration = make_pathsim_model(
+        generate_graph("chain", 3), scope_dir=str(tmp_path)
+    )
+    simulation.run(duration / 2)
+    ((time, data),) = read_scopes(simulation)
+    time, data = np.array(time), np.array(data)
+
+    copied = pickle.loads(pickle.dumps(simulation))
+    # the copy records to its own files, starting from the recorded rows
+    assert copied.scope_dir != simulation.scope_dir
+    ((time_copied, data_copied),) = read_scopes(copied)
+    np.testing.assert_array_equal(time_copied, time)
+    np.testing.assert_array_equal(data_copied, data)
+
+    copied.run(duration / 2)
+    ((time_after, data_after),) = read_scopes(simulation)
+    np.testing.assert_array_equal(time_after, time)
+    np.testing.assert_array_equal(data_after, data)
+
+    # the directory of the copy goes away with the copy
+    scope_dir = copied.scope_dir
+    del copied
+    gc.collect()
+    assert not os.path.exists(scope_dir)
@@ -0,0 +1,181 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import src.backend as backend
+from pathview.pathsim_utils import make_pathsim_model
+from pathview.preview import PreviewSettings
+from pathview.results import SimulationResults
+from pathview.synthetic import generate_graph
+from src.backend import app
+
+
+def long_graph():
+    # a few thousand steps, long enough to be cancelled while running
+    return generate_graph("chain", 30, solver_params={"simulation_duration": "40"})
+
+
+def short_graph(**solver_params):
+    return generate_graph(
+        "chain", 5, solver_params={"simulation_duration": "10", **solver_params}
+    )
+
+
+def wait_finished(client, run_id, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        snapshot = client.get(f"/progress/{run_id}").get_json()
+        if snapshot["state"] in ("done", "failed", "cancelled"):
+            return snapshot
+        assert time.monotonic() < deadline, snapshot
+        time.sleep(0.05)
+
+
+def test_preview_settings():
+    simulation, duration = make_pathsim_model(short_graph())
+
+    with PreviewSettings(simulation, duration, factor=10, max_points=50):
+        assert simulation.dt == pytest.approx(0.1)
+        simulation.run(duration)
+    preview = SimulationResults.from_blocks(simulation.blocks).scopes[0]
+
+    # the settings and the sampling of the scopes are restored
+    assert simulation.dt == pytest.approx(0.01)
+    assert "sample" not in vars(simulation.blocks[-1])
+
+    simulation.reset()
+    simulation.run(duration)
+    full = SimulationResults.from_blocks(simulation.blocks).scopes[0]
+
+    assert len(preview.time) <= 51
+    assert len(full.time) == pytest.approx(duration / 0.01, abs=2)
+    # the coarse result is close to the full one
+    np.testing.assert_allclose(
+        np.interp(preview.time, full.time, full.data[0]), preview.data[0], atol=0.05
+    )
+
+
+def test_preview_settings_restores_tolerances():
+    simulation, duration = make_pathsim_model(short_graph(Solver="RKDP54"))
+    engines = [block for block in simulation.blocks if block.engine]
+    tolerance = engines[0].engine.tolerance_lte_rel
+
+    with PreviewSettings(simulation, duration, factor=10):
+        assert engines[0].engine.tolerance_lte_rel == pytest.approx(10 * tolerance)
+        assert simulation.solver_kwargs["tolerance_lte_rel"] == pytest.approx(
+            10 * tolerance
+        )
+
+    assert all(b.engine.tolerance_lte_rel == tolerance for b in engines)
+    assert "tolerance_lte_rel" not in simulation.solver_kwargs
+
+
+def test_preview_then_refine():
+    client = app.test_client()
+    response = client.post(
+        "/run-pathsim",
+        json={"graph": short_graph(), "mode": "preview", "plot": False},
+    )
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result["mode"] == "preview"
+
+    run_id = result["refinement"]["run_id"]
+    assert wait_finished(client, run_id)["state"] == "done"
+
+    preview = client.get(f"/results/{result['result_id']}/export?format=npz")
+    refined = client.get(f"/results/{run_id}/export?format=npz")
+    assert preview.status_code == refined.status_code == 200
+    assert len(refined.data) > len(preview.data)
+    assert client.get(f"/results/{run_id}/plot").get_json()["success"]
+
+
+def test_new_run_supersedes_refinement():
+    client = app.test_client()
+    response = client.post(
+        "/run-pathsim",
+        json={"graph": long_graph(), "mode": "preview", "plot": False},
+    )
+    refinement = response.get_json()["refinement"]
+    run_id = refinement["run_id"]
+
+    response = client.post(
+        "/run-pathsim",
+        json={
+            "graph": generate_graph("chain", 3),
+            "refinement_token": refinement["cancel_token"],
+            "plot": False,
+        },
+    )
+    assert response.status_code == 200
+
+    assert wait_finished(client, run_id)["state"] == "cancelled"
+    assert client.get(f"/results/{run_id}/plot").status_code == 404
+
+
+def test_supersede_refinement():
+    first = backend.progress_registry.create("refinement-1")
+    second = backend.progress_registry.create("refinement-2")
+    backend.refinements[first.token] = first
+    backend.refinements[second.token] = second
+
+    # only the run sending the token of a refinement supersedes it
+    backend.supersede_refinement(None)
+    backend.supersede_refinement("not-a-refinement-token")
+    assert not first.cancelled and not second.cancelled
+
+    backend.supersede_refinement(first.token)
+    assert first.cancelled and not second.cancelled
+    assert first.token not in backend.refinements
+
+    backend.supersede_refinement(second.token)
+    assert second.cancelled
+    assert second.token not in backend.refinements
+
+
+def test_cancel_run():
+    client = app.test_client()
+    responses = []
+    token = "cancel-token-0123456789"
+    data = {
+        "graph": long_graph(),
+        "run_id": "cancel",
+        "cancel_token": token,
+        "plot": False,
+    }
+    thread = threading.Thread(
+        target=lambda: responses.append(client.post("/run-pathsim", json=data))
+    )
+    thread.start()
+    deadline = time.monotonic() + 30
+    while client.get("/progress/cancel").get_json().get("state") != "running":
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    # only the owner of the run can cancel it
+    assert client.delete("/progress/cancel").status_code == 403
+    response = client.delete(
+        "/progress/cancel", headers={"X-Cancel-Token": "not-the-token-0123456"}
+    )
+    assert response.status_code == 403
+    response = client.delete("/progress/cancel", headers={"X-Cancel-Token": token})
+    assert response.status_code == 200
+    thread.join()
+
+    assert responses[0].status_code == 409
+    snapshot = client.get("/progress/cancel").get_json()
+    assert snapshot["state"] == "cancelled"
+    assert snapshot["fraction"] < 1
+    assert client.delete("/progress/unknown").status_code == 404
+
+
+@pytest.mark.parametrize(
+    "options", [{"mode": "draft"}, {"mode": "preview", "storage": "disk"}]
+)
+def test_invalid_preview_options(options):
+    response = app.test_client().post(
+        "/run-pathsim", json={"graph": generate_graph("chain", 3), **options}
+    )
+    assert response.status_code == 400
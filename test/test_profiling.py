@@ -0,0 +1,111 @@
+import json
+from pathlib import Path
+
+import pytest
+from pathsim import Connection, Simulation
+from pathsim.blocks import Adder, Amplifier, Constant, Integrator
+from pathsim.solvers import ESDIRK43
+
+from pathview.pathsim_utils import make_pathsim_model
+from pathview.profiling import BlockProfiler, SolverStats, _DtTrace
+
+
+def load_model(name):
+    with open(Path("example_graphs") / name) as f:
+        return make_pathsim_model(json.load(f))
+
+
+def test_profile_blocks_and_events():
+    simulation, duration = load_model("thermostat.json")
+    with BlockProfiler(simulation) as profiler:
+        simulation.run(duration)
+    report = profiler.report()
+
+    nodes = report["nodes"]
+    assert {node["kind"] for node in nodes} == {"block", "event"}
+    assert [node["time"] for node in nodes] == sorted(
+        (node["time"] for node in nodes), reverse=True
+    )
+    assert 0 < report["profiled_time"] <= report["wall_time"]
+
+    events = {node["label"]: node for node in nodes if node["kind"] == "event"}
+    assert set(events) == {"heater_on", "heater_off"}
+    assert events["heater_on"]["methods"]["func_act"]["calls"] > 0
+
+    integrator = next(node for node in nodes if node["type"] == "Integrator")
+    assert integrator["methods"]["step"]["calls"] > 0
+    assert integrator["calls"] == sum(
+        method["calls"] for method in integrator["methods"].values()
+    )
+
+
+def test_profiler_restores_methods():
+    simulation, duration = load_model("thermostat.json")
+    with BlockProfiler(simulation):
+        pass
+
+    for block in simulation.blocks:
+        assert "update" not in vars(block)
+        if isinstance(block, Integrator):
+            assert block.step.__func__ is Integrator.step
+    for event in simulation.events:
+        assert event.func_evt.__name__ != "wrapper"
+
+
+def test_solver_stats():
+    simulation, duration = load_model("bouncing_ball.json")
+    with SolverStats(simulation, dt_trace_points=10) as stats:
+        simulation.run(duration)
+    report = stats.report()
+
+    assert report["steps"]["accepted"] > 0
+    assert report["steps"]["rejected"] > 0
+    assert sum(report["dt"]["histogram"]["counts"]) == report["steps"]["accepted"]
+    assert report["sim_time"] == pytest.approx(duration)
+    assert report["wall_time_per_sim_second"] > 0
+    assert len(report["dt_trace"]["dt"]) == 10
+
+    (bounce,) = report["events"]
+    assert bounce["label"] == "bounce"
+    assert len(bounce["times"]) > 0
+    assert "timestep" not in vars(simulation)
+
+
+def test_solver_stats_fixed_point_iterations():
+    source = Constant(1.0)
+    adder = Adder()
+    amplifier = Amplifier(0.5)
+    simulation = Simulation(
+        [source, adder, amplifier],
+        [
+            Connection(source, adder[0]),
+            Connection(adder, amplifier),
+            Connection(amplifier, adder[1]),
+        ],
+        Solver=ESDIRK43,
+        log=False,
+    )
+    with SolverStats(simulation) as stats:
+        simulation.run(0.1)
+    report = stats.report()["fixed_point"]
+
+    assert report["loop_iterations"]["max"] > 1
+    assert report["limit_reached"] == 0
+
+
+def test_solver_stats_memory_is_bounded():
+    simulation, duration = load_model("bouncing_ball.json")
+    with SolverStats(simulation) as stats:
+        simulation.run(duration)
+    assert "dt_trace" not in stats.report()
+    assert stats._dt_trace is None
+
+    trace = _DtTrace(points=4)
+    dts = [1.0, 0.5, 2.0, 0.25, 3.0, 1.5, 0.1, 4.0, 5.0, 6.0, 0.2, 7.0]
+    for i, dt in enumerate(dts):
+        trace.add(float(i), dt)
+        assert len(trace.dts) < 2 * trace.points
+    report = trace.report()
+    assert len(report["dt"]) == 4
+    # the smallest steps are kept
+    assert {0.25, 0.1} <= set(report["dt"])
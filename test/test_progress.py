@@ -0,0 +1,158 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from pathview.pathsim_utils import make_pathsim_model
+from pathview.progress import Progress, ProgressRegistry, ProgressTracker, RunIdInUse
+from pathview.synthetic import generate_graph
+import src.backend as backend
+from src.backend import app, asgi_app
+from test.test_asgi import Client, make_scope
+
+
+def long_graph():
+    # a few thousand steps, long enough to be observed while running
+    return generate_graph("chain", 30, solver_params={"simulation_duration": "40"})
+
+
+def test_tracker_updates_progress():
+    simulation, duration = make_pathsim_model(generate_graph("chain", 5))
+    progress = Progress("run")
+
+    progress.start(simulation.time, simulation.time + duration)
+    with ProgressTracker(simulation, progress):
+        simulation.run(duration)
+    progress.finish()
+
+    snapshot = progress.snapshot()
+    assert snapshot["state"] == "done"
+    assert snapshot["fraction"] == 1.0
+    assert snapshot["time"] == pytest.approx(duration)
+    assert snapshot["steps"] == pytest.approx(duration / 0.01, abs=2)
+    assert snapshot["dt"] == pytest.approx(0.01)
+    assert snapshot["eta"] == 0.0
+    # the timestep method is restored
+    assert "timestep" not in vars(simulation)
+
+
+def test_eta_from_recent_rate():
+    progress = Progress("run")
+    progress.start(0.0, 10.0)
+    progress.snapshot()
+    time.sleep(0.2)
+    progress.time = 5.0
+
+    snapshot = progress.snapshot()
+
+    assert snapshot["fraction"] == 0.5
+    # 5 simulated seconds in 0.2 s of wall time
+    assert snapshot["rate"] == pytest.approx(25, rel=0.5)
+    assert snapshot["eta"] == pytest.approx(0.2, rel=0.5)
+
+
+def test_registry():
+    registry = ProgressRegistry(max_finished=2)
+    with pytest.raises(ValueError):
+        registry.create("../etc")
+
+    runs = [registry.create(f"run-{i}") for i in range(4)]
+    for progress in runs[:3]:
+        progress.finish()
+
+    assert [p.run_id for p in registry.active()] == ["run-3"]
+    # the oldest finished run is dropped
+    assert "run-0" not in registry
+    assert registry.get("run-2") is runs[2]
+
+    # the id of a run in progress can't be taken, that of a finished run can
+    with pytest.raises(RunIdInUse):
+        registry.create("run-3")
+    assert registry.create("run-2") is not runs[2]
+
+
+def test_cancel_token():
+    progress = Progress("run", token="a-token-of-the-client")
+    assert progress.authorizes("a-token-of-the-client")
+    assert not progress.authorizes("another-token-abcdef")
+    assert not progress.authorizes(None)
+    # a random token is issued if the client has none
+    assert len(Progress("run").token) >= 16
+    assert Progress("run").token != Progress("run").token
+
+    with pytest.raises(ValueError):
+        ProgressRegistry().create("run", token="short")
+
+
+def test_progress_while_running():
+    client = app.test_client()
+    data = {"graph": long_graph(), "run_id": "poll", "plot": False}
+    thread = threading.Thread(
+        target=client.post, args=("/run-pathsim",), kwargs={"json": data}
+    )
+    thread.start()
+
+    snapshots = []
+    while thread.is_alive():
+        response = client.get("/progress/poll")
+        if response.status_code == 200:
+            snapshots.append(response.get_json())
+        time.sleep(0.05)
+    thread.join()
+
+    running = [s for s in snapshots if s["state"] == "running"]
+    assert running
+    assert all(0 <= s["fraction"] <= 1 for s in running)
+    final = client.get("/progress/poll").get_json()
+    assert final["state"] == "done"
+    assert final["steps"] > 0
+    assert client.get("/progress/unknown").status_code == 404
+
+
+def test_progress_stream():
+    async def main():
+        stream = Client(make_scope("/progress/stream-run/stream"))
+        task = stream.start(asgi_app)
+        assert (await stream.next_body()).startswith("retry:")
+
+        # the stream is opened before the run starts
+        data = {"graph": long_graph(), "run_id": "stream-run", "plot": False}
+        run = asyncio.get_running_loop().run_in_executor(
+            None, lambda: app.test_client().post("/run-pathsim", json=data)
+        )
+
+        events = []
+        while not task.done() or not stream.messages.empty():
+            body = await stream.next_body()
+            if body:
+                events.append(json.loads(body.removeprefix("data: ")))
+        await run
+        return events
+
+    events = asyncio.run(main())
+
+    assert events[-1]["state"] == "done"
+    fractions = [e["fraction"] for e in events]
+    assert fractions == sorted(fractions)
+
+
+def test_invalid_run_id():
+    response = app.test_client().post(
+        "/run-pathsim", json={"graph": generate_graph("chain", 5), "run_id": "a/b"}
+    )
+    assert response.status_code == 400
+
+
+def test_run_id_in_use():
+    progress = backend.progress_registry.create("in-use")
+    client = app.test_client()
+    data = {"graph": generate_graph("chain", 3), "run_id": "in-use", "plot": False}
+
+    response = client.post("/run-pathsim", json=data)
+    assert response.status_code == 409
+    # the run in progress is kept
+    assert backend.progress_registry.get("in-use") is progress
+    assert not progress.finished
+    progress.finish()
@@ -0,0 +1,39 @@
+import os
+
+from pathview.result_cache import ResultCache
+
+
+def test_lru_eviction_removes_run_dir(tmp_path):
+    cache = ResultCache(max_entries=2, root_dir=str(tmp_path))
+
+    ids = [cache.new_id() for _ in range(3)]
+    run_dirs = [cache.make_run_dir(result_id) for result_id in ids]
+    for result_id, run_dir in zip(ids, run_dirs):
+        cache.put(result_id, result_id.upper(), run_dir=run_dir)
+        # mark the first result as recently used so that the second is evicted
+        cache.get(ids[0])
+
+    assert cache.get(ids[0]) == ids[0].upper()
+    assert cache.get(ids[1]) is None
+    assert cache.get(ids[2]) == ids[2].upper()
+    assert not os.path.exists(run_dirs[1])
+    assert os.path.exists(run_dirs[0]) and os.path.exists(run_dirs[2])
+
+
+def test_evict_unstored_run_dir(tmp_path):
+    cache = ResultCache(root_dir=str(tmp_path))
+    result_id = cache.new_id()
+    run_dir = cache.make_run_dir(result_id)
+
+    cache.evict(result_id)
+
+    assert not os.path.exists(run_dir)
+    assert result_id not in cache
+
+
+def test_hit_rate_counters():
+    cache = ResultCache()
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,93 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import pathview
+from pathview.export import export_scopes
+from pathview.figures import make_plot
+from pathview.pathsim_utils import make_pathsim_model
+from pathview.results import Recording, SimulationResults
+
+
+def load_graph(name):
+    with open(Path("example_graphs") / name) as f:
+        return json.load(f)
+
+
+def test_simulate_matches_blocks():
+    graph_data = load_graph("spectrum.json")
+    simulation, duration = make_pathsim_model(graph_data)
+    simulation.run(duration)
+    blocks = {b.id: b for b in simulation.blocks}
+
+    results = pathview.simulate(graph_data)
+
+    assert [r.kind for r in results] == ["spectrum", "scope"]
+    for recording in results:
+        expected_time, expected_data = blocks[recording.id].read()
+        time, data = recording.read()
+        assert isinstance(data, np.ndarray)
+        assert np.array_equal(time, expected_time)
+        assert np.array_equal(data, np.asarray(expected_data))
+
+
+def test_simulate_from_file_with_duration():
+    results = pathview.simulate("example_graphs/pid.json", duration=2)
+
+    assert results.time == pytest.approx(2, abs=0.02)
+    scope = results.scopes[0]
+    assert scope.time[-1] == pytest.approx(2, abs=0.02)
+    assert set(scope.series()) == set(scope.labels)
+
+
+def test_lookup_by_id_and_label():
+    results = pathview.simulate("example_graphs/spectrum.json", duration=1)
+
+    assert results["2"] is results["scope 2"]
+    assert "spectrum 0" in results
+    assert "missing" not in results
+    with pytest.raises(KeyError):
+        results["missing"]
+
+
+def test_empty_scope():
+    recording = SimulationResults.from_blocks(
+        [pathview.map_str_to_object["scope"]()]
+    ).scopes[0]
+
+    assert recording.read() == (None, None)
+    assert recording.labels == []
+    assert recording.series() == {}
+
+
+def test_plot_skips_empty_recordings():
+    results = SimulationResults(
+        [
+            Recording("1", "scope", "scope", None, None, []),
+            Recording("2", "spectrum", "spectrum", None, None, []),
+        ]
+    )
+
+    fig = make_plot(results)
+
+    assert fig["data"] == []
+
+
+def test_recordings_can_be_exported():
+    results = pathview.simulate("example_graphs/pid.json", duration=1)
+
+    csv = b"".join(export_scopes(results.scopes, fmt="csv")).decode()
+
+    assert csv.splitlines()[0].startswith("scope 5: time,")
+
+
+def test_no_presentation_imports():
+    code = (
+        "import sys, pathview; print('flask' in sys.modules, 'plotly' in sys.modules)"
+    )
+    output = subprocess.check_output([sys.executable, "-c", code], text=True)
+    assert output.split() == ["False", "False"]
@@ -0,0 +1,246 @@
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+
+import src.backend as backend
+from src.backend import app
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+@pytest.fixture
+def result_id(client):
+    with open(Path("example_graphs") / "spectrum.json") as f:
+        graph_data = json.load(f)
+    response = client.post("/run-pathsim", json={"graph": graph_data})
+    assert response.status_code == 200
+    return response.get_json()["result_id"]
+
+
+def test_plot_uses_typed_arrays(client, result_id):
+    response = client.get(f"/results/{result_id}/plot")
+    plot = json.loads(response.get_json()["plot"])
+
+    assert len(plot["data"]) > 0
+    assert "bdata" in plot["data"][0]["x"]
+
+
+def test_html_references_static_plotlyjs(client, result_id):
+    html = client.get(f"/results/{result_id}/html").get_data(as_text=True)
+    script = html.split('<script charset="utf-8" src="')[1].split('"')[0]
+
+    assert "/vendor/plotly-" in script
+    response = client.get(script)
+    assert response.status_code == 200
+    assert response.cache_control.max_age == 365 * 24 * 3600
+    assert len(html) < len(response.data)
+
+
+def test_export_csv(client, result_id):
+    response = client.get(f"/results/{result_id}/export?format=csv")
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).startswith("scope")
+
+
+@pytest.mark.parametrize("storage", ["memory", "disk"])
+def test_large_results_are_not_inlined(client, monkeypatch, storage):
+    with open(Path("example_graphs") / "spectrum.json") as f:
+        graph_data = json.load(f)
+    response = client.post(
+        "/run-pathsim", json={"graph": graph_data, "storage": storage, "plot": False}
+    )
+    result = response.get_json()
+    assert ("csv_data" in result) == (storage == "memory")
+
+    monkeypatch.setattr(backend, "CSV_INLINE_LIMIT", 0)
+    response = client.post(
+        "/run-pathsim", json={"graph": graph_data, "storage": storage, "plot": False}
+    )
+    result = response.get_json()
+    assert "csv_data" not in result
+    response = client.get(result["export_url"] + "?format=csv")
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).startswith("scope")
+
+
+def test_unknown_result(client):
+    assert client.get("/results/unknown/plot").status_code == 404
+
+
+def test_large_responses_are_compressed(client):
+    with open(Path("example_graphs") / "spectrum.json") as f:
+        graph_data = json.load(f)
+    response = client.post(
+        "/run-pathsim",
+        json={"graph": graph_data},
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.data))["success"]
+
+
+def test_server_timing_header(client):
+    with open(Path("example_graphs") / "spectrum.json") as f:
+        graph_data = json.load(f)
+    response = client.post("/run-pathsim", json={"graph": graph_data})
+
+    server_timing = response.headers["Server-Timing"]
+    for name in ["make_blocks", "simulation_run", "json_encode", "total"]:
+        assert f"{name};dur=" in server_timing
+
+
+def test_metrics(client, result_id):
+    client.get(f"/results/{result_id}/plot")
+    client.get("/results/unknown/plot")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+    text = response.get_data(as_text=True)
+    assert 'pathview_requests_total{endpoint="run_pathsim",status="200"}' in text
+    assert (
+        'pathview_phase_duration_seconds_count{endpoint="run_pathsim",'
+        'phase="simulation_run"}' in text
+    )
+    assert "pathview_result_cache_hits_total" in text
+    assert "pathview_log_subscribers" in text
+    assert "process_resident_memory_bytes" in text
+
+
+def test_profile_option(client):
+    with open(Path("example_graphs") / "spectrum.json") as f:
+        graph_data = json.load(f)
+    response = client.post(
+        "/run-pathsim", json={"graph": graph_data, "profile": True, "plot": False}
+    )
+    profile = response.get_json()["profile"]
+
+    node_ids = {node["id"] for node in graph_data["nodes"]}
+    assert {node["id"] for node in profile["nodes"]} <= node_ids | {None}
+    assert sum(node["share"] for node in profile["nodes"]) <= 1
+
+    response = client.post("/run-pathsim", json={"graph": graph_data, "plot": False})
+    assert "profile" not in response.get_json()
+
+
+def test_solver_stats(client):
+    with open(Path("example_graphs") / "spectrum.json") as f:
+        graph_data = json.load(f)
+    response = client.post(
+        "/run-pathsim", json={"graph": graph_data, "plot": False, "dt_trace": 50}
+    )
+    stats = response.get_json()["stats"]
+
+    assert stats["steps"]["accepted"] > 0
+    assert len(stats["dt_trace"]["time"]) <= 50
+
+
+def test_probe_solvers_is_cached(client):
+    with open(Path("example_graphs") / "pid.json") as f:
+        graph_data = json.load(f)
+    request = {"graph": graph_data, "candidates": ["RKBS32", "RKDP54"]}
+
+    first = client.post("/probe-solvers", json=request).get_json()
+    graph_data["nodes"][0]["position"] = {"x": 1, "y": 2}
+    second = client.post("/probe-solvers", json=request).get_json()
+
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["recommendation"] == first["recommendation"]
+
+    for candidates in ([], "RK4", [1, 2], [["RK4"]]):
+        response = client.post(
+            "/probe-solvers", json={**request, "candidates": candidates}
+        )
+        assert response.status_code == 400
+
+
+def test_checkpoint_and_resume(client):
+    with open(Path("example_graphs") / "pid.json") as f:
+        graph_data = json.load(f)
+    graph_data["solverParams"]["simulation_duration"] = "10"
+    response = client.post(
+        "/run-pathsim",
+        json={"graph": graph_data, "plot": False, "checkpoint_interval": 4},
+    ).get_json()
+    checkpoint = response["checkpoint"]
+    assert checkpoint["time"] == pytest.approx(10, abs=0.02)
+
+    resumed = client.post(
+        f"/checkpoints/{checkpoint['id']}/resume",
+        json={"duration": 5, "plot": False},
+    ).get_json()
+    assert resumed["success"]
+    assert resumed["csv_data"]["scopes"][0]["time"][-1] == pytest.approx(15, abs=0.02)
+    assert resumed["csv_data"]["scopes"][0]["time"][0] == 0
+
+    nothing_left = client.post(f"/checkpoints/{checkpoint['id']}/resume", json={})
+    assert nothing_left.status_code == 500
+
+    assert client.delete(f"/checkpoints/{checkpoint['id']}").status_code == 200
+    response = client.post(f"/checkpoints/{checkpoint['id']}/resume", json={})
+    assert response.status_code == 404
+
+    for checkpoint_id in (5, ["id"], "../id"):
+        response = client.post(
+            "/run-pathsim",
+            json={
+                "graph": graph_data,
+                "checkpoint": True,
+                "checkpoint_id": checkpoint_id,
+            },
+        )
+        assert response.status_code == 400
+
+
+def test_compile_and_run_compiled(client):
+    with open(Path("example_graphs") / "pid.json") as f:
+        graph_data = json.load(f)
+    response = client.post("/compile", json={"graph": graph_data}).get_json()
+    assert response["success"]
+    assert response["size"] > 0
+
+    response = client.post(
+        "/run-pathsim", json={"graph": graph_data, "compiled": True, "plot": False}
+    )
+    assert response.get_json()["success"]
+    assert "load_artifact;dur=" in response.headers["Server-Timing"]
+
+
+def test_convert_to_python_batch_variant(client):
+    with open(Path("example_graphs") / "pid.json") as f:
+        graph_data = json.load(f)
+
+    response = client.post(
+        "/convert-to-python", json={"graph": graph_data, "variant": "batch"}
+    ).get_json()
+    assert response["success"]
+    assert "def build(overrides=None):" in response["script"]
+
+    response = client.post(
+        "/convert-to-python", json={"graph": graph_data, "variant": "notebook"}
+    )
+    assert response.status_code == 400
+
+
+def test_execute_python(client):
+    response = client.post(
+        "/execute-python",
+        json={"code": "import numpy as np\nx = np.linspace(0, 1, 10**6)\nk = 2"},
+    )
+
+    result = response.get_json()
+    assert result["success"]
+    assert result["variables"]["k"] == 2
+    assert result["variables"]["x"]["shape"] == [10**6]
+    assert len(result["variables"]["x"]["head"]) < 10
+
+    response = client.post("/execute-python", json={"code": "1 / 0"})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Runtime Error: division by zero"
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from pathview.sandbox import (
+    ExecutionError,
+    ExecutionPool,
+    ExecutionTimeout,
+    execute,
+    preview_value,
+)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = ExecutionPool(size=1, timeout=5, memory_limit=256 * 2**20)
+    yield pool
+    pool.shutdown()
+
+
+def test_preview_value():
+    assert preview_value(1.5) == 1.5
+    assert preview_value(np.float32(2)) == 2.0
+    assert preview_value([1, "a", None]) == [1, "a", None]
+
+    preview = preview_value(np.zeros((1000, 3)))
+    assert preview == {
+        "type": "ndarray",
+        "shape": [1000, 3],
+        "dtype": "float64",
+        "head": [0.0] * 8,
+    }
+
+    preview = preview_value(list(range(100)))
+    assert preview[:8] == list(range(8))
+    assert preview[8] == "... (92 more items)"
+    assert len(preview_value({i: i for i in range(100)})) == 9
+    assert len(preview_value("a" * 10_000)) < 300
+    assert len(preview_value(object())) < 300
+
+
+def test_execute():
+    result = execute("import numpy as np\nx = np.ones(5)\nprint('hi')\ndef f(): pass")
+
+    assert result["success"]
+    assert result["output"] == "hi\n"
+    assert result["functions"] == ["f"]
+    assert result["variables"]["x"]["shape"] == [5]
+
+    assert execute("1 / 0")["error"] == "Runtime Error: division by zero"
+    assert execute("def (:")["error"].startswith("Syntax Error")
+
+
+def test_pool_execute(pool):
+    result = pool.execute("import numpy as np\nx = np.arange(10**6)")
+
+    assert result["success"]
+    assert result["variables"]["x"]["head"] == list(range(8))
+    # every call has a fresh namespace
+    assert pool.execute("y = 1")["variables"] == {"y": 1}
+
+
+def test_memory_limit(pool):
+    result = pool.execute("import numpy as np\nx = np.ones(10**9)")
+
+    assert not result["success"]
+    assert "memory" in result["error"]
+    assert pool.execute("y = 1")["success"]
+
+
+def test_timeout_replaces_worker(pool):
+    with pytest.raises(ExecutionTimeout):
+        pool.execute("while True: pass")
+
+    assert pool.execute("y = 2")["variables"] == {"y": 2}
+    assert pool.timeouts == 1
+
+
+def test_worker_crash(pool):
+    with pytest.raises(ExecutionError):
+        pool.execute("import os\nos._exit(1)")
+
+    assert pool.execute("y = 3")["success"]
+    assert pool.crashes == 1
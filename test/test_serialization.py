@@ -0,0 +1,49 @@
+import gzip
+import json
+
+import numpy as np
+import pytest
+
+from pathview import serialization
+
+
+@pytest.mark.parametrize(
+    "array",
+    [
+        np.arange(4.0),
+        np.arange(8.0).reshape(2, 4).T[1],  # not contiguous
+        np.arange(4),
+    ],
+)
+def test_dumps_numpy_arrays(array):
+    result = json.loads(serialization.dumps({"data": array, "n": np.float64(2)}))
+    assert result == {"data": array.tolist(), "n": 2.0}
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_complex(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(serialization, "orjson", None)
+    result = json.loads(
+        serialization.dumps({"data": np.array([3 + 4j, -1j]), "z": np.complex128(1j)})
+    )
+    assert result == {
+        "data": {"real": [3.0, 0.0], "imag": [4.0, -1.0]},
+        "z": {"real": 0.0, "imag": 1.0},
+    }
+
+
+def test_dumps_stdlib_fallback(monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+    result = json.loads(serialization.dumps([np.arange(3.0)]))
+    assert result == [[0.0, 1.0, 2.0]]
+
+
+def test_dumps_unknown_type():
+    with pytest.raises(TypeError):
+        serialization.dumps(object())
+
+
+def test_gzip_roundtrip():
+    body = serialization.dumps({"data": np.linspace(0, 1, 1000)})
+    assert gzip.decompress(serialization.compress(body, "gzip")) == body
@@ -0,0 +1,132 @@
+import json
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pytest
+
+from pathview.canonical import graph_hash
+from pathview import solver_probe
+from pathview.solver_probe import _probe_result, estimate_stiffness, probe_solvers
+
+
+def load_graph(name):
+    with open(Path("example_graphs") / name) as f:
+        return json.load(f)
+
+
+def test_graph_hash_ignores_layout():
+    graph_data = load_graph("pid.json")
+    moved = load_graph("pid.json")
+    for node in moved["nodes"]:
+        node["position"] = {"x": 0, "y": 0}
+        node["selected"] = True
+    for edge in moved["edges"]:
+        edge["style"] = {}
+
+    assert graph_hash(graph_data) == graph_hash(moved)
+
+    moved["solverParams"]["Solver"] = "RK4"
+    assert graph_hash(graph_data) != graph_hash(moved)
+    assert graph_hash(graph_data, exclude_solver_params=("Solver",)) == graph_hash(
+        moved, exclude_solver_params=("Solver",)
+    )
+
+
+def test_probe_solvers():
+    result = probe_solvers(
+        load_graph("pid.json"), candidates=["RKBS32", "ESDIRK43"], max_workers=1
+    )
+
+    assert result["recommendation"] in ("RKBS32", "ESDIRK43")
+    runtimes = [r["projected_runtime"] for r in result["ranking"]]
+    assert runtimes == sorted(runtimes)
+    assert all(r["completed"] for r in result["ranking"])
+    assert result["stiffness"]["stiff"] is False
+
+
+def test_probe_solvers_parallel():
+    result = probe_solvers(
+        load_graph("thermostat.json"), candidates=["RKBS32", "RK4"], max_workers=2
+    )
+    assert {r["solver"] for r in result["ranking"]} == {"RKBS32", "RK4"}
+
+    # the worker processes are reused by the next probe
+    pool = solver_probe._pool
+    result = probe_solvers(
+        load_graph("thermostat.json"), candidates=["RKBS32", "RK4"], max_workers=2
+    )
+    assert solver_probe._pool is pool
+    assert all(r["success"] for r in result["ranking"])
+
+
+def test_crashed_probe_is_a_failed_candidate():
+    future = Future()
+    future.set_exception(BrokenProcessPool("killed"))
+    result = _probe_result(future, "RK4")
+    assert result == {
+        "solver": "RK4",
+        "success": False,
+        "error": "The probe process died",
+    }
+
+
+def test_probe_time_budget_includes_building():
+    graph_data = load_graph("pid.json")
+    graph_data["pythonCode"] = "import time\ntime.sleep(0.5)"
+
+    result = probe_solvers(
+        graph_data, candidates=["RKBS32"], time_budget=0.1, max_workers=1
+    )
+
+    (candidate,) = result["ranking"]
+    assert not candidate["success"]
+    assert "time budget" in candidate["error"]
+
+
+def test_hung_probe_is_given_up(monkeypatch):
+    monkeypatch.setattr(solver_probe, "WORKER_START_TIME", 5.0)
+    graph_data = load_graph("pid.json")
+    graph_data["pythonCode"] = "import time\ntime.sleep(60)"
+
+    start = time.monotonic()
+    result = probe_solvers(
+        graph_data, candidates=["RKBS32", "RK4"], time_budget=0.5, max_workers=2
+    )
+
+    assert time.monotonic() - start < 30
+    assert all(
+        r["error"] == "The probe exceeded its time budget" for r in result["ranking"]
+    )
+    # the hung workers are not reused
+    assert solver_probe._pool is None
+
+
+def test_probe_unknown_solver():
+    with pytest.raises(ValueError):
+        probe_solvers(load_graph("pid.json"), candidates=["Unknown"])
+    with pytest.raises(ValueError):
+        probe_solvers(load_graph("pid.json"), candidates=[])
+
+
+def test_estimate_stiffness():
+    results = [
+        {
+            "success": True,
+            "adaptive": True,
+            "explicit": True,
+            "mean_dt": 1e-4,
+            "rejection_rate": 0.4,
+        },
+        {
+            "success": True,
+            "adaptive": True,
+            "explicit": False,
+            "mean_dt": 1e-1,
+            "rejection_rate": 0.0,
+        },
+    ]
+    stiffness = estimate_stiffness(results)
+    assert stiffness["dt_ratio"] == pytest.approx(1000)
+    assert stiffness["stiff"] is True
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from pathview.canonical import graph_hash
+from pathview.convert_to_python import convert_graph_to_python
+from pathview.pathsim_utils import make_pathsim_model
+from pathview.results import simulate
+from pathview.synthetic import TOPOLOGIES, generate_graph
+
+
+@pytest.mark.parametrize("topology", TOPOLOGIES)
+@pytest.mark.parametrize("n_blocks", [4, 11, 60])
+def test_graphs_run(topology, n_blocks):
+    graph_data = generate_graph(topology, n_blocks)
+
+    assert len(graph_data["nodes"]) == n_blocks
+    ids = [node["id"] for node in graph_data["nodes"]]
+    assert len(set(ids)) == n_blocks
+    for edge in graph_data["edges"]:
+        assert edge["source"] in ids and edge["target"] in ids
+
+    results = simulate(graph_data)
+    assert len(results.scopes) == 1
+    assert np.all(np.isfinite(results.scopes[0].data))
+
+
+@pytest.mark.parametrize("topology", TOPOLOGIES)
+def test_graphs_convert_to_python(topology):
+    graph_data = generate_graph(topology, 20)
+    exec(convert_graph_to_python(graph_data), {})
+
+
+def test_random_graph_is_reproducible():
+    assert graph_hash(generate_graph("random", 200, seed=1)) == graph_hash(
+        generate_graph("random", 200, seed=1)
+    )
+    assert graph_hash(generate_graph("random", 200, seed=1)) != graph_hash(
+        generate_graph("random", 200, seed=2)
+    )
+
+
+def test_random_graph_has_feedback_loops():
+    graph_data = generate_graph("random", 500, feedback=0.5)
+    order = {node["id"]: i for i, node in enumerate(graph_data["nodes"])}
+    backward = [
+        e for e in graph_data["edges"] if order[e["source"]] > order[e["target"]]
+    ]
+    assert backward
+    # feedback loops are closed through integrators only
+    types = {node["id"]: node["type"] for node in graph_data["nodes"]}
+    assert {types[e["source"]] for e in backward} == {"integrator"}
+    make_pathsim_model(graph_data)
+
+
+def test_tree_fan_out():
+    graph_data = generate_graph("tree", 40, branching=3)
+    fan_out, fan_in = {}, {}
+    for edge in graph_data["edges"]:
+        fan_out[edge["source"]] = fan_out.get(edge["source"], 0) + 1
+        fan_in[edge["target"]] = fan_in.get(edge["target"], 0) + 1
+
+    assert fan_out["0"] == 3
+    assert max(fan_out.values()) == 3
+    # the 25 leaves are summed by one adder
+    assert max(fan_in.values()) == 25
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        generate_graph("ring", 10)
+    with pytest.raises(ValueError):
+        generate_graph("tree", 2)
@@ -0,0 +1,55 @@
+import pytest
+
+from pathview.metrics import MetricsRegistry
+from pathview.timing import PhaseTimer, current_timer, phase
+
+
+def test_phase_without_timer_is_noop():
+    assert current_timer() is None
+    with phase("anything"):
+        pass
+
+
+def test_phase_timer_accumulates():
+    timer = PhaseTimer()
+    with timer.activate():
+        assert current_timer() is timer
+        with phase("a"):
+            pass
+        with phase("b"):
+            pass
+        with phase("a"):
+            pass
+    assert current_timer() is None
+
+    assert list(timer.phases) == ["a", "b"]
+    assert all(duration >= 0 for duration in timer.phases.values())
+    assert timer.server_timing().startswith("a;dur=")
+
+
+def test_registry_render():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests.", ["status"])
+    registry.gauge("queue_depth", "Queue depth.", func=lambda: 3)
+    histogram = registry.histogram("duration_seconds", "Duration.", buckets=(0.1, 1))
+
+    counter.inc(status=200)
+    counter.inc(2, status=200)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{status="200"} 3.0' in text
+    assert "queue_depth 3.0" in text
+    assert 'duration_seconds_bucket{le="0.1"} 0' in text
+    assert 'duration_seconds_bucket{le="1.0"} 1' in text
+    assert 'duration_seconds_bucket{le="+Inf"} 2' in text
+    assert "duration_seconds_count 2" in text
+
+
+def test_wrong_labels():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests.", ["status"])
+    with pytest.raises(ValueError):
+        counter.inc(endpoint="x")